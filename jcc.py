@@ -40,6 +40,7 @@ import re
 
 from datetime import date
 from pyang import plugin, util, error
+from jnc import camelize, normalize, capitalize_first, decapitalize_first
 
 OSSep = "/"
 
@@ -398,14 +399,6 @@ augmented_modules = {}
 """A dict of external modules that are augmented by the YANG module"""
 
 
-camelized_stmt_args = {}
-"""Cache containing camelized versions of statement identifiers"""
-
-
-normalized_stmt_args = {}
-"""Cache containing normalized versions of statement identifiers"""
-
-
 class_hierarchy = {}
 """Dict that map package names to sets of names of classes to be generated"""
 
@@ -553,85 +546,6 @@ def pairwise(iterable):
     yield (item, None)
 
 
-def capitalize_first(string):
-    """Returns string with its first character capitalized (if any)"""
-    return string[:1].capitalize() + string[1:]
-
-
-def decapitalize_first(string):
-    """Returns string with its first character decapitalized (if any)"""
-    return string[:1].lower() + string[1:]
-
-
-def camelize(string):
-    """Converts string to lower camel case
-
-    Removes hyphens and dots and replaces following character (if any) with
-    its upper-case counterpart. Does not remove consecutive or trailing hyphens
-    or dots.
-
-    If the resulting string is reserved in Java, an underline is appended
-
-    Returns an empty string if string argument is None. Otherwise, returns
-    string decapitalized and with no consecutive upper case letters.
-
-    """
-    try:  # Fetch from cache
-        return camelized_stmt_args[string]
-    except KeyError:
-        pass
-    camelized_str = collections.deque()
-    if string is not None:
-        iterator = pairwise(decapitalize_first(string))
-        for character, next_character in iterator:
-            if next_character is None:
-                if (len(string) > 1):
-                    camelized_str.append(character)
-                else:
-                    if(string.isupper()):
-                        camelized_str.append(character.upper())
-                    else:
-                        camelized_str.append(character.lower())
-            elif character in '-.':
-                camelized_str.append(capitalize_first(next_character))
-                next(iterator)
-            elif (character.isupper()
-                  and (next_character.isupper()
-                       or not next_character.isalpha())):
-                camelized_str.append(character.lower())
-            else:
-                camelized_str.append(character)
-    res = ''.join(camelized_str)
-    if res in java_reserved_words | java_literals:
-        camelized_str.append('_')
-    if re.match(r'\d', res):
-        camelized_str.appendleft('_')
-    res = ''.join(camelized_str)
-    camelized_stmt_args[string] = res  # Add to cache
-    return res
-
-
-def normalize(string):
-    """returns capitalize_first(camelize(string)), except if camelize(string)
-    begins with and/or ends with a single underline: then they are/it is
-    removed and a 'J' is prepended. Mimics normalize in YangElement of JNC.
-
-    """
-    try:  # Fetch from cache
-        return normalized_stmt_args[string]
-    except KeyError:
-        pass
-    res = camelize(string)
-    start = 1 if res.startswith('_') else 0
-    end = -1 if res.endswith('_') else 0
-    if start or end:
-        res = 'J' + capitalize_first(res[start:end])
-    else:
-        res = capitalize_first(res)
-    normalized_stmt_args[string] = res  # Add to cache
-    return res
-
-
 def flatten(l):
     """Returns a flattened version of iterable l
 
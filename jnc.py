@@ -36,8 +36,20 @@ import os
 import errno
 import sys
 import collections
+import copy
+import functools
+import itertools
 import re
 import json
+import struct
+import hashlib
+import io
+import select
+import multiprocessing
+import time
+import zipfile
+import zlib
+import cProfile
 
 from datetime import date
 from pyang import plugin, util, error
@@ -77,6 +89,196 @@ def _decode_dict(data):
         rv[key] = value
     return rv
 
+def read_module_mapping(path):
+    """Returns the entries of the module mapping file at path, as a dict
+    keyed by module name.
+
+    Raises an EmitError if an entry lacks a name or package, or if there is
+    more than one entry for a module.
+
+    """
+    with open(path) as data_file:
+        data = json.load(data_file, object_hook=_decode_dict)
+    mapping = {}
+    for entry in data.get('modules', []):
+        if 'name' not in entry or 'package' not in entry:
+            raise error.EmitError(path + ': module mapping entry without ' +
+                                  'name or package: ' + repr(entry))
+        if entry['name'] in mapping:
+            raise error.EmitError(path + ': duplicate module mapping ' +
+                                  'entries for "' + entry['name'] + '"')
+        mapping[entry['name']] = entry
+    return mapping
+
+def read_manifest(path, options):
+    """Returns the entries of the manifest file at path, as a list of (module
+    name, output directory, options) tuples, where options is a dict of
+    option destinations and values.
+
+    The manifest lists each module with its output directory and, optionally,
+    options by long name without the leading --jnc-, for example:
+    {"modules": [{"name": "a", "output": "src/gen/a",
+                  "options": {"schema-format": "binary"}}]}
+
+    Raises an EmitError if an entry lacks a name or output, if the output
+    directory has no src directory to place the root package below, as for
+    --jnc-output, or if an option is not one of manifest_options or has an
+    invalid value.
+
+    """
+    with open(path) as data_file:
+        data = json.load(data_file, object_hook=_decode_dict)
+    by_name = dict((opt.get_opt_string()[len('--jnc-'):], opt)
+                   for opt in options if opt.dest in manifest_options)
+    entries = []
+    for entry in data.get('modules', []):
+        if 'name' not in entry or 'output' not in entry:
+            raise error.EmitError(path + ': manifest entry without name or ' +
+                                  'output: ' + repr(entry))
+        if 'src' not in entry['output']:
+            raise error.EmitError(path + ': output "' + entry['output'] +
+                                  '" of module "' + entry['name'] +
+                                  '" is not below a src directory')
+        values = {}
+        for key, value in entry.get('options', {}).items():
+            opt = by_name.get(key)
+            if opt is None:
+                raise error.EmitError(path + ': unknown option "' + key +
+                                      '" for module "' + entry['name'] + '"')
+            if opt.action == 'store_true':
+                valid = isinstance(value, bool)
+            elif opt.dest == 'include_modules':
+                if isinstance(value, basestring):
+                    value = value.split(',')
+                valid = isinstance(value, list)
+            else:
+                try:
+                    value = opt.check_value('--jnc-' + key, value)
+                    valid = True
+                except optparse.OptionValueError:
+                    valid = False
+            if not valid:
+                raise error.EmitError(path + ': invalid value ' + repr(value) +
+                                      ' of option "' + key + '" for module "' +
+                                      entry['name'] + '"')
+            values[opt.dest] = value
+        entries.append((entry['name'], entry['output'], values))
+    return entries
+
+def mapped_package(module_name, ctx):
+    """Returns the package that module_name is mapped to in the module mapping
+    file, or None if it is not mapped.
+
+    """
+    entry = getattr(ctx, 'module_mapping', {}).get(module_name)
+    if entry is None:
+        return None
+    return entry['package']
+
+def output_sibling(ctx, name):
+    """Returns the path of the file called name in the directory containing
+    the output directory of ctx, or in the directory of the manifest file if
+    the output directories are those of the manifest entries.
+
+    """
+    if ctx.opts.directory is None and ctx.opts.manifest:
+        return os.path.join(os.path.dirname(ctx.opts.manifest), name)
+    output = os.path.normpath(ctx.opts.directory)
+    return os.path.join(os.path.dirname(output), name)
+
+class Profiler(object):
+    """Records the number of calls of, and the wall clock and CPU time spent
+    in, each phase of the generation. The time of a phase includes that of
+    the phases it calls, such as writing files.
+
+    """
+
+    def __init__(self):
+        self.start = (time.time(), sum(os.times()[:2]))
+        self.reset()
+
+    def reset(self):
+        """Forgets the phases and cache lookups recorded so far"""
+        self.phases = {}
+        self.caches = {}
+        for name, cache in (('camelize', camelized_stmt_args),
+                            ('normalize', normalized_stmt_args)):
+            self.caches[name] = [cache, cache.hits, cache.misses]
+
+    def call(self, name, func, *args, **kwargs):
+        """Returns func(*args, **kwargs), recording the call as part of the
+        phase called name.
+
+        """
+        wall, cpu = time.time(), sum(os.times()[:2])
+        try:
+            return func(*args, **kwargs)
+        finally:
+            phase = self.phases.setdefault(name, [0, 0.0, 0.0])
+            phase[0] += 1
+            phase[1] += time.time() - wall
+            phase[2] += sum(os.times()[:2]) - cpu
+
+    def stats(self):
+        """Returns the phases and the number of cache hits and misses
+        recorded since the last reset.
+
+        """
+        caches = {}
+        for name, (cache, hits, misses) in self.caches.items():
+            caches[name] = [cache.hits - hits, cache.misses - misses]
+        return {'phases': dict((k, list(v)) for k, v in self.phases.items()),
+                'caches': caches}
+
+    def merge(self, stats):
+        """Adds stats, as returned by the stats method of the profiler of a
+        worker process, to the phases and cache lookups of this profiler.
+
+        """
+        for name, (calls, wall, cpu) in stats['phases'].items():
+            phase = self.phases.setdefault(name, [0, 0.0, 0.0])
+            phase[0] += calls
+            phase[1] += wall
+            phase[2] += cpu
+        for name, (hits, misses) in stats['caches'].items():
+            self.caches[name][1] -= hits
+            self.caches[name][2] -= misses
+
+    def write(self, path):
+        """Writes a JSON report of the recorded phases and cache hit rates to
+        the file at path.
+
+        """
+        stats = self.stats()
+        report = {'total': {'wall': time.time() - self.start[0],
+                            'cpu': sum(os.times()[:2]) - self.start[1]},
+                  'phases': {}, 'caches': {}}
+        for name, (calls, wall, cpu) in sorted(stats['phases'].items()):
+            report['phases'][name] = {'calls': calls, 'wall': wall,
+                                      'cpu': cpu}
+        for name, (hits, misses) in sorted(stats['caches'].items()):
+            lookups = hits + misses
+            report['caches'][name] = {
+                'hits': hits, 'misses': misses,
+                'hit_rate': float(hits) / lookups if lookups else None}
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+def profiled(name):
+    """Decorator for functions whose calls are recorded by profiler, if
+    profiling is on, as part of the phase called name.
+
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if profiler is None:
+                return func(*args, **kwargs)
+            return profiler.call(name, func, *args, **kwargs)
+        return wrapper
+    return decorator
+
 class JNCPlugin(plugin.PyangPlugin):
     """The plug-in class of JNC.
 
@@ -90,6 +292,7 @@ class JNCPlugin(plugin.PyangPlugin):
 
     def __init__(self):
         self.done = set([])  # Helps avoiding processing modules more than once
+        self.cache = None
 
     def add_output_format(self, fmts):
         """Adds 'jnc' as a valid output format and sets the format to jnc if
@@ -121,7 +324,12 @@ class JNCPlugin(plugin.PyangPlugin):
                 '--jnc-serial',
                 dest='serial',
                 action='store_true',
-                help='Turn off usage of multiple threads.'),
+                help='Turn off usage of multiple processes.'),
+            optparse.make_option(
+                '--jnc-jobs',
+                dest='jobs',
+                type='int',
+                help='Number of worker processes, default is the CPU count.'),
             optparse.make_option(
                 '--jnc-verbose',
                 dest='verbose',
@@ -132,6 +340,12 @@ class JNCPlugin(plugin.PyangPlugin):
                 dest='debug',
                 action='store_true',
                 help='Print debug messages. Redundant if verbose mode is on.'),
+            optparse.make_option(
+                '--jnc-check-index',
+                dest='check_index',
+                action='store_true',
+                help='Debug: Verify that statement index lookups give the ' +
+                     'same result as walking the statement tree.'),
             optparse.make_option(
                 '--jnc-no-classes',
                 dest='no_classes',
@@ -152,6 +366,98 @@ class JNCPlugin(plugin.PyangPlugin):
                 dest='ignore',
                 action='store_true',
                 help='Ignore errors from validation.'),
+            optparse.make_option(
+                '--jnc-incremental',
+                dest='incremental',
+                action='store_true',
+                help='Do not rewrite files whose content is unchanged.'),
+            optparse.make_option(
+                '--jnc-cache',
+                dest='cache',
+                action='store_true',
+                help='Reuse the files generated from unchanged modules, ' +
+                     'cached in .jnc-cache next to the output directory.'),
+            optparse.make_option(
+                '--jnc-low-memory',
+                dest='low_memory',
+                action='store_true',
+                help='Bound the memory used for very large models, at the ' +
+                     'cost of speed. Implies --jnc-serial.'),
+            optparse.make_option(
+                '--jnc-profile',
+                dest='profile',
+                action='store_true',
+                help='Write the time spent in each phase of the generation ' +
+                     'to jnc-profile.json next to the output directory.'),
+            optparse.make_option(
+                '--jnc-cprofile',
+                dest='cprofile',
+                action='store_true',
+                help='Profile the generation with cProfile and write the ' +
+                     'statistics to jnc-profile.pstats next to the output ' +
+                     'directory.'),
+            optparse.make_option(
+                '--jnc-module-graph',
+                dest='module_graph',
+                type='choice',
+                choices=['dot', 'json'],
+                help='Write the graph of the generated modules and the ' +
+                     'modules they import or include to ' +
+                     'jnc-module-graph.dot or .json next to the output ' +
+                     'directory.'),
+            optparse.make_option(
+                '--jnc-manifest',
+                dest='manifest',
+                help='Generate the files of each module listed in a JSON ' +
+                     'manifest file, with the output directory and options ' +
+                     'of the module, from a single parse of all modules.'),
+            optparse.make_option(
+                '--jnc-share-classes',
+                dest='share_classes',
+                action='store_true',
+                help='Generate structurally identical classes, such as ' +
+                     'those of a grouping used in many places, once and ' +
+                     'refer to that class wherever they occur.'),
+            optparse.make_option(
+                '--jnc-output-archive',
+                dest='output_archive',
+                help='Write the generated files to this zip file, as a ' +
+                     'source jar, instead of to the output directory.'),
+            optparse.make_option(
+                '--jnc-change-manifest',
+                dest='change_manifest',
+                help='Write a JSON file listing the generated files with ' +
+                     'their SHA-1 digests and whether they were added, ' +
+                     'changed, unchanged or removed since the previous run.'),
+            optparse.make_option(
+                '--jnc-delete-stale',
+                dest='delete_stale',
+                action='store_true',
+                help='Delete the files listed in the previous change ' +
+                     'manifest that are no longer generated.'),
+            optparse.make_option(
+                '--jnc-watch',
+                dest='watch',
+                action='store_true',
+                help='Keep running after the generation, and regenerate the ' +
+                     'files of the modules whose YANG files change. Reads ' +
+                     'the commands check, regenerate and quit from stdin.'),
+            optparse.make_option(
+                '--jnc-schema-format',
+                dest='schema_format',
+                type='choice',
+                choices=['xml', 'binary', 'java'],
+                default='xml',
+                help='Format of the schema: xml files (default), binary ' +
+                     'files for faster loading by the generated classes, or ' +
+                     'java classes that register it without reading a file.'),
+            optparse.make_option(
+                '--jnc-lazy-schema',
+                dest='lazy_schema',
+                action='store_true',
+                help='Split the schema of each module into a shard per top ' +
+                     'level node, registered when a node in it is first ' +
+                     'looked up.'),
             optparse.make_option(
                 '--jnc-import-on-demand',
                 dest='import_on_demand',
@@ -178,6 +484,7 @@ class JNCPlugin(plugin.PyangPlugin):
             ]
         g = optparser.add_option_group('JNC output specific options')
         g.add_options(optlist)
+        self.options = optlist
 
     def setup_ctx(self, ctx):
         """Called after ctx has been set up in main module. Checks if the
@@ -191,6 +498,10 @@ class JNCPlugin(plugin.PyangPlugin):
             self.print_help()
             sys.exit(0)
         if ctx.opts.format == 'jnc':
+            if ctx.opts.manifest and not ctx.opts.directory:
+                # Set for each module of the manifest, in emit
+                self.ctx = ctx
+                return
             if not ctx.opts.directory:
                 ctx.opts.directory = 'src/gen'
                 print_warning(msg=('Option -d (or --java-package) not set, ' +
@@ -241,6 +552,16 @@ class JNCPlugin(plugin.PyangPlugin):
         """
         if ctx.opts.debug or ctx.opts.verbose:
             print('JNC plugin starting')
+        global profiler
+        if ctx.opts.profile:
+            profiler = Profiler()
+        if ctx.opts.cprofile:
+            cprofiler = cProfile.Profile()
+            cprofiler.enable()
+        entries = None
+        if ctx.opts.manifest:
+            entries = read_manifest(ctx.opts.manifest, self.options)
+            modules = self.manifest_modules(ctx, entries, modules)
         if not ctx.opts.ignore:
             for (epos, etag, _) in ctx.errors:
                 if (error.is_error(error.err_level(etag)) and
@@ -254,49 +575,536 @@ class JNCPlugin(plugin.PyangPlugin):
                     print_warning(msg=(etag.lower() + ', aborting.'), key=etag)
                     self.fatal("%s contains errors" % epos.top.arg)
 
-        self.ctx.include_modules = set([])
-        # Sweep, adding included and imported modules, until no change
-        module_set = set(modules)
-        num_modules = 0
-        while num_modules != len(module_set):
-            num_modules = len(module_set)
-            for module in list(module_set):
-                self.ctx.include_modules.add(module.arg)
-                imported = map(lambda x: x.arg, search(module, 'import'))
-                included = map(lambda x: x.arg, search(module, 'include'))
-                for (module_stmt, rev) in self.ctx.modules:
-                    if module_stmt in (imported + included):
-                        if self.ctx.opts.include_modules:
-                            if module_stmt in self.ctx.opts.include_modules:
-                                module_set.add(self.ctx.modules[(module_stmt, rev)])
-                                self.ctx.include_modules.add(module_stmt)
-                        else:
-                            module_set.add(self.ctx.modules[(module_stmt, rev)])
-                            self.ctx.include_modules.add(module_stmt)
-
         data_file_name = "module-mapping.json"
         path = os.path.realpath(self.cur_file_path() + "/../modules/" + data_file_name)
         try:
-            with open(path) as data_file:
-                self.ctx.data = json.load(data_file, object_hook=_decode_dict)
+            ctx.module_mapping = read_module_mapping(path)
         except EnvironmentError:
             print_warning("Uanble to open file "+data_file_name+" in "+path+"\n")
 
+        global stmt_index, change_manifest
+        stmt_index = StatementIndex(ctx)
+        if ctx.opts.change_manifest:
+            change_manifest = ChangeManifest(ctx.opts.change_manifest)
+
+        if ctx.opts.low_memory:
+            bound_caches(low_memory_cache_size)
+
+        if entries is None:
+            self.generate(modules)
+        else:
+            self.generate_manifest(modules, entries)
+        close_output_archives()
+        if change_manifest is not None:
+            change_manifest.write(ctx.opts.delete_stale)
+
+        if ctx.opts.watch:
+            self.watch(modules, entries)
+
+        if ctx.opts.cprofile:
+            cprofiler.disable()
+            cprofiler.dump_stats(output_sibling(ctx, 'jnc-profile.pstats'))
+        if profiler is not None:
+            profiler.write(output_sibling(ctx, 'jnc-profile.json'))
+            profiler = None
+
+    def generate(self, modules):
+        """Generates files from modules, the modules that they import or
+        include and the modules that augment these, according to the options
+        of self.ctx.
+
+        """
+        ctx = self.ctx
+        module_set = self.module_closure(modules)
+        for module in module_set:
+            stmt_index.add(module)
+
+        if ctx.opts.cache:
+            self.cache = GenerationCache(ctx)
 
         # Generate files from main modules
-        for module in filter(lambda s: s.keyword == 'module', module_set):
-            self.generate_from(module)
+        self.generate_modules([m for m in module_set if m.keyword == 'module'])
 
         # Generate files from augmented modules
-        for aug_module in augmented_modules.values():
-            self.generate_from(aug_module)
+        self.generate_modules(list(augmented_modules.values()))
+        if self.cache is not None and self.cache.stored:
+            self.cache.prune()
 
         # Print debug messages saying that we're done.
         if ctx.opts.debug or ctx.opts.verbose:
-            if not self.ctx.opts.no_classes:
+            if not ctx.opts.no_classes:
                 print('Java classes generation COMPLETE.')
-            if not self.ctx.opts.no_schema:
+            if not ctx.opts.no_schema:
                 print('Schema generation COMPLETE.')
+        if ctx.opts.incremental or ctx.opts.debug or ctx.opts.verbose:
+            print('%d files written, %d files unchanged.' %
+                  (write_stats['written'], write_stats['skipped']))
+        if ctx.opts.share_classes:
+            print('%d duplicate classes (%d bytes) shared.' %
+                  (shared_stats['classes'], shared_stats['bytes']))
+
+    def generate_manifest(self, modules, entries):
+        """Generates the files of each of the manifest entries from the
+        corresponding module in modules, with the output directory and options
+        of the entry.
+
+        """
+        ctx = self.ctx
+        opts = ctx.opts
+        try:
+            for module, (_, directory, values) in zip(modules, entries):
+                ctx.opts = copy.copy(opts)
+                ctx.opts.directory = directory
+                for dest, value in values.items():
+                    setattr(ctx.opts, dest, value)
+                self.setup_ctx(ctx)
+                self.reset_output()
+                self.generate([module])
+        finally:
+            ctx.opts = opts
+
+    def watch(self, modules, entries):
+        """Regenerates files when the YANG files of the modules in the context
+        change, until quit is read from stdin.
+
+        The modules stay parsed between changes. Only the modules in changed
+        files, and the modules that depend on them, are parsed again, and only
+        the files generated from these modules are generated again. The
+        commands read from stdin, one per line, are check (or an empty line)
+        to look for changed files at once, regenerate to parse and generate
+        everything again, and quit. The files are also checked every
+        watch_interval seconds. After a change that could not be parsed, all
+        modules are parsed again on the next change.
+
+        modules -- The modules given to pyang, or those of the manifest
+        entries -- The manifest entries, or None
+
+        """
+        ctx = self.ctx
+        mtimes = module_mtimes(ctx)
+        complete = True
+        fd = sys.stdin.fileno()
+        pending = b''
+        print('Watching %d files for changes.' % len(mtimes))
+        sys.stdout.flush()
+        while True:
+            commands = [None]  # Check for changed files, quietly
+            if select.select([fd], [], [], watch_interval)[0]:
+                data = os.read(fd, 4096)
+                if not data:
+                    break
+                lines = (pending + data).split(b'\n')
+                pending = lines.pop()
+                commands = [line.strip().decode('utf-8') for line in lines]
+            for command in commands:
+                if command in ('quit', 'exit'):
+                    return
+                elif command in (None, '', 'check', 'regenerate'):
+                    current = module_mtimes(ctx, mtimes)
+                    changed = set(ref for ref, mtime in current.items()
+                                  if mtimes.get(ref) != mtime)
+                    if command == 'regenerate' or (changed and not complete):
+                        changed = set(current)
+                    if changed:
+                        new_modules, reloaded, complete = self.reload(
+                            modules, changed)
+                        if new_modules is not None:
+                            modules = new_modules
+                            self.regenerate(modules, entries, reloaded)
+                        current.update(module_mtimes(ctx))
+                        mtimes = current
+                    elif command is not None:
+                        print('No changes.')
+                else:
+                    print('Unknown command "' + command + '", expected ' +
+                          'check, regenerate or quit.')
+                sys.stdout.flush()
+
+    def reload(self, modules, refs):
+        """Parses the modules in the files refs again, along with the modules
+        that depend on them. Returns the new statements of modules, the set of
+        names of the modules parsed again and whether they were all parsed
+        without errors.
+
+        The errors are printed. If there are errors and the ignore option is
+        not set, None is returned instead of the statements.
+
+        """
+        ctx = self.ctx
+        graph = ModuleGraph(ctx)
+        previous = set(ctx.modules.values())
+        changed = [m for m in ctx.modules.values() if m.pos.ref in refs]
+        affected = graph.dependents(changed)
+        reloaded = set(module.arg for module in affected)
+        # Files that could not be parsed before have no module in ctx
+        refs = [ref for ref in refs
+                if ref not in set(m.pos.ref for m in ctx.modules.values())]
+        complete = True
+        del ctx.errors[:]
+        for module in affected:
+            ctx.del_module(module)
+        # Forget the revisions, and parsed statements, that pyang has read
+        # from the repository for the modules, as it does when it starts
+        repository = ctx.repository.get_modules_and_revisions(ctx)
+        for name in reloaded:
+            revs = [(rev, handle) for (mod, rev, handle) in repository
+                    if mod == name]
+            if revs:
+                ctx.revs[name] = revs
+            else:
+                ctx.revs.pop(name, None)
+        added = {}
+        refs.extend(module.pos.ref for module in graph.topological_order(
+            affected) if module.keyword == 'module')
+        for ref in refs:
+            try:
+                with io.open(ref, encoding='utf-8') as f:
+                    text = f.read()
+            except (EnvironmentError, UnicodeDecodeError) as e:
+                print_warning(msg=(str(e) + '\n'))
+                complete = False
+                continue
+            module = ctx.add_module(ref, text)
+            if module is None:
+                complete = False
+            else:
+                added[module.arg] = module
+        reloaded.update(module.arg for module in ctx.modules.values()
+                        if module not in previous)
+        printed = set([])
+        for epos, etag, eargs in ctx.errors:
+            msg = str(epos) + ': ' + error.err_to_str(etag, eargs)
+            if msg not in printed:
+                printed.add(msg)
+                print(msg)
+            if error.is_error(error.err_level(etag)):
+                complete = False
+        if not complete and not ctx.opts.ignore:
+            print('Not regenerating, the modules contain errors.')
+            return None, reloaded, complete
+        res = []
+        for module in modules:
+            new_module = added.get(module.arg,
+                                   ctx.modules.get(module_key(module)))
+            if new_module is None:
+                print('Not regenerating, module "' + module.arg +
+                      '" not found.')
+                return None, reloaded, False
+            res.append(new_module)
+        return res, reloaded, complete
+
+    def regenerate(self, modules, entries, reloaded):
+        """Generates the files of the modules named in reloaded again, from
+        modules and their dependencies, or the manifest entries of the modules
+        that depend on them if entries is not None. Output archives are always
+        written as a whole, so all files of an archive are generated again,
+        and so are all files if there is a change manifest.
+
+        """
+        global stmt_index
+        stmt_index = StatementIndex(self.ctx)
+        clear_search_cache()
+        method_generators.clear()
+        augmented_modules.clear()
+        write_stats['written'] = write_stats['skipped'] = 0
+        shared_stats['classes'] = shared_stats['bytes'] = 0
+        if entries is not None:
+            graph = ModuleGraph(self.ctx)
+            archive = lambda entry: entry[2].get(
+                'output_archive', self.ctx.opts.output_archive)
+            stale = [(m, entry) for m, entry in zip(modules, entries)
+                     if any(dep.arg in reloaded
+                            for dep in graph.sources(m))]
+            archives = set(archive(entry) for _, entry in stale)
+            stale = [(m, entry) for m, entry in zip(modules, entries)
+                     if (m, entry) in stale or archive(entry) in archives
+                     and archive(entry) is not None
+                     or change_manifest is not None]
+            if stale:
+                self.generate_manifest(*zip(*stale))
+            close_output_archives()
+            if change_manifest is not None:
+                change_manifest.write(self.ctx.opts.delete_stale)
+            print('Regenerated ' + (', '.join(entry[0] for _, entry in stale)
+                                    or 'nothing') + '.')
+        else:
+            if self.ctx.opts.output_archive or change_manifest is not None:
+                reloaded = reloaded | set(m.arg for m in self.done)
+            for module in list(self.done):
+                if module.arg in reloaded:
+                    self.done.discard(module)
+                    package = self.module_package(module)[1]
+                    for key in list(class_hierarchy):
+                        if key == package or key.startswith(package + '.'):
+                            del class_hierarchy[key]
+            self.generate(modules)
+            close_output_archives()
+            if change_manifest is not None:
+                change_manifest.write(self.ctx.opts.delete_stale)
+            names = set(m.arg for m in self.done if m.arg in reloaded)
+            print('Regenerated ' + (', '.join(sorted(names)) or 'nothing') +
+                  ': %d files written, %d files unchanged.' %
+                  (write_stats['written'], write_stats['skipped']))
+
+    def manifest_modules(self, ctx, entries, modules):
+        """Returns the module statement of each of the manifest entries: the
+        one of modules, the modules given to pyang, with the name of the entry,
+        or else the latest revision of it that pyang has already parsed, or
+        else the one found in its module search path.
+
+        ctx.get_module is not used, since it returns the latest revision in
+        the search path, which need not be the one given to pyang.
+
+        """
+        given = dict((module.arg, module) for module in modules)
+        res = []
+        for name, _, _ in entries:
+            module = given.get(name)
+            if module is None:
+                parsed = [(rev, m) for (n, rev), m in ctx.modules.items()
+                          if n == name and m.keyword == 'module']
+                if parsed:
+                    module = max(parsed)[1]
+            if module is None:
+                module = ctx.search_module(error.Position(ctx.opts.manifest),
+                                           name)
+            if module is None:
+                raise error.EmitError(ctx.opts.manifest + ': module "' + name +
+                                      '" not found')
+            res.append(module)
+        return res
+
+    def reset_output(self):
+        """Forgets what was generated to the previous output directory, before
+        generating the files of the next manifest entry.
+
+        Only the state that depends on the output directory and options is
+        reset: the statement index keeps its other tables, and the search and
+        identifier caches are kept, since the modules are the same.
+
+        """
+        self.done = set([])
+        self.cache = None
+        augmented_modules.clear()
+        class_hierarchy.clear()
+        package_directories.clear()
+        method_generators.clear()
+        write_stats['written'] = write_stats['skipped'] = 0
+        shared_stats['classes'] = shared_stats['bytes'] = 0
+        stmt_index.forget(output_dependent_tables)
+
+    @profiled('module closure')
+    def module_closure(self, modules):
+        """Returns the list of modules and the modules that they import or
+        include, directly or indirectly, restricted to the include_modules
+        option if it is set, in topological order. The names of the modules
+        are recorded in the include_modules attribute of the context.
+
+        With the module_graph option, the graph of the modules is written next
+        to the output directory.
+
+        """
+        graph = ModuleGraph(self.ctx,
+                            names=self.ctx.opts.include_modules or None)
+        module_list = graph.closure(modules)
+        self.ctx.include_modules = set(module.arg for module in module_list)
+        if self.ctx.opts.module_graph:
+            graph.write(output_sibling(self.ctx, 'jnc-module-graph.' +
+                                       self.ctx.opts.module_graph), modules)
+        return graph.topological_order(module_list)
+
+    def generate_modules(self, modules):
+        """Generates files from each module in modules that has not already
+        been generated, in worker processes unless serial mode is on.
+
+        The class hierarchy of all modules is recorded before any files are
+        generated, so the result does not depend on the order in which the
+        modules, or the parts of them, are processed.
+
+        modules -- List of module statements to generate files from
+
+        """
+        modules = sorted(set(modules) - self.done,
+                         key=lambda m: (m.arg, util.get_latest_revision(m)))
+        if not self.ctx.opts.no_classes:
+            for module in modules:
+                self.class_generator(module).record_classes()
+
+        if self.cache is not None:
+            modules = [m for m in modules if not self.restore(m)]
+
+        tasks = []
+        if self.jobs() > 1:
+            tasks = self.tasks(modules)
+        if len(tasks) < 2:
+            for module in modules:
+                if self.cache is None:
+                    self.generate_from(module)
+                else:
+                    self.generate_cached(module)
+        else:
+            self.done.update(modules)
+            self.generate_parallel(modules, tasks)
+
+    def jobs(self):
+        """Returns the number of worker processes to generate files with"""
+        if (self.ctx.opts.serial or self.ctx.opts.low_memory
+                or self.ctx.opts.share_classes or not hasattr(os, 'fork')):
+            return 1
+        if self.ctx.opts.jobs:
+            return self.ctx.opts.jobs
+        return multiprocessing.cpu_count()
+
+    def tasks(self, modules):
+        """Returns a list of (index, part, child) tuples, each representing a
+        part of the files to generate from modules[index]. The files of the
+        parts are written in the order of the list, which is the order in
+        which generate_from writes them.
+
+        """
+        tasks = []
+        for i, module in enumerate(modules):
+            if not self.ctx.opts.no_classes:
+                tasks.append((i, 'classes', None))
+                generator = self.class_generator(module)
+                for j in range(len(generator.top_level_stmts())):
+                    tasks.append((i, 'child', j))
+                tasks.append((i, 'root', None))
+            if not self.ctx.opts.no_schema:
+                tasks.append((i, 'schema', None))
+        return tasks
+
+    def generate_parallel(self, modules, tasks):
+        """Generates files from modules by running tasks in a pool of forked
+        worker processes. The package-info files are generated here, from
+        package_directories, once all classes have been written.
+
+        The workers return the contents of the files instead of writing them,
+        and the files are written here in task order. Since classes generated
+        from groupings may be written more than once, this makes the output
+        identical to that of generate_from.
+
+        """
+        global _task_plugin, _recorded_writes
+        _task_plugin = self
+        self.task_modules = modules
+        self.task_module = None
+        self.task_writes = [[] for _ in modules]
+        pool = multiprocessing.Pool(min(self.jobs(), len(tasks)))
+        try:
+            results = self.write_results(pool.imap(_run_task, tasks))
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+            _task_plugin = None
+
+        if not self.ctx.opts.no_pkginfo:
+            for i, module in enumerate(modules):
+                if self.cache is not None:
+                    _recorded_writes = self.task_writes[i]
+                self.generate_pkginfo(module)
+            _recorded_writes = None
+
+        for result in results:
+            for key in result['augmented']:
+                augmented_modules[key[0]] = self.ctx.modules[key]
+
+        if self.cache is not None:
+            for i, module in enumerate(modules):
+                augmented = set([])
+                for result in results:
+                    if result['module'] == i:
+                        augmented.update(result['augmented'])
+                self.cache.store(module, self.task_writes[i], sorted(augmented))
+
+        if self.ctx.opts.debug or self.ctx.opts.verbose:
+            for module in modules:
+                print('pkg ' + self.module_package(module)[1] + ' generated')
+
+    def write_results(self, results):
+        """Writes the files of each task result in results, in order. Returns
+        the results as a list, without the file contents.
+
+        If the cache is used, the written files are recorded in the list of
+        task_writes of the module of each task.
+
+        """
+        global _recorded_writes
+        res = []
+        for result in results:
+            if self.cache is not None:
+                _recorded_writes = self.task_writes[result['module']]
+            for d, file_name, file_content in result.pop('files'):
+                write_file(d, file_name, file_content, self.ctx)
+            _recorded_writes = None
+            profile = result.pop('profile')
+            if profile is not None:
+                profiler.merge(profile)
+            res.append(result)
+        return res
+
+    def run_task(self, task):
+        """Generates the part of a module represented by task, which is one of
+        the tuples returned by tasks. Invoked in worker processes.
+
+        Returns a dict with the keys of the modules augmented by the task and
+        the files to write, as (directory, file name, content) tuples.
+
+        """
+        global _deferred_writes
+        _deferred_writes = []
+        augmented_modules.clear()
+        if profiler is not None:
+            profiler.reset()
+        i, part, child = task
+        module = self.task_modules[i]
+        if module is not self.task_module:
+            self.task_module = module
+            clear_search_cache()
+        if part == 'classes':
+            generator = self.class_generator(module)
+            generator.generate_typedefs()
+            generator.generate_groupings()
+        elif part == 'child':
+            generator = self.class_generator(module)
+            generator.generate_top_level(generator.top_level_stmts()[child])
+        elif part == 'root':
+            self.class_generator(module).generate_root_class()
+        elif part == 'schema':
+            self.generate_schema(module)
+        augmented = [module_key(m) for m in augmented_modules.values()]
+        files, _deferred_writes = _deferred_writes, None
+        stats = None
+        if profiler is not None:
+            stats = profiler.stats()
+            # The files are written, and profiled, by the parent process
+            stats['phases'].pop('write file', None)
+        return {'module': i, 'augmented': sorted(augmented), 'files': files,
+                'profile': stats}
+
+    def module_package(self, module):
+        """Returns the sub package and the full package name of the classes
+        generated from module.
+
+        """
+        subpkg = camelize(module.arg)
+        if self.ctx.rootpkg:
+            fullpkg = '.'.join([self.ctx.rootpkg, subpkg]).replace('/', '.')
+        else:
+            fullpkg = subpkg
+        return subpkg, fullpkg
+
+    def class_generator(self, module):
+        """Returns a ClassGenerator for the classes of module"""
+        subpkg, fullpkg = self.module_package(module)
+        src = ('module "' + module.arg + '", revision: "' +
+            util.get_latest_revision(module) + '".')
+        return ClassGenerator(module,
+            path=OSSep.join([self.ctx.opts.directory, subpkg]),
+            package=fullpkg, src=src, ctx=self.ctx)
 
     def generate_from(self, module):
         """Generates classes, schema file and pkginfo files for module,
@@ -309,49 +1117,238 @@ class JNCPlugin(plugin.PyangPlugin):
         if module in self.done:
             return
         self.done.add(module)
-        subpkg = camelize(module.arg)
-        if self.ctx.rootpkg:
-            fullpkg = '.'.join([self.ctx.rootpkg, subpkg]).replace('/', '.')
-        else:
-            fullpkg = subpkg
-        d = OSSep.join([self.d , subpkg])
-        if not self.ctx.opts.no_classes:
+        clear_search_cache()
+        shared_classes.clear()
+        if self.ctx.opts.share_classes and not self.ctx.opts.no_classes:
+            self.generate_shared_classes(module)
+        elif not self.ctx.opts.no_classes:
             # Generate Java classes
-            src = ('module "' + module.arg + '", revision: "' +
-                util.get_latest_revision(module) + '".')
-            generator = ClassGenerator(module,
-                path=OSSep.join([self.ctx.opts.directory, subpkg]),
-                package=fullpkg, src=src, ctx=self.ctx)
-            generator.generate()
+            self.class_generator(module).generate()
 
         if not self.ctx.opts.no_schema:
-            # Generate external schema
-            schema_nodes = ['<schema>']
-            stmts = search(module, node_stmts)
-            module_root = SchemaNode(module, '/', self.ctx)
-            schema_nodes.extend(module_root.as_list())
-            if self.ctx.opts.verbose:
-                print('Generating schema node "/"...')
-            schema_generator = SchemaGenerator(stmts, '/', self.ctx)
-            schema_nodes.extend(schema_generator.schema_nodes())
-            for i in range(1, len(schema_nodes)):
-                # Indent all but the first and last line
-                if schema_nodes[i] in ('<node>', '</node>'):
-                    schema_nodes[i] = ' ' * 4 + schema_nodes[i]
-                else:
-                    schema_nodes[i] = ' ' * 8 + schema_nodes[i]
-            schema_nodes.append('</schema>')
-
-            name = normalize(search_one(module, 'prefix').arg)
-            write_file(d, name + '.schema', '\n'.join(schema_nodes), self.ctx)
+            self.generate_schema(module)
 
         if not self.ctx.opts.no_pkginfo:
-            # Generate package-info.java for javadoc
-            pkginfo_generator = PackageInfoGenerator(d, module, self.ctx)
-            pkginfo_generator.generate_package_info()
+            self.generate_pkginfo(module)
 
         if self.ctx.opts.debug or self.ctx.opts.verbose:
-            print('pkg ' + fullpkg + ' generated')
+            print('pkg ' + self.module_package(module)[1] + ' generated')
+
+    def generate_shared_classes(self, module):
+        """Generates the classes of module, and writes them once all of them
+        have been generated, with the duplicates left out by share_classes.
+        The names of the classes left out are added to shared_classes.
+
+        """
+        global _deferred_writes
+        if self.ctx.opts.import_on_demand:
+            # Classes referred to by wildcard imports can not be replaced
+            print_warning(msg=('Option --jnc-share-classes has no effect ' +
+                'with --jnc-import-on-demand.\n'), key='share-classes')
+            self.class_generator(module).generate()
+            return
+        _deferred_writes = []
+        try:
+            self.class_generator(module).generate()
+            writes = _deferred_writes
+        finally:
+            _deferred_writes = None
+        writes, shared, saved = share_classes(writes)
+        for d, file_name, text in writes:
+            write_file(d, file_name, text, self.ctx)
+        shared_classes.update(shared)
+        shared_stats['classes'] += len(shared)
+        shared_stats['bytes'] += saved
+        if self.ctx.opts.debug or self.ctx.opts.verbose:
+            for name, canonical in sorted(shared.items()):
+                print('Class ' + name + ' shared with ' + canonical)
+
+    def generate_cached(self, module):
+        """Generates files from module with generate_from, and stores them and
+        the modules augmented by module in the cache.
+
+        """
+        global _recorded_writes
+        previous = dict(augmented_modules)
+        augmented_modules.clear()
+        _recorded_writes = []
+        try:
+            self.generate_from(module)
+            augmented = [module_key(m) for m in augmented_modules.values()]
+            files = _recorded_writes
+        finally:
+            _recorded_writes = None
+            augmented_modules.update(previous)
+        self.cache.store(module, files, sorted(augmented))
+
+    def restore(self, module):
+        """Writes the files generated from module in a previous run, if the
+        cache has an up to date entry for it.
+
+        Returns True if the files were restored from the cache.
+
+        """
+        entry = self.cache.lookup(module)
+        if entry is None:
+            return False
+        self.done.add(module)
+        for d, file_name, text in self.cache.files(entry):
+            write_file(d, file_name, text, self.ctx)
+        for key in entry['augmented']:
+            augmented_modules[key[0]] = self.ctx.modules[key]
+        if self.ctx.opts.debug or self.ctx.opts.verbose:
+            print('pkg ' + self.module_package(module)[1] +
+                  ' restored from cache')
+        return True
+
+    @profiled('schema')
+    def generate_schema(self, module):
+        """Generates the external schema of module, in the format of the
+        schema_format option: a file for each of the shards of schema_shards,
+        or Java classes. XML schema lines are written as they are generated.
+
+        """
+        name = get_metadata(module).root
+        d = OSSep.join([self.d, self.module_package(module)[0]])
+        if self.ctx.opts.schema_format == 'java':
+            self.generate_schema_classes(module, d)
+            return
+        for shard, nodes in enumerate(self.schema_shards(module)):
+            file_name = name if shard == 0 else name + '.' + str(shard)
+            if self.ctx.opts.schema_format == 'binary':
+                write_file(d, file_name + binary_schema_suffix,
+                           self.binary_schema(nodes), self.ctx)
+            else:
+                write_file(d, file_name + '.schema', self.schema_lines(nodes),
+                           self.ctx, final_newline=False)
+
+    def schema_nodes(self, module):
+        """Yields the SchemaNode of module and of each of its descendants, in
+        depth first order
+
+        """
+        yield SchemaNode(module, '/', self.ctx)
+        if self.ctx.opts.verbose:
+            print('Generating schema node "/"...')
+        schema_generator = SchemaGenerator(search(module, node_stmts), '/',
+                                           self.ctx)
+        for node in schema_generator.schema_nodes():
+            yield node
+
+    def schema_shards(self, module):
+        """Returns a list of iterables of the SchemaNodes of the shards of the
+        schema of module, each in depth first order.
+
+        With the lazy_schema option, the first shard holds the node of module
+        itself, which is registered up front, and each of the others the
+        subtree of one of the top level nodes, which are registered when first
+        looked up. Otherwise, all nodes are in a single shard.
+
+        """
+        if not self.ctx.opts.lazy_schema:
+            return [self.schema_nodes(module)]
+        shards = [[SchemaNode(module, '/', self.ctx)]]
+        for stmt in search(module, node_stmts):
+            shards.append(SchemaGenerator([stmt], '/', self.ctx).schema_nodes())
+        return shards
+
+    def schema_lines(self, schema_nodes):
+        """Yields the lines of an external schema file of schema_nodes,
+        indenting the "node" elements as they are generated.
+
+        """
+        yield '<schema>'
+        node_indent = ' ' * 4
+        content_indent = ' ' * 8
+        for schema_node in schema_nodes:
+            node = schema_node.as_list()
+            last = len(node) - 1
+            yield node_indent + node[0]  # <node>
+            for i in range(1, last):
+                yield content_indent + node[i]
+            yield node_indent + node[last]  # </node>
+        yield '</schema>'
+
+    def binary_schema(self, schema_nodes):
+        """Returns the content of a binary schema file of schema_nodes"""
+        encoder = BinarySchemaEncoder()
+        res = [encoder.header()]
+        for schema_node in schema_nodes:
+            res.append(encoder.node(schema_node.fields()))
+        res.append(encoder.end())
+        return b''.join(res)
+
+    def generate_schema_classes(self, module, d):
+        """Generates the schema of module as Java classes in directory d.
+
+        The schema nodes are added to the schema table by the register methods
+        of the classes <root>Schema1, <root>Schema2, ..., each with at most
+        schema_nodes_per_class nodes of a single shard, to stay within the size
+        limits of the JVM on methods and constant pools. These are called in
+        turn by the register method of the class <root>Schema, which takes the
+        number of the shard to register with the lazy_schema option. See
+        ClassGenerator.schema_class_name for when <root> is followed by
+        underscores.
+
+        """
+        metadata = get_metadata(module)
+        name = self.class_generator(module).schema_class_name()
+        package = self.module_package(module)[1]
+        src = ('module "' + module.arg + '", revision: "' +
+            util.get_latest_revision(module) + '".')
+        shard_parts = []
+        parts = 0
+        for nodes in self.schema_shards(module):
+            nodes = iter(nodes)
+            shard_parts.append([])
+            while True:
+                chunk = list(itertools.islice(nodes, schema_nodes_per_class))
+                if not chunk:
+                    break
+                parts += 1
+                shard_parts[-1].append(parts)
+                java_class = JavaClass(filename=name + str(parts) + '.java',
+                        package=package, description=('Part ' + str(parts) +
+                            ' of the schema of module ' + module.arg +
+                            ', registered by ' + name + '.'),
+                        source=src)
+                reg = schema_register_method(java_class)
+                for schema_node in chunk:
+                    reg.add_line(schema_node_registration(schema_node))
+                java_class.add_schema_registrator(reg)
+                write_file(d, java_class.filename, java_class.lines(),
+                           self.ctx)
+        java_class = JavaClass(filename=name + '.java', package=package,
+                description=('The schema of module ' + module.arg +
+                    ' (namespace ' + metadata.namespace + '), registered ' +
+                    '\n * in the schema table by ' + metadata.root +
+                    '.registerSchema().'),
+                source=src)
+        if self.ctx.opts.lazy_schema:
+            reg = schema_register_method(java_class, sharded=True)
+            reg.add_line('switch (shard) {')
+            for shard, shard_part_numbers in enumerate(shard_parts):
+                reg.add_line('case ' + str(shard) + ':')
+                for part in shard_part_numbers:
+                    reg.add_line('    ' + name + str(part) + '.register(h);')
+                reg.add_line('    break;')
+            reg.add_line('}')
+        else:
+            reg = schema_register_method(java_class)
+            for part in range(1, parts + 1):
+                reg.add_line(name + str(part) + '.register(h);')
+        java_class.add_schema_registrator(reg)
+        write_file(d, java_class.filename, java_class.lines(), self.ctx)
+
+    @profiled('package info')
+    def generate_pkginfo(self, module):
+        """Generates package-info.java files for javadoc, for the packages of
+        module.
+
+        """
+        d = OSSep.join([self.d, self.module_package(module)[0]])
+        pkginfo_generator = PackageInfoGenerator(d, module, self.ctx)
+        pkginfo_generator.generate_package_info()
 
     def fatal(self, exitCode=1):
         """Raise an EmitError"""
@@ -482,6 +1479,10 @@ node_stmts = module_stmts | yangelement_stmts | leaf_stmts
 """Keywords of statements that make up a configuration tree"""
 
 
+edge_extensions = frozenset(['has-edge', 'ref-edge'])
+"""Names of the csp-common extensions that mark references to other vertices"""
+
+
 package_info = '''/**
  * This class hierarchy was generated from the Yang module{0}
  * by the <a target="_top" href="https://github.com/tail-f-systems/JNC">JNC</a> plugin of <a target="_top" href="http://code.google.com/p/pyang/">pyang</a>.
@@ -509,72 +1510,1173 @@ augmented_modules = {}
 """A dict of external modules that are augmented by the YANG module"""
 
 
-camelized_stmt_args = {}
-"""Cache containing camelized versions of statement identifiers"""
+class LRUCache(object):
+    """A mapping holding at most about maxsize items, dropping the least
+    recently used ones first.
 
+    Items are added to the current generation. When it holds maxsize / 2
+    items, it becomes the previous generation and the items of the old
+    previous generation are dropped. Looking up an item of the previous
+    generation moves it to the current one. Unlike an exact LRU list, this
+    keeps the common case, a lookup in the current generation, as cheap as a
+    plain dict lookup.
+
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.current = {}
+        self.previous = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """Returns the value of key, or default if there is none. The outcome
+        is counted in the hits and misses attributes.
+
+        """
+        try:
+            value = self.current[key]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            return value
+        try:
+            value = self.previous.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        if len(self.current) >= self.maxsize // 2:
+            self.previous = self.current
+            self.current = {}
+        self.current[key] = value
+
+    def __len__(self):
+        return len(self.current) + len(self.previous)
+
+    def clear(self):
+        self.current.clear()
+        self.previous.clear()
+
+
+low_memory_cache_size = 10000
+"""Maximum size of the search_results, search_tables and method_generators
+caches in low memory mode, see bound_caches"""
+
+
+manifest_options = frozenset(['cache', 'classpath_schema_loading',
+                              'import_on_demand', 'include_modules',
+                              'incremental', 'lazy_schema', 'module_graph',
+                              'no_classes', 'no_pkginfo', 'no_schema',
+                              'output_archive', 'schema_format',
+                              'share_classes'])
+"""Destinations of the options that can be set per module in a manifest
+file, see read_manifest"""
+
+
+watch_interval = 1.0
+"""Number of seconds between the checks for changed YANG files in watch mode,
+see JNCPlugin.watch"""
+
+
+output_dependent_tables = frozenset(['package', 'types', 'uses package',
+                                     'uses path'])
+"""Tables of the statement index with values that depend on the output
+directory, which are reset between the modules of a manifest file"""
+
+
+schema_int_fields = frozenset(['primitive_type', 'yang_graph_type',
+                               'min_occurs', 'max_occurs', 'flags'])
+"""Tags of the schema node fields with integer values"""
+
+
+binary_schema_suffix = '.schema.bin'
+"""Suffix of the schema files written with --jnc-schema-format binary"""
+
+
+schema_nodes_per_class = 1000
+"""Maximum number of schema nodes registered by each class generated with
+--jnc-schema-format java. Each node takes about 50 bytes of the 64 KB that the
+JVM allows for the code of a method."""
+
+
+class_hierarchy = {}
+"""Dict that map package names to sets of names of classes to be generated"""
+
+
+method_generators = {}
+"""Dict that map statements to their MethodGenerator, see method_generator"""
+
+
+search_results = {}
+"""Dict that map (statement, keywords) pairs to the results of search"""
+
+
+search_tables = {}
+"""Dict that map (statement, bypass, substmts) to lists of children, see
+search_table"""
+
+
+created_directories = set([])
+"""Set of directories that write_file has created or found to exist"""
+
+
+package_directories = {}
+"""Dict that map the normalized paths of the directories that write_file has
+written files to, and of their parent directories, to sets of the names of
+their subdirectories. Used to find the packages to generate package-info files
+for, see register_package."""
+
+
+write_stats = {'written': 0, 'skipped': 0}
+"""Number of files written and skipped (since unchanged) by write_file"""
 
-normalized_stmt_args = {}
-"""Cache containing normalized versions of statement identifiers"""
 
+shared_stats = {'classes': 0, 'bytes': 0}
+"""Number of classes, and their total size, left out by share_classes"""
+
+
+shared_classes = {}
+"""Dict that map the qualified names of the classes of the current module that
+share_classes left out to the names of the classes used instead"""
+
+
+_task_plugin = None
+"""JNCPlugin instance that runs the tasks of forked worker processes"""
+
+
+_deferred_writes = None
+"""List of (directory, file name, content) tuples that write_file appends to
+instead of writing files, if not None. Used by worker processes."""
+
+
+_recorded_writes = None
+"""List of (directory, file name, text) tuples that write_file appends to in
+addition to writing files, if not None. Used to fill the generation cache."""
+
+
+output_archives = {}
+"""Dict that map the paths given with --jnc-output-archive to the
+OutputArchive that write_file adds files to, see close_output_archives"""
+
+
+archive_date_time = (1980, 1, 1, 0, 0, 0)
+"""Modification time of all entries of an output archive, the earliest that
+the zip format supports"""
+
+
+stmt_index = None
+"""StatementIndex consulted by the functions decorated with indexed"""
+
+
+change_manifest = None
+"""ChangeManifest that write_file records the generated files in, if the
+change_manifest option is set"""
+
+
+profiler = None
+"""Profiler recording the calls of the functions decorated with profiled, if
+the profile option is set"""
+
+
+def _run_task(task):
+    """Runs task in a worker process, see JNCPlugin.generate_parallel"""
+    return _task_plugin.run_task(task)
+
+
+def print_warning(msg='', key='', ctx=None):
+    """Prints msg to stderr if ctx is None or the debug or verbose flags are
+    set in context ctx and key is empty or not in outputted_warnings. If key is
+    not empty and not in outputted_warnings, it is added to it. If msg is empty
+    'No support for type "' + key + '", defaulting to string.' is printed.
+
+    """
+    if ((not key or key not in outputted_warnings) and
+        (not ctx or ctx.opts.debug or ctx.opts.verbose)):
+        if msg:
+            sys.stderr.write('WARNING: ' + msg)
+            if key:
+                outputted_warnings.append(key)
+        else:
+            print_warning(('No support for type "' + key + '", defaulting ' +
+                'to string.'), key, ctx)
+
+
+@profiled('write file')
+def write_file(d, file_name, file_content, ctx, final_newline=True):
+    """Creates the directory d if it does not yet exist and writes a file to it
+    named file_name with file_content in it.
+
+    file_content is either a string or an iterable of lines, each of which is
+    followed by a newline, except for the last one if final_newline is False.
+
+    In incremental mode, the file is only written if its content differs from
+    that of the existing file, so that its modification time is preserved.
+    The outcome is counted in write_stats. With --jnc-output-archive, the file
+    is added to the OutputArchive of output_archives instead. The file is
+    recorded in change_manifest, if any.
+
+    """
+    if _deferred_writes is not None:
+        if not final_newline:
+            file_content = file_text(file_content, final_newline)
+        elif not isinstance(file_content, basestring):
+            file_content = list(file_content)
+        _deferred_writes.append((d, file_name, file_content))
+        return
+    #d = d.replace('.', OSSep)
+    archive = None
+    if ctx.opts.output_archive:
+        archive = output_archives.get(ctx.opts.output_archive)
+        if archive is None:
+            archive = output_archives[ctx.opts.output_archive] = \
+                OutputArchive(ctx.opts.output_archive, ctx.opts.incremental)
+        register_package(d)
+    elif d not in created_directories:
+        try:
+            os.makedirs(d, 0o777)
+        except OSError as exc:
+            if exc.errno == errno.EEXIST:
+                pass  # The directory already exists
+            else:
+                raise
+        if not os.path.isdir(d):
+            print_warning(msg=('Unable to change directory to ' + d +
+                '. Probably a non-directory file with same name as one of ' +
+                'the subdirectories already exists.'), key=d, ctx=ctx)
+        created_directories.add(d)
+        register_package(d)
+    path = d + OSSep + file_name
+    text = None
+    if (ctx.opts.incremental or _recorded_writes is not None
+            or archive is not None or change_manifest is not None):
+        text = file_text(file_content, final_newline)
+    if _recorded_writes is not None:
+        _recorded_writes.append((d, file_name, text))
+    if change_manifest is not None:
+        if archive is not None:
+            change_manifest.add(archive_name(ctx, path), text, archived=True)
+        else:
+            change_manifest.add(path, text)
+    if archive is not None:
+        archive.add(archive_name(ctx, path), text)
+        write_stats['written'] += 1
+        return
+    if ctx.opts.incremental:
+        if content_digest(text) == file_digest(path):
+            write_stats['skipped'] += 1
+            return
+    if ctx.opts.verbose:
+        print('Writing file to: ' + os.path.realpath(d) + OSSep + file_name)
+    mode = 'wb+' if file_name.endswith(binary_schema_suffix) else 'w+'
+    with open(path, mode) as f:
+        if text is not None:
+            f.write(text)
+        elif isinstance(file_content, basestring):
+            f.write(file_content)
+        else:
+            f.writelines(file_lines(file_content, final_newline))
+    write_stats['written'] += 1
+
+
+class OutputArchive(object):
+    """Zip file that write_file adds the generated files to with
+    --jnc-output-archive, instead of writing them to the output directory.
+
+    The entries are kept compressed in memory and written by close, sorted by
+    name and with the same time and permissions, so the archive only depends
+    on the generated files. Like in the output directory, a file that is
+    written twice gets the content written last.
+
+    """
+
+    def __init__(self, path, incremental=False):
+        """Creates an empty archive to be written to path. If incremental is
+        True, an existing archive with the same content is not rewritten.
+
+        """
+        self.path = path
+        self.incremental = incremental
+        self.entries = {}
+
+    def add(self, name, text):
+        """Adds the file called name, with the string text, to the archive"""
+        if not isinstance(text, bytes):
+            text = text.encode('utf-8')
+        self.entries[name] = zlib.compress(text, 1)
+
+    def close(self):
+        """Writes the archive to its path"""
+        buf = io.BytesIO()
+        archive = zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED,
+                                  allowZip64=True)
+        for name in sorted(self.entries):
+            info = zipfile.ZipInfo(name, date_time=archive_date_time)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.create_system = 3  # Unix, for the permissions
+            info.external_attr = 0o644 << 16
+            archive.writestr(info, zlib.decompress(self.entries[name]))
+        archive.close()
+        content = buf.getvalue()
+        if self.incremental and content_digest(content) == file_digest(
+                self.path):
+            return
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory, 0o777)
+        with open(self.path, 'wb') as f:
+            f.write(content)
+
+
+def close_output_archives():
+    """Writes and forgets the archives in output_archives"""
+    for path in sorted(output_archives):
+        output_archives.pop(path).close()
+
+
+def archive_name(ctx, path):
+    """Returns the name of the file at path in the output archive: its path,
+    with / separators, relative to the directory above the root package of
+    ctx, such as src
+
+    """
+    root = os.path.normpath(ctx.opts.directory)
+    for _ in filter(None, ctx.rootpkg.split('/')):
+        root = os.path.dirname(root)
+    name = os.path.relpath(os.path.normpath(path), root or os.curdir)
+    return name.replace(os.sep, '/')
+
+
+class ChangeManifest(object):
+    """JSON file listing the files generated by a run with their SHA-1 digests
+    and their status compared to the previous run: added, changed, unchanged
+    or removed. Build tools can read it to only compile the changed files.
+
+    The paths are relative to the directory of the manifest, with /
+    separators. Files written to an output archive are listed by their names
+    in the archive instead, and are never deleted.
+
+    """
+
+    def __init__(self, path):
+        """Reads the files of the previous run from the manifest at path, if
+        there is one.
+
+        """
+        self.path = path
+        self.base = os.path.dirname(os.path.abspath(path))
+        self.files = {}  # Name -> digest
+        self.archived = set()
+        self.previous = {}
+        try:
+            with open(path) as f:
+                data = json.load(f, object_hook=_decode_dict)
+        except (EnvironmentError, ValueError):
+            return
+        for entry in data.get('files', []):
+            if entry.get('status') != 'removed':
+                self.previous[entry['path']] = entry
+                if entry.get('archived'):
+                    self.archived.add(entry['path'])
+
+    def add(self, path, text, archived=False):
+        """Records the file at path, or the entry called path of an output
+        archive if archived is True, with content text. The content written
+        last counts, as in the output directory.
+
+        """
+        if archived:
+            self.archived.add(path)
+        else:
+            path = os.path.relpath(os.path.abspath(path), self.base)
+            path = path.replace(os.sep, '/')
+        self.files[path] = content_digest(text)
+
+    def entries(self):
+        """Returns the entries of the manifest, sorted by path"""
+        res = []
+        for path in sorted(set(self.files) | set(self.previous)):
+            entry = {'path': path}
+            if path in self.archived:
+                entry['archived'] = True
+            digest = self.files.get(path)
+            previous = self.previous.get(path, {}).get('sha1')
+            if digest is None:
+                entry.update(sha1=previous, status='removed')
+            elif previous is None:
+                entry.update(sha1=digest, status='added')
+            elif digest != previous:
+                entry.update(sha1=digest, status='changed')
+            else:
+                entry.update(sha1=digest, status='unchanged')
+            res.append(entry)
+        return res
+
+    def write(self, delete_stale=False):
+        """Writes the manifest, and deletes the files that were generated by
+        the previous run but not by this one if delete_stale is True. The
+        files recorded so far become those of the previous run.
+
+        """
+        entries = self.entries()
+        if delete_stale:
+            paths = [self.full_path(entry['path']) for entry in entries
+                     if not entry.get('archived')]
+            # The directory of all files, which is never deleted
+            root = os.path.dirname(os.path.commonprefix(
+                [os.path.dirname(path) + os.sep for path in paths]))
+            for entry in entries:
+                if entry['status'] == 'removed' and not entry.get('archived'):
+                    self.delete(self.full_path(entry['path']), root)
+            # write_file must create the deleted directories again
+            created_directories.difference_update(
+                [d for d in created_directories if not os.path.isdir(d)])
+        d = os.path.dirname(self.path)
+        if d and not os.path.isdir(d):
+            os.makedirs(d, 0o777)
+        with open(self.path, 'w') as f:
+            json.dump({'files': entries}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        self.previous = dict((entry['path'], entry) for entry in entries
+                             if entry['status'] != 'removed')
+        self.archived &= set(self.previous)
+        self.files = {}
+
+    def full_path(self, path):
+        """Returns the absolute path of the file at path, relative to the
+        directory of the manifest with / separators.
+
+        """
+        return os.path.normpath(os.path.join(self.base, *path.split('/')))
+
+    def delete(self, path, root):
+        """Deletes the file at path, and the directories that this leaves
+        empty below the directory root.
+
+        """
+        try:
+            os.remove(path)
+        except OSError as exc:
+            if exc.errno != errno.ENOENT:
+                raise
+        d = os.path.dirname(path)
+        while d.startswith(root + os.sep):
+            try:
+                os.rmdir(d)
+            except OSError:
+                break  # Not empty
+            d = os.path.dirname(d)
+
+
+def schema_register_method(java_class, sharded=False):
+    """Returns the empty static register method of a class generated with
+    --jnc-schema-format java, which adds schema nodes to a schema table. If
+    sharded is True, the method takes the number of a shard of the schema
+    to add as its first parameter.
+
+    """
+    reg = JavaMethod(return_type='void', name='register')
+    reg.modifiers = ['public', 'static']
+    class_name = java_class.filename.split('.')[0]
+    if sharded:
+        reg.add_javadoc('Adds the schema nodes of shard number shard of ' +
+                        class_name + ' to the schema table h')
+        reg.parameters.add('int shard')
+    else:
+        reg.add_javadoc('Adds the schema nodes of ' + class_name +
+                        ' to the schema table h')
+    reg.parameters.add('HashMap<Tagpath, SchemaNode> h')
+    reg.add_dependency('java.util.HashMap')
+    reg.add_dependency('com.tailf.jnc.SchemaNode')
+    reg.add_dependency('com.tailf.jnc.SchemaTree')
+    reg.add_dependency('com.tailf.jnc.Tagpath')
+    return reg
+
+
+def schema_node_registration(schema_node):
+    """Returns the Java statement that adds schema_node to the schema table h
+    in the register methods of the classes generated with
+    --jnc-schema-format java
+
+    """
+    values = dict(schema_node.fields())
+    args = ['h']
+    for tag in ('tagpath', 'namespace', 'primitive_type', 'yang_node_type',
+                'yang_type', 'yang_java_type', 'mapping_path',
+                'yang_graph_type', 'min_occurs', 'max_occurs', 'children',
+                'yang_children', 'flags', 'desc'):
+        value = values.get(tag)
+        if tag in schema_int_fields:
+            args.append(value)
+        else:
+            args.append(java_string_literal(value))
+    return 'SchemaTree.add(' + ', '.join(args) + ');'
+
+
+java_escapes = {'\b': '\\b', '\t': '\\t', '\n': '\\n', '\f': '\\f',
+                '\r': '\\r'}
+"""Escape sequences of the control characters that Java has them for"""
+
+
+def java_string_literal(value):
+    """Returns value as a Java string literal, or null if value is None.
+    Control characters are written as escape sequences, such as \\n, and the
+    other characters outside of printable ASCII as unicode escapes. javac
+    translates unicode escapes before reading literals, so a line break would
+    end the literal if written as a unicode escape.
+
+    """
+    if value is None:
+        return 'null'
+    if isinstance(value, bytes):
+        value = value.decode('utf-8')
+    res = ['"']
+    for character in value:
+        if character in '"\\':
+            res.append('\\' + character)
+        elif ' ' <= character <= '~':
+            res.append(character)
+        elif character < ' ':
+            res.append(java_escapes.get(character,
+                                        '\\%03o' % ord(character)))
+        else:
+            code = ord(character)
+            if code > 0xffff:  # Surrogate pair
+                code -= 0x10000
+                res.append('\\u%04x' % (0xd800 + (code >> 10)))
+                code = 0xdc00 + (code & 0x3ff)
+            res.append('\\u%04x' % code)
+    res.append('"')
+    return ''.join(res)
+
+
+def register_package(d):
+    """Adds directory d, and its parent directories, to package_directories"""
+    d = os.path.normpath(d)
+    child = None
+    while True:
+        children = package_directories.get(d)
+        registered = children is not None
+        if not registered:
+            children = package_directories[d] = set([])
+        if child is not None:
+            children.add(child)
+        if registered or OSSep not in d:
+            break
+        d, _, child = d.rpartition(OSSep)
+
+
+def file_text(file_content, final_newline=True):
+    """Returns the string that write_file writes to file for file_content,
+    which is either a string or an iterable of lines.
+
+    """
+    if isinstance(file_content, basestring):
+        return file_content
+    return ''.join(file_lines(file_content, final_newline))
+
+
+def file_lines(lines, final_newline=True):
+    """Yields each line of the iterable lines followed by a newline, except
+    for the last one if final_newline is False.
+
+    """
+    lines = iter(lines)
+    try:
+        previous = next(lines)
+    except StopIteration:
+        return
+    for line in lines:
+        yield previous + '\n'
+        previous = line
+    yield previous + '\n' if final_newline else previous
+
+
+@profiled('shared classes')
+def share_classes(writes):
+    """Returns writes, a list of (directory, file name, content) tuples of
+    the files generated from a module, with only one class of each set of
+    structurally identical classes and the other classes referring to it.
+    Also returns a dict that map the qualified names of the classes left out
+    to those of the classes used instead, and the total size of the classes
+    left out. The files are returned as (directory, file name, text) tuples.
+
+    Classes are structurally identical if they have the same name and the
+    same content apart from their package, their imports, their file comment
+    and their class javadoc, which describe where they come from, and if the
+    generated classes they refer to are structurally identical. The class
+    used is the one with the shortest package, and the first in alphabetical
+    order of those. Files written more than once only count with their last
+    content, as on disk.
+
+    """
+    files = collections.OrderedDict()
+    for d, file_name, content in writes:
+        path = os.path.normpath(d + OSSep + file_name)
+        files.pop(path, None)
+        files[path] = (d, file_name, file_text(content))
+    classes = {}  # Qualified name -> (path, lines, package line index)
+    for path, (_, file_name, text) in files.items():
+        if file_name.endswith('.java') and file_name != 'package-info.java':
+            lines = text.split('\n')
+            for i, line in enumerate(lines):
+                if line.startswith('package '):
+                    name = line[8:-1] + '.' + file_name[:-5]
+                    classes[name] = (path, lines, i)
+                    break
+    prefix = os.path.commonprefix(list(classes)).rpartition('.')[0]
+
+    def replace_names(line, replace):
+        """Returns line with the qualified class names in it replaced"""
+        if prefix not in line:
+            return line
+        return re.sub(r'[A-Za-z_][\w.-]*', lambda m: replace(m.group(0)), line)
+
+    digests = {}
+
+    def digest(name):
+        """Returns the digest of the structure of the class called name, or
+        name itself if it refers to a class that refers back to it
+
+        """
+        if name not in classes:
+            return name
+        if name in digests:
+            return digests[name] or name
+        digests[name] = None
+        _, lines, package = classes[name]
+        imports, body = [], [name.rpartition('.')[2]]
+        javadoc = False
+        # The file comment and class javadoc only describe the origin
+        for line in lines[package + 1:]:
+            if javadoc or line == '/**':
+                javadoc = line != ' */'
+            elif line.startswith('import '):
+                imports.append(digest(line[7:-1]))
+            else:
+                body.append(replace_names(line, digest))
+        res = digests[name] = content_digest('\n'.join(sorted(imports) +
+                                                         body))
+        return res
+
+    identical = collections.defaultdict(list)
+    for name in classes:
+        identical[digest(name)].append(name)
+    shared = {}
+    for names in identical.values():
+        canonical = min(names, key=lambda name: (name.count('.'), name))
+        for name in names:
+            if name != canonical:
+                shared[name] = canonical
+    left_out = set(classes[name][0] for name in shared)
+
+    res = []
+    saved = 0
+    for path, (d, file_name, text) in files.items():
+        if path in left_out:
+            saved += len(text)
+            continue
+        res.append((d, file_name, text))
+    if not shared:
+        return res, shared, saved
+    replace = lambda name: shared.get(name, name)
+    for i, (d, file_name, text) in enumerate(res):
+        if prefix not in text or not file_name.endswith('.java'):
+            continue
+        lines = text.split('\n')
+        imports = []
+        start = end = None
+        for j, line in enumerate(lines):
+            if line.startswith('package ') and start is None:
+                start = j + 1
+            elif line.startswith('import '):
+                imports.append(replace(line[7:-1]))
+                end = j + 1
+            elif line == '/**' and start is not None:
+                break
+        block = []
+        prevpkg = ''
+        imports = set(imports) - set([name for name in imports
+                                      if name.endswith('.' + file_name[:-5])])
+        for import_ in sorted(imports):
+            basepkg = import_[:import_.find('.')]
+            if basepkg != prevpkg:
+                block.append('')
+            block.append('import ' + import_ + ';')
+            prevpkg = basepkg
+        if end is None:
+            end = start
+        lines[start:end] = block
+        res[i] = (d, file_name, '\n'.join(
+            replace_names(line, replace) for line in lines))
+    return res, shared, saved
+
+
+def content_digest(content):
+    """Returns the SHA-1 hex digest of the string content, as written to file
+    by write_file.
+
+    """
+    if not isinstance(content, bytes):
+        content = content.encode('utf-8')
+    return hashlib.sha1(content).hexdigest()
+
+
+def file_digest(path):
+    """Returns the SHA-1 hex digest of the content of the file at path, or
+    None if there is no such file.
+
+    """
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except IOError:
+        return None
+
+
+def module_key(module):
+    """Returns the (name, revision) key of module in the modules of the
+    context.
+
+    """
+    return (module.arg, util.get_latest_revision(module))
+
+
+def module_mtimes(ctx, refs=()):
+    """Returns a dict that map the files of the modules of ctx, and the files
+    refs, to their modification times, or to None for files that do not exist
+
+    """
+    res = {}
+    for ref in itertools.chain(refs,
+                               (m.pos.ref for m in ctx.modules.values())):
+        try:
+            res[ref] = os.stat(ref).st_mtime
+        except EnvironmentError:
+            res[ref] = None
+    return res
+
+
+class ModuleGraph(object):
+    """Graph of the modules of a context, with an edge from each module to
+    the modules that it imports or includes.
+
+    The edges of a module are found the first time they are needed, with a
+    single lookup of each imported or included name in an index of the
+    modules of the context by name. Every revision of a module with that name
+    is a target of the edge.
+
+    """
+
+    def __init__(self, ctx, names=None):
+        """Creates the graph of the modules of ctx. If names is not None,
+        only edges to modules with one of those names are included.
+
+        """
+        self.names = None if names is None else set(names)
+        self.by_name = collections.defaultdict(list)
+        for (name, _), module in sorted(ctx.modules.items()):
+            self.by_name[name].append(module)
+        self.edges = {}
+        self.augmenter_sets = None
+        self.reverse_edges = None
+
+    def dependencies(self, module):
+        """Returns the list of (keyword, module) edges of module, where
+        keyword is import or include
+
+        """
+        res = self.edges.get(module)
+        if res is None:
+            res = self.edges[module] = []
+            for keyword in ('import', 'include'):
+                for sub in search(module, keyword):
+                    if self.names is None or sub.arg in self.names:
+                        for dep in self.by_name.get(sub.arg, ()):
+                            res.append((keyword, dep))
+        return res
+
+    def augmenters(self, module):
+        """Returns the set of modules augmenting or deviating nodes of module
+        (or of any module with the same name)
+
+        """
+        if self.augmenter_sets is None:
+            self.augmenter_sets = collections.defaultdict(set)
+            for modules in self.by_name.values():
+                for stmt in modules:
+                    for keyword in ('augment', 'deviation'):
+                        for sub in stmt.search(keyword):
+                            target = getattr(sub, 'i_target_node', None)
+                            if target is not None:
+                                self.augmenter_sets[
+                                    get_module(target).arg].add(stmt)
+        return self.augmenter_sets.get(module.arg, set([]))
+
+    def sources(self, module):
+        """Returns the list of modules whose statements the files generated
+        from module depend on: module, the modules augmenting it and all
+        modules reachable from these
+
+        """
+        return self.closure([module] + list(self.augmenters(module)))
+
+    def closure(self, modules):
+        """Returns the list of modules and the modules reachable from them,
+        in breadth first order
+
+        """
+        return self.reachable(modules, lambda module: (
+            dep for _, dep in self.dependencies(module)))
+
+    def dependents(self, modules):
+        """Returns the list of modules and the modules whose generated files
+        depend on them, directly or indirectly: the modules importing or
+        including them and the modules augmented or deviated by them, in
+        breadth first order
+
+        """
+        if self.reverse_edges is None:
+            self.reverse_edges = collections.defaultdict(list)
+            for _, same_name in sorted(self.by_name.items()):
+                for module in same_name:
+                    for _, dep in self.dependencies(module):
+                        self.reverse_edges[dep].append(module)
+                    for augmenter in self.augmenters(module):
+                        self.reverse_edges[augmenter].append(module)
+        return self.reachable(modules, lambda module: (
+            self.reverse_edges.get(module, ())))
+
+    def reachable(self, modules, neighbours):
+        """Returns the list of modules and the modules reachable from them
+        through the neighbours function, in breadth first order"""
+        res = []
+        seen = set([])
+        pending = collections.deque()
+        for module in modules:
+            if module not in seen:
+                seen.add(module)
+                pending.append(module)
+        while pending:
+            module = pending.popleft()
+            res.append(module)
+            for dep in neighbours(module):
+                if dep not in seen:
+                    seen.add(dep)
+                    pending.append(dep)
+        return res
+
+    def topological_order(self, modules):
+        """Returns the list of modules and the modules reachable from them,
+        each after the modules it depends on. Edges closing a cycle are
+        ignored.
+
+        """
+        res = []
+        state = {}  # False while visiting the dependencies, then True
+        for root in modules:
+            if root in state:
+                continue
+            state[root] = False
+            stack = [(root, iter(self.dependencies(root)))]
+            while stack:
+                module, deps = stack[-1]
+                for _, dep in deps:
+                    if dep not in state:
+                        state[dep] = False
+                        stack.append((dep, iter(self.dependencies(dep))))
+                        break
+                else:
+                    stack.pop()
+                    state[module] = True
+                    res.append(module)
+        return res
+
+    def as_json(self, modules):
+        """Returns a dict of the modules reachable from modules, in
+        topological order, with their edges and whether they were requested
+
+        """
+        requested = set(modules)
+        res = []
+        for module in self.topological_order(modules):
+            name, revision = module_key(module)
+            res.append({'name': name, 'revision': revision,
+                        'keyword': module.keyword,
+                        'requested': module in requested,
+                        'dependencies': [
+                            {'keyword': keyword, 'name': dep.arg,
+                             'revision': util.get_latest_revision(dep)}
+                            for keyword, dep in self.dependencies(module)]})
+        return {'modules': res}
+
+    def dot_lines(self, modules):
+        """Yields the lines of a DOT digraph of the modules reachable from
+        modules. Requested modules are drawn as boxes and include edges
+        dashed.
+
+        """
+        requested = set(modules)
+        yield 'digraph modules {'
+        for module in self.topological_order(modules):
+            node = '"' + '@'.join(module_key(module)) + '"'
+            if module in requested:
+                yield '    ' + node + ' [shape=box];'
+            else:
+                yield '    ' + node + ';'
+            for keyword, dep in self.dependencies(module):
+                edge = '    ' + node + ' -> "' + '@'.join(module_key(dep)) + '"'
+                if keyword == 'include':
+                    edge += ' [style=dashed]'
+                yield edge + ';'
+        yield '}'
+
+    def write(self, path, modules):
+        """Writes the graph of the modules reachable from modules to the file
+        at path, in DOT format if its name ends with .dot and in JSON
+        otherwise. The directory of the file is created if needed.
+
+        """
+        d = os.path.dirname(path)
+        if d and not os.path.isdir(d):
+            os.makedirs(d, 0o777)
+        with open(path, 'w') as f:
+            if path.endswith('.dot'):
+                f.writelines(file_lines(self.dot_lines(modules)))
+            else:
+                json.dump(self.as_json(modules), f, indent=2, sort_keys=True)
+                f.write('\n')
+
+
+class GenerationCache(object):
+    """Persistent cache of the files generated from each module, stored in a
+    .jnc-cache directory next to the output directory.
+
+    Each entry holds the names and contents of the files written when the
+    module was generated, and the keys of the modules it augments. An entry is
+    only used if its key is unchanged: a digest of the sources of the modules
+    that the generated files depend on, of the options affecting them, of the
+    module mapping and of the plugin itself.
+
+    """
+
+    def __init__(self, ctx):
+        """Initializes a cache for the output directory of ctx"""
+        self.ctx = ctx
+        output = os.path.normpath(ctx.opts.directory)
+        self.d = os.path.join(os.path.dirname(output), '.jnc-cache')
+        self.source_digests = {}
+        self.stored = False
+
+        self.module_graph = ModuleGraph(ctx)
+
+        plugin_source = os.path.splitext(os.path.abspath(__file__))[0] + '.py'
+        opts = ctx.opts
+        self.settings = [file_digest(plugin_source), opts.directory,
+                         getattr(ctx, 'rootpkg', None), opts.no_classes,
+                         opts.no_schema, opts.no_pkginfo,
+                         opts.import_on_demand, opts.classpath_schema_loading,
+                         opts.schema_format, opts.lazy_schema,
+                         opts.share_classes,
+                         opts.include_modules, sorted(ctx.include_modules),
+                         sorted(getattr(ctx, 'module_mapping', {}).items())]
+
+    def dependencies(self, module):
+        """Returns the set of module statements whose sources the files
+        generated from module depend on: module, the modules augmenting it and
+        all modules imported or included by these, directly or indirectly.
+
+        """
+        return set(self.module_graph.sources(module))
+
+    def source_digest(self, stmt):
+        """Returns the digest of the YANG file that stmt was parsed from"""
+        path = stmt.pos.ref
+        if path not in self.source_digests:
+            self.source_digests[path] = file_digest(path)
+        return self.source_digests[path]
+
+    def key(self, module):
+        """Returns the key of the cache entry of module"""
+        sources = sorted([module_key(stmt) + (self.source_digest(stmt),)
+                          for stmt in self.dependencies(module)])
+        parts = [self.settings, module_key(module), sources]
+        if self.ctx.opts.import_on_demand:
+            parts.append(sorted([(pkg, sorted(classes))
+                                 for pkg, classes in class_hierarchy.items()]))
+        return content_digest(json.dumps(parts, sort_keys=True))
+
+    def entry_path(self, module):
+        return os.path.join(self.d, '@'.join(module_key(module)) + '.json')
+
+    def blob_path(self, digest):
+        return os.path.join(self.d, 'objects', digest)
+
+    def lookup(self, module):
+        """Returns the cache entry of module, or None if there is no up to
+        date and complete entry for it.
+
+        """
+        try:
+            with open(self.entry_path(module)) as f:
+                entry = json.load(f, object_hook=_decode_dict)
+        except (EnvironmentError, ValueError):
+            return None
+        if entry.get('key') != self.key(module):
+            return None
+        entry['augmented'] = [tuple(key) for key in entry['augmented']]
+        if any(key not in self.ctx.modules for key in entry['augmented']):
+            return None
+        for _, _, digest in entry['files']:
+            if not os.path.isfile(self.blob_path(digest)):
+                return None
+        return entry
+
+    def files(self, entry):
+        """Yields the (directory, file name, text) of the files of entry"""
+        for d, file_name, digest in entry['files']:
+            with open(self.blob_path(digest)) as f:
+                yield d, file_name, f.read()
+
+    def store(self, module, files, augmented):
+        """Stores files, a list of (directory, file name, text) tuples written
+        when generating module, and the keys of the modules augmented by it.
+
+        """
+        objects = os.path.join(self.d, 'objects')
+        try:
+            os.makedirs(objects, 0o777)
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+        entry = {'key': self.key(module), 'files': [],
+                 'augmented': [list(key) for key in augmented]}
+        for d, file_name, text in files:
+            if not isinstance(text, bytes):
+                text = text.encode('utf-8')
+            digest = hashlib.sha1(text).hexdigest()
+            if not os.path.isfile(self.blob_path(digest)):
+                self.write(self.blob_path(digest), text)
+            entry['files'].append([d, file_name, digest])
+        self.write(self.entry_path(module), json.dumps(entry).encode('utf-8'))
+        self.stored = True
+
+    def prune(self):
+        """Deletes the files of the objects directory that no entry refers to
+        any more, such as the earlier contents of regenerated files. All
+        entries in the cache directory are considered, including those of
+        modules that are not in the context.
+
+        """
+        referenced = set()
+        for name in os.listdir(self.d):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.d, name)) as f:
+                    entry = json.load(f)
+            except (EnvironmentError, ValueError):
+                continue  # Never used by lookup
+            referenced.update(digest for _, _, digest in entry['files'])
+        objects = os.path.join(self.d, 'objects')
+        for name in os.listdir(objects):
+            if name not in referenced and not name.endswith('.tmp'):
+                os.remove(os.path.join(objects, name))
+
+    def write(self, path, data):
+        """Writes data to the file at path, replacing it in one step so that
+        an interrupted run does not leave a truncated cache file behind.
+
+        """
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.rename(tmp_path, path)
+
+
+class StatementIndex(object):
+    """Index of statement properties that are otherwise found by walking the
+    chain of parents of a statement, such as its module, package and tagpath.
+
+    The parents and modules of the statements of each module are indexed in
+    emit, other properties the first time they are looked up. The statement
+    tree is not modified during generation, so entries never become stale.
+
+    """
+
+    def __init__(self, ctx):
+        """Initializes an empty index for the modules of ctx"""
+        self.ctx = ctx
+        self.tables = collections.defaultdict(dict)
+
+    def add(self, module):
+        """Indexes the parent and module of each statement of module"""
+        pending = [module]
+        seen = set([])
+        while pending:
+            stmt = pending.pop()
+            if stmt in seen:
+                continue
+            seen.add(stmt)
+            get_parent(stmt)
+            get_module(stmt)
+            pending.extend(stmt.substmts)
+            pending.extend(getattr(stmt, 'i_children', []))
 
-class_hierarchy = {}
-"""Dict that map package names to sets of names of classes to be generated"""
+    def forget(self, names):
+        """Empties the tables called names"""
+        for name in names:
+            self.tables.pop(name, None)
 
+    def lookup(self, name, func, stmt, *args):
+        """Returns the value of func(stmt, *args), from the table called name
+        if it is indexed, and adds it to the index otherwise.
 
-def print_warning(msg='', key='', ctx=None):
-    """Prints msg to stderr if ctx is None or the debug or verbose flags are
-    set in context ctx and key is empty or not in outputted_warnings. If key is
-    not empty and not in outputted_warnings, it is added to it. If msg is empty
-    'No support for type "' + key + '", defaulting to string.' is printed.
+        If the check_index option is set, the value is verified against that
+        of func without using the index.
 
-    """
-    if ((not key or key not in outputted_warnings) and
-        (not ctx or ctx.opts.debug or ctx.opts.verbose)):
-        if msg:
-            sys.stderr.write('WARNING: ' + msg)
-            if key:
-                outputted_warnings.append(key)
-        else:
-            print_warning(('No support for type "' + key + '", defaulting ' +
-                'to string.'), key, ctx)
+        """
+        table = self.tables[name]
+        try:
+            value = table[stmt]
+        except KeyError:
+            value = table[stmt] = func(stmt, *args)
+        if self.ctx.opts.check_index:
+            global stmt_index
+            stmt_index = None
+            try:
+                expected = func(stmt, *args)
+            finally:
+                stmt_index = self
+            assert expected is value or expected == value, \
+                ' '.join([name, 'of', stmt.keyword, str(stmt.arg), 'is',
+                          repr(expected), 'but indexed as', repr(value)])
+        return value
 
 
-def write_file(d, file_name, file_content, ctx):
-    """Creates the directory d if it does not yet exist and writes a file to it
-    named file_name with file_content in it.
+def indexed(name):
+    """Decorator for functions of a statement (and the context) that make
+    their results be looked up in, and added to, the table called name of
+    stmt_index.
 
     """
-    #d = d.replace('.', OSSep)
-    wd = os.getcwd()
-    try:
-        os.makedirs(d, 0o777)
-    except OSError as exc:
-        if exc.errno == errno.EEXIST:
-            pass  # The directory already exists
-        else:
-            raise
-    try:
-        os.chdir(d)
-    except OSError as exc:
-        if exc.errno == errno.ENOTDIR:
-            print_warning(msg=('Unable to change directory to ' + d +
-                '. Probably a non-directory file with same name as one of ' +
-                'the subdirectories already exists.'), key=d, ctx=ctx)
-        else:
-            raise
-    finally:
-        if ctx.opts.verbose:
-            print('Writing file to: ' + os.getcwd() + OSSep + file_name)
-        os.chdir(wd)
-    with open(d + OSSep + file_name, 'w+') as f:
-        if isinstance(file_content, str):
-            f.write(file_content)
-        else:
-            for line in file_content:
-                f.write(line)
-                f.write('\n')
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(stmt, *args):
+            if stmt_index is None:
+                return func(stmt, *args)
+            return stmt_index.lookup(name, func, stmt, *args)
+        return wrapper
+    return decorator
 
 
+@indexed('module')
 def get_module(stmt):
     """Returns the module to which stmt belongs to"""
     if stmt.top is not None:
@@ -588,6 +2690,38 @@ def get_module(stmt):
                 return stmt.i_ctx.modules[(module_name, revision)]
 
 
+ModuleMetadata = collections.namedtuple('ModuleMetadata',
+                                        ['module', 'namespace', 'prefix',
+                                         'root'])
+"""The namespace, prefix and root class name of a module"""
+
+
+@indexed('metadata')
+def get_metadata(stmt):
+    """Returns the ModuleMetadata of the module to which stmt belongs. It is
+    computed once per module, when indexed.
+
+    """
+    module = get_module(stmt)
+    if module is not stmt:
+        return get_metadata(module)
+    prefix = search_one(module, 'prefix').arg
+    return ModuleMetadata(module, search_one(module, 'namespace').arg,
+                          prefix, normalize(prefix))
+
+
+@indexed('extensions')
+def get_extensions(stmt):
+    """Returns a frozenset of the names of the csp-common extensions used in
+    stmt
+
+    """
+    return frozenset(s.keyword[1] for s in stmt.substmts
+                     if isinstance(s.keyword, tuple)
+                     and s.keyword[0] == 'csp-common')
+
+
+@indexed('parent')
 def get_parent(stmt):
     """Returns closest parent which is not a choice, case or submodule
     statement. If the parent is a submodule statement, the corresponding main
@@ -606,6 +2740,7 @@ def get_parent(stmt):
         return stmt.parent
 
 
+@indexed('package')
 def get_package(stmt, ctx):
     """Returns a string representing the package name of a java class generated
     from stmt, assuming that it has been or will be generated by JNC.
@@ -614,11 +2749,10 @@ def get_package(stmt, ctx):
     sub_packages = collections.deque()
     parent = get_parent(stmt)
     package = ""
-    if hasattr(ctx, "data"):
-        modules = ctx.data["modules"]
-        for sub in modules:
-            if parent.arg == sub['name']:
-                package = sub['package']+".mo"
+    if hasattr(ctx, "module_mapping"):
+        mapped = mapped_package(parent.arg, ctx)
+        if mapped is not None:
+            package = mapped + ".mo"
 
     while parent is not None:
         if hasattr(stmt, "i_orig_module") and stmt.i_orig_module.keyword == "submodule" \
@@ -661,73 +2795,126 @@ def decapitalize_first(string):
     return string[:1].lower() + string[1:]
 
 
-def camelize(string):
-    """Converts string to lower camel case
+class Camelizer(object):
+    """Converts YANG identifiers to Java names, caching the results of each
+    conversion in an LRUCache. separators are the characters that camelize
+    removes, capitalizing the character following them.
 
-    Removes hyphens and dots and replaces following character (if any) with
-    its upper-case counterpart. Does not remove consecutive or trailing hyphens
-    or dots.
+    """
 
-    If the resulting string is reserved in Java, an underline is appended
+    def __init__(self, separators, maxsize=10000):
+        self.separators = separators
+        self.separator_re = re.compile('[%s](.)' % re.escape(separators))
+        self.camelized = LRUCache(maxsize)
+        self.normalized = LRUCache(maxsize)
 
-    Returns an empty string if string argument is None. Otherwise, returns
-    string decapitalized and with no consecutive upper case letters.
+    def camelize(self, string):
+        """Converts string to lower camel case
 
-    """
-    try:  # Fetch from cache
-        return camelized_stmt_args[string]
-    except KeyError:
-        pass
-    camelized_str = collections.deque()
-    if string is not None:
-        iterator = pairwise(decapitalize_first(string))
-        for character, next_character in iterator:
-            if next_character is None:
-                if (len(string) > 1):
-                    camelized_str.append(character)
+        Removes separators and replaces following character (if any) with its
+        upper-case counterpart. Does not remove consecutive or trailing
+        separators.
+
+        If the resulting string is reserved in Java, an underline is appended
+
+        Returns an empty string if string argument is None. Otherwise, returns
+        string decapitalized and with no consecutive upper case letters.
+
+        """
+        res = self.camelized.get(string)
+        if res is not None:
+            return res
+        if string is None:
+            res = ''
+        elif _camelize_fast_re.match(string):
+            # No upper case letters: only the separators need to be handled
+            res = self.separator_re.sub(_upper_group, string)
+        else:
+            res = self.camelize_characters(string)
+        if res in java_reserved_words or res in java_literals:
+            res += '_'
+        if _digit_re.match(res):
+            res = '_' + res
+        self.camelized[string] = res  # Add to cache
+        return res
+
+    def camelize_characters(self, string):
+        """Returns string camelized as described in camelize, except for the
+        handling of reserved words and leading digits.
+
+        """
+        chars = decapitalize_first(string)
+        last = len(chars) - 1
+        res = []
+        i = 0
+        while i <= last:
+            character = chars[i]
+            if i == last:
+                if len(string) > 1:
+                    res.append(character)
+                elif string.isupper():
+                    res.append(character.upper())
                 else:
-                    if(string.isupper()):
-                        camelized_str.append(character.upper())
-                    else:
-                        camelized_str.append(character.lower())
-            elif character in '-.':
-                camelized_str.append(capitalize_first(next_character))
-                next(iterator)
+                    res.append(character.lower())
+            elif character in self.separators:
+                res.append(capitalize_first(chars[i + 1]))
+                i += 1  # The next character has been handled
             elif (character.isupper()
-                  and (next_character.isupper()
-                       or not next_character.isalpha())):
-                camelized_str.append(character.lower())
+                  and (chars[i + 1].isupper() or not chars[i + 1].isalpha())):
+                res.append(character.lower())
             else:
-                camelized_str.append(character)
-    res = ''.join(camelized_str)
-    if res in java_reserved_words | java_literals:
-        camelized_str.append('_')
-    if re.match(r'\d', res):
-        camelized_str.appendleft('_')
-    res = ''.join(camelized_str)
-    camelized_stmt_args[string] = res  # Add to cache
-    return res
+                res.append(character)
+            i += 1
+        return ''.join(res)
+
+    def normalize(self, string):
+        """returns capitalize_first(camelize(string)), except if
+        camelize(string) begins with and/or ends with a single underline: then
+        they are/it is removed and a 'J' is prepended. Mimics normalize in
+        YangElement of JNC.
+
+        """
+        res = self.normalized.get(string)
+        if res is not None:
+            return res
+        res = self.camelize(string)
+        start = 1 if res.startswith('_') else 0
+        end = -1 if res.endswith('_') else 0
+        if start or end:
+            res = 'J' + capitalize_first(res[start:end])
+        else:
+            res = capitalize_first(res)
+        self.normalized[string] = res  # Add to cache
+        return res
 
 
-def normalize(string):
-    """returns capitalize_first(camelize(string)), except if camelize(string)
-    begins with and/or ends with a single underline: then they are/it is
-    removed and a 'J' is prepended. Mimics normalize in YangElement of JNC.
+_camelize_fast_re = re.compile(r'[a-z0-9_.\-]*\Z')
+"""Matches strings that camelize only needs to remove separators from"""
+
+
+_digit_re = re.compile(r'\d')
+
+
+def _upper_group(match):
+    return match.group(1).upper()
+
+
+camelizer = Camelizer('-.')
+"""Converts identifiers to Java names, with hyphens and dots as separators"""
+
+
+camelized_stmt_args = camelizer.camelized
+"""Cache containing camelized versions of statement identifiers"""
 
-    """
-    try:  # Fetch from cache
-        return normalized_stmt_args[string]
-    except KeyError:
-        pass
-    res = camelize(string)
-    start = 1 if res.startswith('_') else 0
-    end = -1 if res.endswith('_') else 0
-    if start or end:
-        res = 'J' + capitalize_first(res[start:end])
-    else:
-        res = capitalize_first(res)
-    normalized_stmt_args[string] = res  # Add to cache
-    return res
+
+normalized_stmt_args = camelizer.normalized
+"""Cache containing normalized versions of statement identifiers"""
+
+
+camelize = camelizer.camelize
+
+
+normalize = camelizer.normalize
 
 
 def flatten(l):
@@ -752,6 +2939,7 @@ def flatten(l):
     return res
 
 
+@indexed('types')
 def get_types(yang_type, ctx):
     """Returns jnc and primitive counterparts of yang_type, which is a type,
     typedef, leaf or leaf-list statement.
@@ -857,46 +3045,84 @@ def search(stmt, keywords):
     If choice or case is not in keywords, substatements of choice and case
     are searched as well.
 
+    The results are kept in search_results, so searching the same statement
+    for the same keywords again is a dictionary lookup.
+
     """
     if isinstance(keywords, str):
         keywords = keywords.split()
-    bypassed = ('choice', 'case')
-    bypass = all(x not in keywords for x in bypassed)
+    keywords = frozenset(keywords)
+    result = search_results.get((stmt, keywords))
+    if result is not None:
+        return list(result)
+    bypass = all(x not in keywords for x in ('choice', 'case'))
+    substmts = any(x in keywords for x in ('typedef', 'import',
+                                           'augment', 'include'))
     dict_ = collections.OrderedDict()
+    for key, ch in search_table(stmt, bypass, substmts):
+        if key not in dict_ and ch.keyword in keywords:
+            dict_[key] = ch
+    result = search_results[(stmt, keywords)] = list(dict_.values())
+    return list(result)
 
-    def iterate(children, acc):
-        for ch in children:
-            if bypass and ch.keyword in bypassed:
-                _search(ch, keywords, acc)
-                continue
-            try:
-                key = ' '.join([ch.keyword, camelize(ch.arg)])
-            except TypeError:
-                if ch.arg is None:  # Extension
-                    key = ' '.join(ch.keyword)
-                else:
-                    key = ' '.join([':'.join(ch.keyword), camelize(ch.arg)])
-            if key in acc:
-                continue
-            for keyword in keywords:
-                if ch.keyword == keyword:
-                    acc[key] = ch
-                    break
 
-    def _search(stmt, keywords, acc):
-        if any(x in keywords for x in ('typedef', 'import',
-                                       'augment', 'include')):
-            old_keywords = keywords[:]
-            keywords = ['typedef', 'import', 'augment', 'include']
-            iterate(stmt.substmts, acc)
-            keywords = old_keywords
-        try:
-            iterate(stmt.i_children, acc)
-        except AttributeError:
-            iterate(stmt.substmts, acc)
+def clear_search_cache():
+    """Empties search_results and search_tables. Done between modules, to
+    keep them from growing with the number of modules generated.
+
+    """
+    search_results.clear()
+    search_tables.clear()
 
-    _search(stmt, keywords, dict_)
-    return list(dict_.values())
+
+def bound_caches(maxsize):
+    """Replaces search_results, search_tables and method_generators, which
+    otherwise grow with the size of the module generated, by LRUCaches of at
+    most about maxsize items each. Used in low memory mode.
+
+    """
+    global search_results, search_tables, method_generators
+    search_results = LRUCache(maxsize)
+    search_tables = LRUCache(maxsize)
+    method_generators = LRUCache(maxsize)
+
+
+def search_table(stmt, bypass, substmts):
+    """Returns a list of (key, child) pairs of the children of stmt that
+    search looks at, in order. The key identifies children that are
+    considered duplicates.
+
+    bypass   -- If True, choice and case children are replaced by their own
+                children, recursively
+    substmts -- If True, the substatements of stmt are included before its
+                i_children
+
+    """
+    table = search_tables.get((stmt, bypass, substmts))
+    if table is not None:
+        return table
+    children = []
+    if substmts:
+        children.extend(stmt.substmts)
+    try:
+        children.extend(stmt.i_children)
+    except AttributeError:
+        children.extend(stmt.substmts)
+    table = []
+    for ch in children:
+        if bypass and ch.keyword in ('choice', 'case'):
+            table.extend(search_table(ch, bypass, substmts))
+            continue
+        try:
+            key = ' '.join([ch.keyword, camelize(ch.arg)])
+        except TypeError:
+            if ch.arg is None:  # Extension
+                key = ' '.join(ch.keyword)
+            else:
+                key = ' '.join([':'.join(ch.keyword), camelize(ch.arg)])
+        table.append((key, ch))
+    search_tables[(stmt, bypass, substmts)] = table
+    return table
 
 
 def search_one(stmt, keyword, arg=None):
@@ -915,6 +3141,7 @@ def search_one(stmt, keyword, arg=None):
     return res
 
 
+@indexed('config')
 def is_config(stmt):
     """Returns True if stmt is a configuration data statement"""
     config = None
@@ -932,6 +3159,7 @@ def get_typename(stmt):
     else:
        return ''
 
+@indexed('tagpath')
 def get_tagpath(stmt):
     tagpath = collections.deque()
     parent = get_parent(stmt)
@@ -941,6 +3169,7 @@ def get_tagpath(stmt):
         tagpath.appendleft(stmt.arg)
     return '/'.join(tagpath)
 
+@indexed('uses package')
 def get_uses_package(stmt, ctx):
     """Returns a string representing the package name of a java class generated
     from stmt, assuming that it has been or will be generated by JNC.
@@ -968,6 +3197,7 @@ def get_uses_package(stmt, ctx):
     full_package.extend(sub_packages)
     return '.'.join(full_package)
 
+@indexed('uses path')
 def get_uses_path(stmt):
     """Returns a string representing the package name of a java class generated
     from stmt, assuming that it has been or will be generated by JNC.
@@ -1006,49 +3236,52 @@ class SchemaNode(object):
     def as_list(self):
         """Returns a string list repr "node" element content for an XML schema"""
         res = ['<node>']
+        for tag, value in self.fields():
+            res.append(''.join(['<', tag, '>', value, '</', tag, '>']))
+        res.append('</node>')
+        return res
+
+    def fields(self):
+        """Returns a list of (tag, value) pairs of the content of the node,
+        in schema file order
+
+        """
+        res = []
         stmt = self.stmt
-        res.append('<tagpath>' + self.tagpath + '</tagpath>')
-        top_stmt = get_module(stmt)
-        if top_stmt.keyword == 'module':
-            module = top_stmt
-        else:  #submodule
-            modulename = search_one(top_stmt, 'belongs-to').arg
-            for (name, rev) in top_stmt.i_ctx.modules:
-                if name == modulename:
-                    module = top_stmt.i_ctx.modules[(name, rev)]
-                    break
-        ns = search_one(module, 'namespace').arg
-        res.append('<namespace>' + ns + '</namespace>')
-        res.append('<primitive_type>0</primitive_type>')
+        res.append(('tagpath', self.tagpath))
+        ns = get_metadata(stmt).namespace
+        res.append(('namespace', ns))
+        res.append(('primitive_type', '0'))
         
         """Append "yang_node_type" and "yang_type" for schema node"""
-        res.append('<yang_node_type>' + stmt.keyword + '</yang_node_type>')
+        res.append(('yang_node_type', stmt.keyword))
 
         if stmt.keyword in leaf_stmts:
             typename = get_typename(stmt)
             type = search_one(stmt, 'type')
             jnc, primitive = get_types(type, self.ctx)
-            res.append('<yang_type>' + typename + '</yang_type>')
-            res.append('<yang_java_type>' + jnc + '</yang_java_type>')
-
-        if search_one(self.stmt, ('csp-common', 'vertex')):
-            res.append('<yang_graph_type>1</yang_graph_type>')
-        elif search_one(self.stmt, ('csp-common', 'edge')):
-            res.append('<yang_graph_type>2</yang_graph_type>')
+            res.append(('yang_type', typename))
+            res.append(('yang_java_type', jnc))
+
+        extensions = get_extensions(stmt)
+        if 'vertex' in extensions:
+            res.append(('yang_graph_type', '1'))
+        elif 'edge' in extensions:
+            res.append(('yang_graph_type', '2'))
         else:
-            res.append('<yang_graph_type>0</yang_graph_type>')
+            res.append(('yang_graph_type', '0'))
 
         if hasattr(stmt, 'i_orig_module') and stmt.i_orig_module:
             if stmt.i_orig_module.arg == "csp-common":
-                res.append('<mapping_path>'+stmt.arg+'</mapping_path>')
+                res.append(('mapping_path', stmt.arg))
             else:
                 parent = get_parent(stmt)
                 if parent.keyword != "module":
-                    if search_one(parent, ('csp-common', 'has-edge')) or search_one(parent, ('csp-common', 'ref-edge')):
+                    if get_extensions(parent) & edge_extensions:
                         map_name = stmt.arg
                     elif stmt.arg == "name":
                         map_name = stmt.arg
-                    elif search_one(stmt, ('csp-common', 'has-edge')) or search_one(stmt, ('csp-common', 'ref-edge')):
+                    elif extensions & edge_extensions:
                         map_name = parent.arg + "_" +stmt.arg+"s"
                         map_name = map_name.replace("-", "_")
                     else:
@@ -1056,7 +3289,7 @@ class SchemaNode(object):
                         map_name = map_name.replace("-", "_")
                 else:
                     map_name = stmt.arg
-                res.append('<mapping_path>'+map_name+'</mapping_path>')
+                res.append(('mapping_path', map_name))
 
         if stmt.keyword in {'container', 'list'}:
             if hasattr(stmt, 'i_uses'):
@@ -1065,7 +3298,8 @@ class SchemaNode(object):
             else:
                 package = get_package(stmt, self.ctx)
                 yang_java_type = package + '.' + normalize(stmt.arg)
-            res.append('<yang_java_type>' + yang_java_type + '</yang_java_type>')
+            yang_java_type = shared_classes.get(yang_java_type, yang_java_type)
+            res.append(('yang_java_type', yang_java_type))
 
         min_occurs = '0'
         max_occurs = '-1'
@@ -1091,23 +3325,104 @@ class SchemaNode(object):
         if (isUnique or childOfContainerOrList
                 or stmt.keyword in ('container', 'notification')):
             max_occurs = '1'
-        res.append('<min_occurs>' + min_occurs + '</min_occurs>')
-        res.append('<max_occurs>' + max_occurs + '</max_occurs>')
+        res.append(('min_occurs', min_occurs))
+        res.append(('max_occurs', max_occurs))
 
         children = ''
         yang_children = ''
         for ch in search(stmt, yangelement_stmts | leaf_stmts):
             children += camelize(ch.arg) + ' '
             yang_children += ch.arg + ' '
-        res.append('<children>' + children[:-1] + '</children>')
-        res.append('<yang_children>' + yang_children[:-1] + '</yang_children>')
+        res.append(('children', children[:-1]))
+        res.append(('yang_children', yang_children[:-1]))
 
-        res.append('<flags>0</flags>')
-        res.append('<desc></desc>')
-        res.append('</node>')
+        res.append(('flags', '0'))
+        res.append(('desc', ''))
         return res
 
 
+class BinarySchemaEncoder(object):
+    """Encodes schema nodes in the binary schema file format read by
+    SchemaParser.readBinaryFile.
+
+    The file starts with the magic bytes "JNCS" and the format version, and
+    is followed by a record for each node, starting with the byte 1, and the
+    byte 0. Integers are big-endian 32-bit. Strings are written as references
+    to a table of the strings seen so far: -1 for null, the size of the table
+    for a new string, which follows as its UTF-8 length and bytes and is
+    appended to the table, or the index of a string already in the table.
+
+    """
+
+    magic = b'JNCS'
+    version = 1
+
+    def __init__(self):
+        """Creates an encoder with an empty string table"""
+        self.strings = {}
+
+    def header(self):
+        """Returns the bytes at the start of the file"""
+        return struct.pack('>4si', self.magic, self.version)
+
+    def end(self):
+        """Returns the bytes at the end of the file"""
+        return struct.pack('>b', 0)
+
+    def node(self, fields):
+        """Returns the record of a schema node, given the (tag, value) pairs
+        of SchemaNode.fields
+
+        """
+        values = dict(fields)
+        res = [struct.pack('>b', 1)]
+        tagpath = values['tagpath'].split('/')
+        while tagpath and not tagpath[-1]:
+            tagpath.pop()
+        res.append(self.string_list(tagpath[1:]))
+        res.append(self.string(values['namespace']))
+        res.append(self.int(values['primitive_type']))
+        res.append(self.string(values['yang_node_type']))
+        res.append(self.string(values.get('yang_type')))
+        res.append(self.string(values.get('yang_java_type')))
+        res.append(self.string(values.get('mapping_path')))
+        res.append(self.int(values['yang_graph_type']))
+        res.append(self.int(values['min_occurs']))
+        res.append(self.int(values['max_occurs']))
+        for tag in ('children', 'yang_children'):
+            value = values.get(tag)
+            res.append(self.string_list(None if value is None
+                                        else value.split(' ')))
+        res.append(self.int(values['flags']))
+        res.append(self.string(values['desc']))
+        return b''.join(res)
+
+    def int(self, value):
+        """Returns the bytes of the integer value, which may be a string"""
+        return struct.pack('>i', int(value))
+
+    def string(self, value):
+        """Returns the bytes of a reference to the string value"""
+        if value is None:
+            return struct.pack('>i', -1)
+        index = self.strings.get(value)
+        if index is not None:
+            return struct.pack('>i', index)
+        index = self.strings[value] = len(self.strings)
+        data = value if isinstance(value, bytes) else value.encode('utf-8')
+        return struct.pack('>ii', index, len(data)) + data
+
+    def string_list(self, values):
+        """Returns the bytes of the length of the list values, -1 for None,
+        followed by references to each of its strings
+
+        """
+        if values is None:
+            return struct.pack('>i', -1)
+        return struct.pack('>i', len(values)) + b''.join(
+            self.string(value) for value in values)
+
+
 class SchemaGenerator(object):
     """Used to generate an external XML schema from a yang module"""
 
@@ -1117,18 +3432,19 @@ class SchemaGenerator(object):
         self.ctx = ctx
 
     def schema_nodes(self):
-        """Generate XML schema as a list of "node" elements"""
-        res = []
-        for stmt in self.stmts:
-            subpath = self.tagpath + stmt.arg + '/'
+        """Generate XML schema as "node" elements, yielding the SchemaNode of
+        each statement in depth first order
+
+        """
+        pending = [(stmt, self.tagpath) for stmt in reversed(self.stmts)]
+        while pending:
+            stmt, tagpath = pending.pop()
+            subpath = tagpath + stmt.arg + '/'
             if self.ctx.opts.verbose:
                 print('Generating schema node "' + subpath + '"...')
-            node = SchemaNode(stmt, subpath, self.ctx)
-            res.extend(node.as_list())
-            substmt_generator = SchemaGenerator(search(stmt, node_stmts),
-                subpath, self.ctx)
-            res.extend(substmt_generator.schema_nodes())
-        return res
+            yield SchemaNode(stmt, subpath, self.ctx)
+            pending.extend((sub, subpath)
+                           for sub in reversed(search(stmt, node_stmts)))
 
 
 class YangType(object):
@@ -1220,15 +3536,26 @@ class ClassGenerator(object):
 
         """
         assert(self.stmt.keyword == 'module')
-        # Namespace and prefix
-        ns_arg = search_one(self.stmt, 'namespace').arg
-        prefix = search_one(self.stmt, 'prefix')
-        
+        self.record_classes()
+        self.generate_typedefs()
+        self.generate_groupings()
+
+        # Generate classes for children and keep track of augmented modules
+        for stmt in self.top_level_stmts():
+            self.generate_top_level(stmt)
+
+        self.generate_root_class()
+
+    def record_classes(self):
+        """Adds the names of all classes that will be generated from the
+        module statement to the class_hierarchy dict.
+
+        """
         # Add root to class_hierarchy dict
         if self.rootpkg not in class_hierarchy:
             class_hierarchy[self.rootpkg] = set([])
         class_hierarchy[self.rootpkg].add(self.n)
-        
+
         # Add all classes that will be generated to class_hierarchy dict
         def record(stmt, package):
             for ch in search(stmt, yangelement_stmts):
@@ -1238,7 +3565,34 @@ class ClassGenerator(object):
                 record(ch, '.'.join([package, camelize(ch.arg)]))
         record(self.stmt, self.rootpkg)
 
-        # Gather typedefs to generate and add to class_hierarchy dict
+        # Add typedefs to class_hierarchy dict
+        for stmt in self.typedef_stmts():
+            class_hierarchy[self.rootpkg].add(normalize(stmt.arg))
+
+    def schema_class_name(self):
+        """Returns the name of the class that the schema of the module is
+        generated as with --jnc-schema-format java: <root>Schema, followed by
+        as many underscores as needed for neither it nor the classes of its
+        parts, <root>Schema1 and so on, to have the name of another class of
+        the root package.
+
+        """
+        root = self.filename[:-len('.java')]
+        names = set([root])
+        names.update(normalize(ch.arg)
+                     for ch in search(self.stmt, yangelement_stmts))
+        names.update(normalize(stmt.arg) for stmt in self.typedef_stmts())
+        res = root + 'Schema'
+        while any(name.startswith(res) and name[len(res):].isdigit()
+                  or name == res for name in names):
+            res += '_'
+        return res
+
+    def typedef_stmts(self):
+        """Returns the set of typedefs to generate classes from: the typedefs
+        of the module and its submodules, and the typedefs they derive from.
+
+        """
         typedef_stmts = set([])
         module_stmts = set([self.stmt])
         included = map(lambda x: x.arg, search(self.stmt, 'include'))
@@ -1248,7 +3602,6 @@ class ClassGenerator(object):
         for module_stmt in module_stmts:
             for stmt in search(module_stmt, 'typedef'):
                 typedef_stmts.add(stmt)
-                class_hierarchy[self.rootpkg].add(normalize(stmt.arg))
                 try:
                     while True:
                         type_stmt = search_one(stmt, 'type')
@@ -1256,12 +3609,14 @@ class ClassGenerator(object):
                             break
                         typedef_stmts.add(type_stmt.i_typedef)
                         stmt = type_stmt.i_typedef
-                        class_hierarchy[self.rootpkg].add(normalize(stmt.arg))
                 except AttributeError:
                     pass
+        return typedef_stmts
 
-        # Generate the typedef classes
-        for stmt in typedef_stmts:
+    @profiled('typedefs')
+    def generate_typedefs(self):
+        """Generates the typedef classes of the module statement"""
+        for stmt in self.typedef_stmts():
             stmt_arg = stmt.arg.replace("_", "-")
             name = normalize(stmt_arg)
             description = ''.join(['This class represents an element from ',
@@ -1279,7 +3634,7 @@ class ClassGenerator(object):
             if self.ctx.opts.verbose:
                 print('Generating Java class "' + name + '.java' + '"...')
 
-            gen = MethodGenerator(stmt, self.ctx)
+            gen = method_generator(stmt, self.ctx)
 
             for constructor in gen.constructors():
                 java_class.add_constructor(constructor)
@@ -1303,8 +3658,15 @@ class ClassGenerator(object):
                 java_class.imports.add('com.tailf.jnc.Element')
 
             write_file(self.path, java_class.filename,
-                       java_class.as_list(), self.ctx)
+                       java_class.lines(), self.ctx)
 
+    @profiled('groupings')
+    def generate_groupings(self):
+        """Generates classes for the containers, lists, etc. of the groupings
+        of the module statement.
+
+        """
+        ns_arg = get_metadata(self.stmt).namespace
         for group in self.stmt.i_groupings.values():
             for stmt in search(group, list(yangelement_stmts | {'augment'})):
                 if group.i_orig_module.keyword == "submodule":
@@ -1319,19 +3681,37 @@ class ClassGenerator(object):
                     ns=ns, prefix_name=self.n, parent=self)
                 child_generator.generate()
 
-        # Generate classes for children and keep track of augmented modules
-        for stmt in search(self.stmt, list(yangelement_stmts | {'augment'})):
-            if stmt.i_orig_module.keyword == "submodule":
-                ns = ns_arg+'/'+stmt.i_orig_module.arg
-                path = self.path+'/'+camelize(stmt.i_orig_module.arg)
-                package = self.package+'.'+camelize(stmt.i_orig_module.arg)
-            else:
-                ns = ns_arg
-                path = self.path
-                package = self.package
-            child_generator = ClassGenerator(stmt, path=path, package=package,
-                ns=ns, prefix_name=self.n, parent=self)
-            child_generator.generate()
+    def top_level_stmts(self):
+        """Returns the top level statements of the module statement that
+        classes are generated from, including augment statements.
+
+        """
+        return search(self.stmt, list(yangelement_stmts | {'augment'}))
+
+    @profiled('children')
+    def generate_top_level(self, stmt):
+        """Generates the class hierarchy of stmt, a top level statement of the
+        module statement. Augmented modules are added to augmented_modules.
+
+        """
+        ns_arg = get_metadata(self.stmt).namespace
+        if stmt.i_orig_module.keyword == "submodule":
+            ns = ns_arg+'/'+stmt.i_orig_module.arg
+            path = self.path+'/'+camelize(stmt.i_orig_module.arg)
+            package = self.package+'.'+camelize(stmt.i_orig_module.arg)
+        else:
+            ns = ns_arg
+            path = self.path
+            package = self.package
+        child_generator = ClassGenerator(stmt, path=path, package=package,
+            ns=ns, prefix_name=self.n, parent=self)
+        child_generator.generate()
+
+    @profiled('root class')
+    def generate_root_class(self):
+        """Generates the root class of the module statement"""
+        metadata = get_metadata(self.stmt)
+        ns_arg = metadata.namespace
 
         # Generate root class
         if self.ctx.opts.verbose:
@@ -1339,7 +3719,7 @@ class ClassGenerator(object):
         self.java_class = JavaClass(filename=self.filename,
                 package=self.package, description=('The root class for namespace ' +
                     ns_arg + ' (accessible from \n * ' + self.n +
-                    '.NAMESPACE) with prefix "' + prefix.arg + '" (' + self.n +
+                    '.NAMESPACE) with prefix "' + metadata.prefix + '" (' + self.n +
                     '.PREFIX).'),
                 source=self.src)
 
@@ -1349,7 +3729,7 @@ class ClassGenerator(object):
         root_fields[1].set_name('PREFIX')
         root_fields[2].set_name('MODULE')
         root_fields[0].value = '"' + ns_arg + '"'
-        root_fields[1].value = '"' + prefix.arg + '"'
+        root_fields[1].value = '"' + metadata.prefix + '"'
         root_fields[2].value = '"' + self.stmt.arg + '"'
         for root_field in root_fields:
             for modifier in ('public', 'static', 'final', 'String'):
@@ -1381,7 +3761,7 @@ class ClassGenerator(object):
         enabler.add_line('try {')
         enabler.add_line(enabler.indent + '"'.join(['YangElement.setPackage(NAMESPACE, ',
                                    self.java_class.package, ');']))
-        enabler.add_line(enabler.indent + normalize(prefix.arg) + '.registerSchema();')
+        enabler.add_line(enabler.indent + metadata.root + '.registerSchema();')
         enabler.add_line('}')
         enabler.add_line('catch(Exception e) {')
         enabler.add_line(enabler.indent + 'e.printStackTrace();')
@@ -1405,20 +3785,68 @@ class ClassGenerator(object):
         reg.add_javadoc('Register the schema for this namespace in the global')
         reg.add_javadoc('schema table (CsTree) making it possible to lookup')
         reg.add_javadoc('CsNode entries for all tagpaths')
-        reg.add_line('SchemaParser parser = new SchemaParser();')
+        schema_format = self.ctx.opts.schema_format
+        lazy = self.ctx.opts.lazy_schema
+        load = reg
+        if lazy:
+            # Shards are registered by a separate method, see schema_shards
+            load = JavaMethod(return_type='void', name='registerSchemaShard')
+            load.exceptions = ['JNCException']
+            load.modifiers = ['public', 'static']
+            load.add_javadoc('Register shard number shard of the schema for this')
+            load.add_javadoc('namespace in the schema table h. Shard 0 is registered')
+            load.add_javadoc('by registerSchema, the shard of each top level node')
+            load.add_javadoc('when a tagpath in it is first looked up.')
+            load.parameters.add('int shard')
+            load.parameters.add('HashMap<Tagpath, SchemaNode> h')
+        if schema_format != 'java':
+            load.add_line('SchemaParser parser = new SchemaParser();')
         #reg.add_dependency('com.tailf.jnc.SchemaParser')
         reg.add_line('HashMap<Tagpath, SchemaNode> h = SchemaTree.create(NAMESPACE);')
         reg.add_dependency('java.util.HashMap')
         #reg.add_dependency('com.tailf.jnc.Tagpath')
         #reg.add_dependency('com.tailf.jnc.SchemaNode')
         #reg.add_dependency('com.tailf.jnc.SchemaTree')
-        schema = OSSep.join([self.ctx.opts.directory.replace('.', OSSep),
-                              self.n2, normalize(prefix.arg)])
-        if self.ctx.opts.classpath_schema_loading:
-            reg.add_line('parser.findAndReadFile("' + normalize(prefix.arg) + '.schema", h, ' + normalize(prefix.arg) + '.class);')
+        if lazy:
+            reg.add_line('registerSchemaShard(0, h);')
+            reg.add_line('SchemaTree.addShards(NAMESPACE, new SchemaTree.ShardLoader() {')
+            reg.add_line('    public void load(int shard, HashMap<Tagpath, SchemaNode> h)')
+            reg.add_line('            throws JNCException {')
+            reg.add_line('        registerSchemaShard(shard, h);')
+            reg.add_line('    }')
+            reg.add_line('}, new String[] {')
+            for top in search(self.stmt, node_stmts):
+                reg.add_line('    ' + java_string_literal(top.arg) + ',')
+            reg.add_line('});')
+        schema_dir = OSSep.join([self.ctx.opts.directory.replace('.', OSSep),
+                                 self.n2])
+        schema = schema_dir + OSSep + metadata.root
+        if schema_format == 'binary':
+            suffix, read = binary_schema_suffix, 'BinaryFile'
         else:
-            reg.add_line('parser.readFile("' + schema + '.schema", h);')
+            suffix, read = '.schema', 'File'
+        classpath = self.ctx.opts.classpath_schema_loading
+        if schema_format == 'java':
+            load.add_line(self.schema_class_name() + '.register(' +
+                          ('shard, ' if lazy else '') + 'h);')
+        else:
+            if lazy:
+                load.add_line('String name = shard == 0 ? "' + metadata.root +
+                              '" : "' + metadata.root + '." + shard;')
+                schema_file = 'name + "' + suffix + '"'
+                if not classpath:
+                    schema_file = '"' + schema_dir + OSSep + '" + ' + schema_file
+            elif classpath:
+                schema_file = '"' + metadata.root + suffix + '"'
+            else:
+                schema_file = '"' + schema + suffix + '"'
+            if classpath:
+                load.add_line('parser.findAndRead' + read + '(' + schema_file + ', h, ' + metadata.root + '.class);')
+            else:
+                load.add_line('parser.read' + read + '(' + schema_file + ', h);')
         self.java_class.add_schema_registrator(reg)
+        if lazy:
+            self.java_class.add_schema_registrator(load)
 
         self.write_to_file()
 
@@ -1465,10 +3893,9 @@ class ClassGenerator(object):
                                              indent + "}"])
             self.java_class.add_field(tagpath_field)
 
-        module_stmt = get_module(stmt)
-        prefix = search_one(module_stmt, 'prefix')
+        root = get_metadata(stmt).root
         indent =  ' ' * 4
-        test_field = JavaValue(exact=[indent + "static {", indent * 2 + normalize(prefix.arg)+".enable();", indent + "}"])
+        test_field = JavaValue(exact=[indent + "static {", indent * 2 + root + ".enable();", indent + "}"])
         self.java_class.add_field(test_field)
         self.java_class.imports.add('com.tailf.jnc.Tagpath')
 
@@ -1510,7 +3937,7 @@ class ClassGenerator(object):
             if self.ctx.opts.verbose:
                 print('Generating "' + self.filename + '"...')
 
-        gen = MethodGenerator(stmt, self.ctx)
+        gen = method_generator(stmt, self.ctx)
 
         for constructor in gen.constructors():
             self.java_class.add_constructor(constructor)
@@ -1579,7 +4006,7 @@ class ClassGenerator(object):
                     ns=None, prefix_name=None, parent=self)
                 child_generator.generate()
 
-            child_gen = MethodGenerator(sub, self.ctx)
+            child_gen = method_generator(sub, self.ctx)
             if sub.keyword in ('container', 'notification'):
                 field = sub.arg.replace("_", "-")
                 self.java_class.add_field(child_gen.child_field())
@@ -1600,7 +4027,7 @@ class ClassGenerator(object):
                     access_method.modifiers = [f(x) for x in access_method.modifiers]
                 add(sub.arg, access_method)
         elif sub.keyword in leaf_stmts:
-            child_gen = MethodGenerator(sub, self.ctx)
+            child_gen = method_generator(sub, self.ctx)
             add(sub.arg, child_gen.access_methods_comment())
             if sub.keyword == 'leaf':
                 key = search_one(self.stmt, 'key')
@@ -1621,16 +4048,20 @@ class ClassGenerator(object):
                 add(sub.arg, child_gen.adders())
                 optional = True
             if optional:
-                child_gen = MethodGenerator(sub, self.ctx)
                 for mark_method in child_gen.markers():
                     add(sub.arg, mark_method)
         return field
 
     def write_to_file(self):
+        """Writes the class to file, streaming its lines as they are
+        rendered. The class is released once written.
+
+        """
         write_file(self.path,
                    self.filename,
-                   self.java_class.as_list(),
+                   self.java_class.lines(),
                    self.ctx)
+        self.java_class = None
 
 
 class PackageInfoGenerator(object):
@@ -1653,36 +4084,35 @@ class PackageInfoGenerator(object):
 
     def generate_package_info(self):
         """Main generator method: generates package-info files for self.stmt
-        and all of its substatements.
-
-        """
-        write_file(self.d, 'package-info.java',
-                   self.gen_package_info(), self.ctx)
-        dirs = filter(lambda s: not s.endswith('.java'), os.listdir(self.d))
-        stmts = search(self.stmt, node_stmts)
-        for directory in dirs:
-            for sub in stmts:
-                if normalize(sub.arg) == normalize(directory):
-                    old_d = self.d
-                    self.d += OSSep + directory
-                    old_pkg = self.pkg
-                    self.pkg += '.' + directory
-                    old_stmt = self.stmt
-                    self.stmt = sub
-
-                    self.generate_package_info()
+        and all of its substatements that have a package of generated
+        classes, as recorded in package_directories.
 
-                    self.d = old_d
-                    self.pkg = old_pkg
-                    self.stmt = old_stmt
+        The packages are visited depth first, in the order of the names of
+        their directories.
 
-    def gen_package_info(self):
-        """Writes a package-info.java file to the package directory with a high
-        level description of the package functionality and requirements.
+        """
+        pending = [(self.d, self.pkg, self.stmt)]
+        while pending:
+            d, pkg, stmt = pending.pop()
+            write_file(d, 'package-info.java',
+                       self.gen_package_info(pkg, stmt), self.ctx)
+            subs = collections.defaultdict(list)
+            for sub in search(stmt, node_stmts):
+                subs[normalize(sub.arg)].append(sub)
+            directories = package_directories.get(os.path.normpath(d), ())
+            for directory in sorted(directories, reverse=True):
+                for sub in reversed(subs.get(normalize(directory), ())):
+                    pending.append((d + OSSep + directory,
+                                    pkg + '.' + directory, sub))
+
+    def gen_package_info(self, pkg, stmt):
+        """Returns the content of the package-info.java file of package pkg,
+        with a high level description of the package functionality and
+        requirements.
 
         """
-        module = get_module(self.stmt).arg
-        return ''.join([package_info.format(' ' + module, ''), self.pkg, ';'])
+        module = get_module(stmt).arg
+        return ''.join([package_info.format(' ' + module, ''), pkg, ';'])
 
 
 class JavaClass(object):
@@ -1793,21 +4223,34 @@ class JavaClass(object):
         """Returns self.body. If it is None, fields and methods are added to it
         before it is returned."""
         if self.body is None:
-            self.body = []
-            if self.superclass is not None or 'Serializable' in self.interfaces:
-                self.body.extend(JavaValue(
-                    modifiers=['private', 'static', 'final', 'long'],
-                    name='serialVersionUID', value='1L').as_list())
-                self.body.append('')
-            for method in flatten(self.attrs):
-                if hasattr(method, 'as_list'):
-                    self.body.extend(method.as_list())
-                else:
-                    self.body.append(method)
-                self.body.append('')
-            self.body.append('}')
+            self.body = list(self.body_lines())
         return self.body
 
+    def body_lines(self):
+        """Yields the lines of the class body, from self.body if it is set and
+        otherwise from the fields and methods, without keeping them in a list.
+
+        """
+        if self.body is not None:
+            for line in self.body:
+                yield line
+            return
+        if self.superclass is not None or 'Serializable' in self.interfaces:
+            for line in JavaValue(modifiers=['private', 'static', 'final',
+                                             'long'],
+                                  name='serialVersionUID',
+                                  value='1L').as_list():
+                yield line
+            yield ''
+        for method in flatten(self.attrs):
+            if hasattr(method, 'as_list'):
+                for line in method.as_list():
+                    yield line
+            else:
+                yield method
+            yield ''
+        yield '}'
+
     def get_superclass_and_interfaces(self):
         """Returns a string with extends and implements"""
         res = []
@@ -1820,7 +4263,7 @@ class JavaClass(object):
         return ''.join(res)
 
     def as_list(self):
-        """Returns a string representing complete Java code for this class.
+        """Returns a list of the lines of complete Java code for this class.
 
         It is vital that either self.body contains the complete code body of
         the class being generated, or that it is None and methods have been
@@ -1829,6 +4272,25 @@ class JavaClass(object):
 
         The class name is the filename without the file extension.
 
+        """
+        return self.get_header() + self.get_body()
+
+    def lines(self):
+        """Yields the lines of complete Java code for this class, like as_list
+        but without building a list of the lines of the body.
+
+        """
+        for line in self.get_header():
+            yield line
+        for line in self.body_lines():
+            yield line
+
+    def get_header(self):
+        """Returns a list of the lines preceding the body of the class: the
+        file comment, package and imports, and the class declaration.
+
+        The imports of the fields and methods are added to self.imports.
+
         """
         # The header is placed in the beginning of the Java file
         header = [' '.join(['/* \n * @(#)' + self.filename, '      ',
@@ -1885,7 +4347,7 @@ class JavaClass(object):
                                self.get_superclass_and_interfaces(),
                                ' {']))
         header.append('')
-        return header + self.get_body()
+        return header
 
 
 class JavaValue(object):
@@ -2177,11 +4639,235 @@ class JavaMethod(JavaValue):
         return self.exact
 
 
+class MethodTemplate(object):
+    """A public Java method of fixed shape, whose parts are %-format strings
+    filled in with a dict of values when the template is rendered.
+
+    Templates are created once, at import. Rendering a template gives the same
+    JavaMethod as calling set_name, set_return_type, add_parameter,
+    add_exception, add_javadoc and add_line for each of its parts, but sets the
+    attributes of the method in one go instead of dispatching every part
+    through _set_instance_data.
+
+    """
+
+    def __init__(self, name, return_type=None, params=(), exceptions=(),
+                 javadocs=(), body=(), dependencies=()):
+        """Initializes a template.
+
+        name, return_type    -- Format strings of the method name and type
+        params (tuple list)  -- (type, name) format string pairs
+        exceptions, javadocs -- Format strings of the exceptions and the lines
+                                of the javadoc comment
+        body                 -- Format strings of the lines of the body
+        dependencies         -- (key, import) format string pairs. The class
+                                name of each import is added to the values as
+                                key, for use in the body. The return type is
+                                added as 'return_type'.
+
+        """
+        self.name = name
+        self.return_type = return_type
+        self.params = tuple(params)
+        self.exceptions = tuple(exceptions)
+        self.javadocs = tuple(line.lstrip(' */') for line in javadocs)
+        self.body = tuple(' ' * 8 + line for line in body)
+        self.dependencies = tuple(dependencies)
+
+    def render(self, values, params=(), javadocs=()):
+        """Returns a new JavaMethod from this template filled in with values.
+
+        params   -- (type, name) pairs of parameters to add after those of
+                    the template
+        javadocs -- Javadoc lines to add after those of the template
+
+        """
+        method = JavaMethod.__new__(JavaMethod)
+        # Same attributes as after JavaMethod(name=...)
+        method.value = None
+        method.indent = ' ' * 4
+        method.default_modifiers = True
+        method.modifiers = ['public']
+        method.imports = set([])
+        method.exact = None
+        method.name = self.name % values
+        method.return_type = 'void'
+        if self.return_type is not None:
+            method.return_type = method.add_dependency(self.return_type % values)
+        values['return_type'] = method.return_type
+        for key, import_ in self.dependencies:
+            values[key] = method.add_dependency(import_ % values)
+        method.parameters = OrderedSet(
+            [' '.join([method.add_dependency(t % values), n % values])
+             for t, n in self.params] +
+            [' '.join([method.add_dependency(t), n]) for t, n in params])
+        method.exceptions = OrderedSet(
+            [method.add_dependency(exc % values) for exc in self.exceptions])
+        method.javadocs = OrderedSet(
+            [line % values for line in self.javadocs] +
+            [line.lstrip(' */') for line in javadocs])
+        method.body = [line % values for line in self.body]
+        return method
+
+
+leaf_getter_template = MethodTemplate(
+    name='get%(n)sValue',
+    return_type='%(type)s',
+    exceptions=['JNCException'],
+    javadocs=['Gets the value for child %(keyword)s "%(arg)s".',
+              '@return The value of the %(keyword)s.'],
+    body=['return (%(return_type)s)getValue("%(arg)s");'])
+"""Template of get<Identifier>Value methods of leaves"""
+
+
+empty_leaf_getter_template = MethodTemplate(
+    name='get%(n)sValue',
+    return_type='%(type)s',
+    exceptions=['JNCException'],
+    javadocs=['Searches for %(keyword)s "%(arg)s".',
+              '@return A YangEmpty object if %(keyword)s exists; ' +
+              '<code>null</code> otherwise.'],
+    body=['return (%(return_type)s)getValue("%(arg)s");'])
+"""Template of get<Identifier>Value methods of leaves of type empty"""
+
+
+jnc_leaf_setter_template = MethodTemplate(
+    name='set%(n)sValue',
+    params=[('%(type)s', '%(n2)sValue')],
+    exceptions=['JNCException'],
+    javadocs=['Sets the value for child %(keyword)s "%(arg)s",',
+              '%(using)s',
+              '@param %(n2)sValue The value to set.',
+              '@param %(n2)sValue used during instantiation.'],
+    body=['set%(Keyword)sValue(%(root)s.NAMESPACE,',
+          '    "%(arg)s",',
+          '    %(n2)sValue,',
+          '    childrenNames());'],
+    dependencies=[('root', '%(root)s')])
+"""Template of set<Identifier>Value methods of leaves taking a JNC type"""
+
+
+empty_leaf_setter_template = MethodTemplate(
+    name='set%(n)sValue',
+    params=[('String', '%(n2)sValue')],
+    exceptions=['JNCException'],
+    javadocs=['Sets the value for child %(keyword)s "%(arg)s",',
+              'by instantiating it (value n/a).',
+              '@param %(n2)sValue ignored.'],
+    body=['set%(n)sValue(new %(value_class)s());'],
+    dependencies=[('value_class', '%(type)s')])
+"""Template of set<Identifier>Value methods of leaves of type empty"""
+
+
+value_leaf_setter_template = MethodTemplate(
+    name='set%(n)sValue',
+    params=[('%(param_type)s', '%(n2)sValue')],
+    exceptions=['JNCException'],
+    javadocs=['Sets the value for child %(keyword)s "%(arg)s",',
+              '%(using)s',
+              '@param %(n2)sValue used during instantiation.'],
+    body=['set%(n)sValue(new %(value_class)s(%(n2)sValue%(args)s));'],
+    dependencies=[('value_class', '%(type)s')])
+"""Template of set<Identifier>Value methods of leaves taking a String or
+primitive value"""
+
+
+leaf_unsetter_template = MethodTemplate(
+    name='unset%(n)sValue',
+    exceptions=['JNCException'],
+    javadocs=['Unsets the value for child %(keyword)s "%(arg)s".'],
+    body=['delete("%(arg)s");'])
+"""Template of unset<Identifier>Value methods"""
+
+
+leaf_adder_template = MethodTemplate(
+    name='add%(n)s',
+    exceptions=['JNCException'],
+    javadocs=['This method is used for creating a subtree filter.',
+              'The added "%(arg)s" %(keyword)s will not have a value.'],
+    body=['set%(Keyword)sValue(%(root)s.NAMESPACE,',
+          '    "%(arg)s",',
+          '    null,',
+          '    childrenNames());'])
+"""Template of add<Identifier> methods of leaves and leaf-lists"""
+
+
+leaf_marker_template = MethodTemplate(
+    name='mark%(n)s%(Op)s',
+    exceptions=['JNCException'],
+    javadocs=['Marks the %(keyword)s "%(arg)s" with operation "%(op)s".'],
+    body=['markLeaf%(Op)s("%(n2)s");'])
+"""Template of mark<Identifier><Operation> methods of leaves"""
+
+
+leaf_list_marker_template = MethodTemplate(
+    name='mark%(n)s%(Op)s',
+    params=[('%(param_type)s', '%(n2)sValue')],
+    exceptions=['JNCException'],
+    javadocs=['Marks the %(keyword)s "%(arg)s" with operation "%(op)s".',
+              '@param %(n2)sValue The value to mark%(given)s'],
+    body=['markLeaf%(Op)s("%(n2)s[name=\'" + %(n2)sValue + "\']");'])
+"""Template of mark<Identifier><Operation> methods of leaf-lists"""
+
+
+leaf_list_entry_templates = tuple(MethodTemplate(
+    name='%(method_type)s%(n)s',
+    params=[('%(param_type)s', '%(n2)sValue')],
+    exceptions=['JNCException'],
+    javadocs=(['%(Method_type)ss %(keyword)s entry "%(n2)s".'] + string_doc +
+              ['@param %(n2)sValue Value to %(method_type)s.']),
+    body=['String path = "%(n2)s[%(n2)sValue]";',
+          '%(action)s(path);'])
+    for string_doc in ([], ['The value is specified as a string.']))
+"""Templates of create<Identifier> and delete<Identifier> methods of
+leaf-lists, taking a JNC type and a String value, respectively"""
+
+
+list_entry_templates = {
+    'get': MethodTemplate(
+        name='get%(n)s',
+        return_type='%(n)s',
+        exceptions=['JNCException'],
+        javadocs=['Gets %(keyword)s entry "%(n2)s", with specified keys.'],
+        body=['%(path)s',
+              'return (%(n)s)searchOne(path);']),
+    'delete': MethodTemplate(
+        name='delete%(n)s',
+        return_type='void',
+        exceptions=['JNCException'],
+        javadocs=['Deletes %(keyword)s entry "%(n2)s", with specified keys.'],
+        body=['%(path)s',
+              'delete(path);'],
+        dependencies=[('class_name', '%(n)s')])}
+"""Templates of get<Identifier> and delete<Identifier> methods of lists, to
+which the key parameters and their javadoc are added when rendered"""
+
+
+def method_generator(stmt, ctx):
+    """Returns the MethodGenerator of stmt, which is created the first time
+    and then kept in method_generators.
+
+    """
+    gen = method_generators.get(stmt)
+    if gen is None:
+        gen = method_generators[stmt] = MethodGenerator(stmt, ctx)
+    return gen
+
+
 class MethodGenerator(object):
     """A generator for JavaMethod objects"""
 
-    def __init__(self, stmt, ctx):
-        """Sets the attributes of the method generator, depending on stmt"""
+    def __init__(self, stmt, ctx, base=None):
+        """Sets the attributes of the method generator, depending on stmt.
+
+        base -- MethodGenerator of stmt whose attributes are reused rather
+                than computed again, if given.
+
+        """
+        if base is not None:
+            self.__dict__.update(base.__dict__)
+            self.gen = self
+            return
         self.stmt = stmt
         stmt_arg = stmt.arg.replace("_", "-")
         self.n = normalize(stmt.arg.replace("_", "-"))
@@ -2195,8 +4881,7 @@ class MethodGenerator(object):
                          search(stmt, yangelement_stmts | leaf_stmts)]
         self.ctx = ctx
         self.module_stmt = get_module(stmt)
-        prefix = search_one(self.module_stmt, 'prefix')
-        self.root = normalize(prefix.arg)
+        self.root = get_metadata(stmt).root
 
         if stmt.keyword in {"container","list"} and hasattr(stmt, 'i_uses') and len(stmt.i_uses) != 0:
             self.pkg = get_uses_package(stmt, ctx)
@@ -2222,13 +4907,13 @@ class MethodGenerator(object):
         self.gen = self
         if type(self) is MethodGenerator:
             if self.is_typedef:
-                self.gen = TypedefMethodGenerator(stmt, ctx)
+                self.gen = TypedefMethodGenerator(stmt, ctx, base=self)
             elif self.is_container:
-                self.gen = ContainerMethodGenerator(stmt, ctx)
+                self.gen = ContainerMethodGenerator(stmt, ctx, base=self)
             elif self.is_list:
-                self.gen = ListMethodGenerator(stmt, ctx)
+                self.gen = ListMethodGenerator(stmt, ctx, base=self)
             elif self.is_leaf or self.is_leaflist:
-                self.gen = LeafMethodGenerator(stmt, ctx)
+                self.gen = LeafMethodGenerator(stmt, ctx, base=self)
 
     def canonical_import(self, import_, child=False):
         """Returns a string representing a class that can be imported in Java.
@@ -2287,6 +4972,16 @@ class MethodGenerator(object):
         method.imports = res
         return method
 
+    def template_values(self, **values):
+        """Returns values with the names of the statement of this generator
+        and of the root class added, for rendering a MethodTemplate.
+
+        """
+        values.update(n=self.n, n2=self.n2, arg=self.stmt.arg,
+                      keyword=self.stmt.keyword,
+                      Keyword=normalize(self.stmt.keyword), root=self.root)
+        return values
+
     def _root_namespace(self, stmt_arg):
         """Returns '([Root].NAMESPACE, "[stmt.arg]");'"""
         return ['(', self.root, '.NAMESPACE, "', stmt_arg, '");']
@@ -2601,8 +5296,8 @@ class MethodGenerator(object):
 class LeafMethodGenerator(MethodGenerator):
     """Method generator for YANG leaf and leaf-list associated methods"""
 
-    def __init__(self, stmt, ctx):
-        super(LeafMethodGenerator, self).__init__(stmt, ctx)
+    def __init__(self, stmt, ctx, base=None):
+        super(LeafMethodGenerator, self).__init__(stmt, ctx, base)
         assert self.is_leaf or self.is_leaflist
         self.stmt_type = search_one(stmt, 'type')
         self.base_type = get_base_type(self.stmt_type)
@@ -2615,28 +5310,27 @@ class LeafMethodGenerator(MethodGenerator):
         key = search_one(get_parent(stmt), 'key')
         self.is_optional = key is None or stmt.arg not in key.arg.split(' ')
 
+    def template_values(self, **values):
+        """Returns values with the names of the statement of this generator,
+        of the root class and of the JNC type of the leaf added.
+
+        """
+        values['type'] = self.type_str[0]
+        return super(LeafMethodGenerator, self).template_values(**values)
+
     def getters(self):
         """get<Identifier>Value method generator."""
         assert self.is_leaf
-        method = JavaMethod()
-        method.set_return_type(self.type_str[0])
-        method.set_name('get' + self.n + 'Value')
-        method.add_exception('JNCException')
-
         # YangEmpty type needs to be special treated
         if self.type_str[0] == 'com.tailf.jnc.YangEmpty':
-            method.add_javadoc('Searches for ' + self.stmt.keyword + ' "' +
-                               self.stmt.arg + '".')
-            method.add_javadoc('@return A YangEmpty object if ' +
-                               self.stmt.keyword +
-                               ' exists; <code>null</code> otherwise.')
+            template = empty_leaf_getter_template
         else:
-            method.add_javadoc('Gets the value for child ' + self.stmt.keyword +
-                               ' "' + self.stmt.arg + '".')
-            method.add_javadoc('@return The value of the ' + self.stmt.keyword + '.')
+            template = leaf_getter_template
+        method = template.render(self.template_values())
 
         # Leaves with a default value returns it instead of null
         if self.default:
+            method.body = []
             method.add_line(''.join([method.return_type, ' ', self.n2, ' = (',
                                      method.return_type, ')getValue("',
                                      self.stmt.arg, '");']))
@@ -2684,112 +5378,109 @@ class LeafMethodGenerator(MethodGenerator):
             method.add_line(''.join(newValue))
             method.add_line('}')
             method.add_line('return ' + self.n2 + ';')
-        else:
-            method.add_line(''.join(['return (', method.return_type,
-                                     ')getValue("', self.stmt.arg, '");']))
         return [self.fix_imports(method, child=True)]
 
     def setters(self):
-        name = 'set' + self.n + 'Value'
         num_methods = 2 + (not self.is_string)
-        value_type = self.type_str[0]  # JNC type
-        res = [JavaMethod(name=name) for _ in range(num_methods)]
+        return [self.fix_imports(self._setter(i), child=True)
+                for i in range(num_methods)]
 
-        for i, method in enumerate(res):
-            param_names = [self.n2 + 'Value']
-            method.add_exception('JNCException')
-            method.add_javadoc('Sets the value for child ' + self.stmt.keyword +
-                               ' "' + self.stmt.arg + '",')
-            if i == 0:
-                param_types = [value_type]
-                if not self.is_typedef:
-                    method.add_javadoc('using instance of generated typedef class.')
-                else:
-                    method.add_javadoc('using a JNC type value.')
-                method.add_javadoc(' '.join(['@param', param_names[0],
-                                             'The value to set.']))
-                method.add_line(''.join(['set', normalize(self.stmt.keyword),
-                                         'Value(', self.root, '.NAMESPACE,']))
-                method.add_dependency(self.root)
-                method.add_line('    "' + self.stmt.arg + '",')
-                method.add_line('    ' + param_names[0] + ',')
-                method.add_line('    childrenNames());')
-            elif self.type_str[0] == 'com.tailf.jnc.YangEmpty':
-                method.add_javadoc('by instantiating it (value n/a).')
-                param_types = []  # Add parameter here to get correct javadoc
-                method.add_parameter('String', param_names[0])
-                method.add_javadoc(' '.join(['@param', param_names[0], 'ignored.']))
-                l = [name, '(new ', method.add_dependency(value_type), '());']
-                method.add_line(''.join(l))
+    def _setter(self, i):
+        """Returns the i:th set<Identifier>Value method: the first takes a
+        value of the JNC type of the leaf, the others a primitive value (if
+        the type is not a string) and a String value.
+
+        """
+        if i == 0:
+            if not self.is_typedef:
+                using = 'using instance of generated typedef class.'
             else:
-                line = [name, '(new ', method.add_dependency(value_type),
-                        '(', param_names[0]]
-                if not self.is_string and i == 1:
-                    param_types = [self.type_str[1]]
-                    method.add_javadoc('using Java primitive values.')
-                    # FIXME: Some types are incorrectly classified as string
-                else:
-                    param_types = ['String']
-                    method.add_javadoc('using a String value.')
-
-                if self.type_str[0] == 'com.tailf.jnc.YangUnion':
-                    line.append(', new String[] {')
-                    method.add_line(''.join(line))
-                    for type_stmt in search(self.base_type, 'type'):
-                        member_type, _ = get_types(type_stmt, self.ctx)
-                        method.add_line('     "' + member_type + '",')
-                    line = ['}']
-                elif self.type_str[0] == 'com.tailf.jnc.YangEnumeration':
-                    line.append(', new String[] {')
-                    method.add_line(''.join(line))
-                    for enum in search(self.base_type, 'enum'):
-                        method.add_line('     "' + enum.arg + '",')
-                    line = ['}']
-                elif self.type_str[0] == 'com.tailf.jnc.YangBits':
-                    line.append(',')
-                    method.add_line(''.join(line))
-                    mask = 0
-                    smap = ['    new String[] {']
-                    imap = ['    new int[] {']
-                    position = 0
-                    for bit in search(self.base_type, 'bit'):
-                        smap.extend(['"', bit.arg, '", '])
-                        pos_stmt = search_one(bit, 'position')
-                        if pos_stmt:
-                            position = int(pos_stmt.arg)
-                        imap.extend([str(position), ', '])
-                        mask += 1 << position
-                        position += 1
-                    smap.append('},')
-                    imap.append('}')
-                    method.add_line(''.join(['    new BigInteger("',
-                                                  str(mask), '"),']))
-                    method.add_line(''.join(smap))
-                    method.add_line(''.join(imap))
-                    line = []
-                elif self.type_str[0] == 'com.tailf.jnc.YangDecimal64':
-                    frac_digits = search_one(self.base_type, 'fraction-digits')
-                    line.extend([', ', frac_digits.arg])
-
-                line.append('));')
-                method.add_line(''.join(line))
+                using = 'using a JNC type value.'
+            values = self.template_values(using=using)
+            return jnc_leaf_setter_template.render(values)
+        elif self.type_str[0] == 'com.tailf.jnc.YangEmpty':
+            return empty_leaf_setter_template.render(self.template_values())
+
+        if not self.is_string and i == 1:
+            param_type = self.type_str[1]
+            using = 'using Java primitive values.'
+            # FIXME: Some types are incorrectly classified as string
+        else:
+            param_type = 'String'
+            using = 'using a String value.'
+        if self.type_str[0] in ('com.tailf.jnc.YangUnion',
+                                'com.tailf.jnc.YangEnumeration',
+                                'com.tailf.jnc.YangBits'):
+            return self._member_setter(param_type, using)
+
+        args = ''
+        if self.type_str[0] == 'com.tailf.jnc.YangDecimal64':
+            frac_digits = search_one(self.base_type, 'fraction-digits')
+            args = ', ' + frac_digits.arg
+        values = self.template_values(param_type=param_type, using=using,
+                                      args=args)
+        return value_leaf_setter_template.render(values)
+
+    def _member_setter(self, param_type, using):
+        """Returns a set<Identifier>Value method taking a param_type value,
+        for leaves of a union, enumeration or bits type, whose members are
+        passed to the constructor of the JNC type.
 
-            for param_type, param_name in zip(param_types, param_names):
-                method.add_parameter(param_type, param_name)
-                method.add_javadoc(' '.join(['@param', param_name,
-                                             'used during instantiation.']))
-            self.fix_imports(method, child=True)
-        return res
+        """
+        name = 'set' + self.n + 'Value'
+        param_name = self.n2 + 'Value'
+        method = JavaMethod(name=name)
+        method.add_exception('JNCException')
+        method.add_javadoc('Sets the value for child ' + self.stmt.keyword +
+                           ' "' + self.stmt.arg + '",')
+        method.add_javadoc(using)
+        line = [name, '(new ', method.add_dependency(self.type_str[0]),
+                '(', param_name]
+        if self.type_str[0] == 'com.tailf.jnc.YangUnion':
+            line.append(', new String[] {')
+            method.add_line(''.join(line))
+            for type_stmt in search(self.base_type, 'type'):
+                member_type, _ = get_types(type_stmt, self.ctx)
+                method.add_line('     "' + member_type + '",')
+            line = ['}']
+        elif self.type_str[0] == 'com.tailf.jnc.YangEnumeration':
+            line.append(', new String[] {')
+            method.add_line(''.join(line))
+            for enum in search(self.base_type, 'enum'):
+                method.add_line('     "' + enum.arg + '",')
+            line = ['}']
+        else:  # com.tailf.jnc.YangBits
+            line.append(',')
+            method.add_line(''.join(line))
+            mask = 0
+            smap = ['    new String[] {']
+            imap = ['    new int[] {']
+            position = 0
+            for bit in search(self.base_type, 'bit'):
+                smap.extend(['"', bit.arg, '", '])
+                pos_stmt = search_one(bit, 'position')
+                if pos_stmt:
+                    position = int(pos_stmt.arg)
+                imap.extend([str(position), ', '])
+                mask += 1 << position
+                position += 1
+            smap.append('},')
+            imap.append('}')
+            method.add_line(''.join(['    new BigInteger("',
+                                          str(mask), '"),']))
+            method.add_line(''.join(smap))
+            method.add_line(''.join(imap))
+            line = []
+        line.append('));')
+        method.add_line(''.join(line))
+        method.add_parameter(param_type, param_name)
+        method.add_javadoc(' '.join(['@param', param_name,
+                                     'used during instantiation.']))
+        return method
 
     def unsetter(self):
         """unset<Identifier>Value method generator"""
-        method = JavaMethod()
-        method.add_javadoc(' '.join(['Unsets the value for child',
-                                     self.stmt.keyword,
-                                     '"' + self.stmt.arg + '".']))
-        method.set_name('unset' + self.n + 'Value')
-        method.add_exception('JNCException')
-        method.add_line('delete("' + self.stmt.arg + '");')
+        method = leaf_unsetter_template.render(self.template_values())
         return self.fix_imports(method, child=True)
 
     def _parent_method(self, method_type):
@@ -2801,27 +5492,16 @@ class LeafMethodGenerator(MethodGenerator):
 
         """
         assert self.is_leaflist
-        res = [self._parent_template(method_type) for _ in range(2)]
-
-        for i, method in enumerate(res):
-            method.add_javadoc(''.join([method_type.capitalize(), 's ',
-                                        self.stmt.keyword, ' entry "',
-                                        self.n2, '".']))
-            if i == 1:
-                method.add_javadoc('The value is specified as a string.')
-            method.add_javadoc(''.join(['@param ', self.n2, 'Value Value to ',
-                                     method_type, '.']))
+        res = []
+        for i, template in enumerate(leaf_list_entry_templates):
             param_type = 'String'
             if i == 0:
                 param_type = self.type_str[0]
-            method.add_parameter(param_type, self.n2 + 'Value')
-            path = ['String path = "', self.n2, '[', self.n2, 'Value]";']
-            method.add_line(''.join(path))
-            if method_type == 'delete':
-                method.add_line('delete(path);')
-            else:  # get
-                method.add_line('insertChild(path);')
-            self.fix_imports(method, child=True)
+            action = 'delete' if method_type == 'delete' else 'insertChild'
+            values = self.template_values(method_type=method_type,
+                                          Method_type=method_type.capitalize(),
+                                          param_type=param_type, action=action)
+            res.append(self.fix_imports(template.render(values), child=True))
         return res
 
     def deleters(self):
@@ -2833,17 +5513,7 @@ class LeafMethodGenerator(MethodGenerator):
         return self._parent_method('delete')
 
     def adders(self):
-        method = JavaMethod(name=('add' + self.n))
-        method.add_exception('JNCException')
-        method.add_javadoc('This method is used for creating a subtree filter.')
-        method.add_javadoc(''.join(['The added "', self.stmt.arg, '" ',
-                                    self.stmt.keyword,
-                                    ' will not have a value.']))
-        method.add_line('set' + normalize(self.stmt.keyword) + 'Value(' +
-                        self.root + '.NAMESPACE,')
-        method.add_line('    "' + self.stmt.arg + '",')
-        method.add_line('    null,')
-        method.add_line('    childrenNames());')
+        method = leaf_adder_template.render(self.template_values())
         return self.fix_imports(method, child=True)
 
     def markers(self):
@@ -2854,35 +5524,27 @@ class LeafMethodGenerator(MethodGenerator):
 
     def mark(self, op):
         assert op in ('replace', 'merge', 'create', 'delete')
-        mark_methods = [JavaMethod()]
-        if not self.is_string and self.is_leaflist:
-            mark_methods.append(JavaMethod())
-        for i, mark_method in enumerate(mark_methods):
-            mark_method.set_name('mark' + self.n + normalize(op))
-            mark_method.add_exception('JNCException')
-            path = self.n2
-            mark_method.add_javadoc(''.join(['Marks the ', self.stmt.keyword,
-                                             ' "', self.stmt.arg,
-                                             '" with operation "', op, '".']))
-            if self.is_leaflist:
-                path += '[name=\'" + ' + self.n2 + 'Value + "\']'
-                javadoc = '@param ' + self.n2 + 'Value The value to mark'
-                param_type = self.type_str[0]
-                if i == 1:
-                    javadoc += ', given as a String'
-                    param_type = 'String'
-                mark_method.add_parameter(param_type, self.n2 + 'Value')
-                mark_method.add_javadoc(javadoc)
-            mark_method.add_line('markLeaf' + normalize(op) + '("' + path + '");')
-            self.fix_imports(mark_method, child=True)
+        if not self.is_leaflist:
+            values = self.template_values(op=op, Op=normalize(op))
+            method = leaf_marker_template.render(values)
+            return [self.fix_imports(method, child=True)]
+        mark_methods = []
+        for param_type, given in ((self.type_str[0], ''),
+                                  ('String', ', given as a String')):
+            values = self.template_values(op=op, Op=normalize(op),
+                                          param_type=param_type, given=given)
+            method = leaf_list_marker_template.render(values)
+            mark_methods.append(self.fix_imports(method, child=True))
+            if self.is_string:
+                break
         return mark_methods
 
 
 class TypedefMethodGenerator(MethodGenerator):
     """Method generator specific to typedef classes"""
 
-    def __init__(self, stmt, ctx=None):
-        super(TypedefMethodGenerator, self).__init__(stmt, ctx)
+    def __init__(self, stmt, ctx=None, base=None):
+        super(TypedefMethodGenerator, self).__init__(stmt, ctx, base)
         assert self.gen is self
         assert self.is_typedef, 'This class is only valid for typedef stmts'
         self.type = search_one(stmt, 'type')
@@ -3025,8 +5687,8 @@ class TypedefMethodGenerator(MethodGenerator):
 class ContainerMethodGenerator(MethodGenerator):
     """Method generator specific to classes generated from container stmts"""
 
-    def __init__(self, stmt, ctx=None):
-        super(ContainerMethodGenerator, self).__init__(stmt, ctx)
+    def __init__(self, stmt, ctx=None, base=None):
+        super(ContainerMethodGenerator, self).__init__(stmt, ctx, base)
         assert self.gen is self
         assert self.is_container, 'Only valid for containers and notifications'
 
@@ -3076,8 +5738,8 @@ class ContainerMethodGenerator(MethodGenerator):
 class ListMethodGenerator(MethodGenerator):
     """Method generator specific to classes generated from list stmts"""
 
-    def __init__(self, stmt, ctx):
-        super(ListMethodGenerator, self).__init__(stmt, ctx)
+    def __init__(self, stmt, ctx, base=None):
+        super(ListMethodGenerator, self).__init__(stmt, ctx, base)
         assert self.gen is self
         assert self.is_list, 'Only valid for list stmts'
 
@@ -3217,37 +5879,30 @@ class ListMethodGenerator(MethodGenerator):
 
         """
         num_methods = 2 if self.is_config else 1
-        res = [self._parent_template(method_type) for _ in range(num_methods)]
+        path = ['String path = "', self.stmt.arg]
+        for key in self.gen.key_stmts:
+            key_arg = camelize(key.arg)
+            path.extend(['[', key_arg, '=\'" + ',key_arg, 'Value + "\']'])
+        path.append('";')
+        values = self.template_values(path=''.join(path))
+        template = list_entry_templates[method_type]
 
-        for i, method in enumerate(res):
-            javadoc1 = [method_type.capitalize(), 's ', self.stmt.keyword,
-                        ' entry "', self.n2, '", with specified keys.']
-            javadoc2 = []
-            path = ['String path = "', self.stmt.arg]
+        res = []
+        for i in range(num_methods):
+            javadocs = []
+            params = []
             if i == 1:
-                javadoc2.append('The keys are specified as strings.')
-
+                javadocs.append('The keys are specified as strings.')
             for key in self.gen.key_stmts:
                 key_arg = camelize(key.arg)
-                javadoc2.append(''.join(['@param ', key_arg,
+                javadocs.append(''.join(['@param ', key_arg,
                     'Value Key argument of child.']))
                 param_type = 'String'
                 if i == 0:
                     param_type, _ = get_types(key, self.ctx)
-                method.add_parameter(param_type, key_arg + 'Value')
-                path.extend(['[', key_arg, '=\'" + ',key_arg, 'Value + "\']'])
-            path.append('";')
-
-            method.add_javadoc(''.join(javadoc1))
-            for javadoc in javadoc2:
-                method.add_javadoc(javadoc)
-            method.add_line(''.join(path))
-            if method_type == 'delete':
-                method.set_return_type('void')
-                method.add_line('delete(path);')
-            else:  # get
-                method.add_line('return (' + self.n + ')searchOne(path);')
-            self.fix_imports(method, child=True)
+                params.append((param_type, key_arg + 'Value'))
+            method = template.render(dict(values), params, javadocs)
+            res.append(self.fix_imports(method, child=True))
         return res
 
     def deleters(self):
@@ -3292,6 +5947,9 @@ class OrderedSet(collections.MutableSet):
 
     """
 
+    ITEM, PREV, NEXT = list(range(3))
+    """Indexes of the item and of the previous and next links in a node"""
+
     def __init__(self, iterable=None):
         """Creates an ordered set.
 
@@ -3300,7 +5958,6 @@ class OrderedSet(collections.MutableSet):
                     used, the set is initialized as empty.
 
         """
-        self.ITEM, self.PREV, self.NEXT = list(range(3))
         self.end = end = []
         end += [None, end, end]         # sentinel node for doubly linked list
         self.map = {}                   # value --> [value, prev, next]
@@ -3374,6 +6031,16 @@ class OrderedSet(collections.MutableSet):
         self.discard(item)
         return item
 
+    def clear(self):
+        """Discards all items of this set, emptying the links of the list
+        instead of discarding the items one by one.
+
+        """
+        for link in self.map.values():
+            del link[:]
+        self.map.clear()
+        self.end[self.PREV:] = [self.end, self.end]
+
     def as_sorted_list(self):
         """Returns a sorted list with the items in this set"""
         res = [x for x in self]
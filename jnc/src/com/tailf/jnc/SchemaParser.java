@@ -1,6 +1,10 @@
 package com.tailf.jnc;
 
+import java.io.BufferedInputStream;
+import java.io.DataInputStream;
+import java.io.FileInputStream;
 import java.io.IOException;
+import java.io.InputStream;
 import java.net.URL;
 import java.util.ArrayList;
 import java.util.HashMap;
@@ -37,8 +41,32 @@ import org.xml.sax.helpers.XMLReaderFactory;
  * <schema>
  * </pre>
  * into a hashtable with {@link SchemaNode} elements.
+ * <p>
+ * Schema files generated with the <code>--jnc-schema-format binary</code>
+ * option of the JNC pyang plugin are read with {@link #readBinaryFile} and
+ * {@link #findAndReadBinaryFile} instead. These start with the magic number
+ * {@link #BINARY_SCHEMA_MAGIC} and {@link #BINARY_SCHEMA_VERSION}, followed by
+ * a record for each node, starting with the byte 1, and end with the byte 0.
+ * A record holds the tagpath, namespace, primitive_type, yang_node_type, type,
+ * yang_java_type, mapping_path, yang_graph_type, min_occurs, max_occurs,
+ * children, yang_children, flags and desc of the node, in that order. Integers
+ * are big-endian 32-bit. Strings are references to a table of the strings read
+ * so far: -1 for null, the size of the table for a new string, which follows
+ * as its UTF-8 length and bytes, or the index of a string in the table. String
+ * arrays are written as their length, -1 for null, and a string reference for
+ * each element.
  */
 public class SchemaParser {
+    /**
+     * The first four bytes of a binary schema file, "JNCS".
+     */
+    public static final int BINARY_SCHEMA_MAGIC = 0x4a4e4353;
+
+    /**
+     * The version of the binary schema file format.
+     */
+    public static final int BINARY_SCHEMA_VERSION = 1;
+
     protected XMLReader parser;
 
     public SchemaParser() throws JNCException {
@@ -234,4 +262,136 @@ public class SchemaParser {
         }
         readFile(url, h);
     }
+
+    /**
+     * Read in a binary schema file, and populate a hashtable with SchemaNode
+     * objects.
+     *
+     * @param filename name of file containing the binary schema
+     * @param h The hashtable to populate.
+     * @throws JNCException If the file cannot be read or is not a binary
+     *             schema file.
+     */
+    public void readBinaryFile(String filename, HashMap<Tagpath, SchemaNode> h)
+            throws JNCException {
+        try {
+            readBinary(new FileInputStream(filename), filename, h);
+        } catch (IOException e) {
+            throw new JNCException(JNCException.PARSER_ERROR, "Unable to open" +
+                    " file: " + filename + ": " + e);
+        }
+    }
+
+    /**
+     * Read in a binary schema file, and populate a hashtable with SchemaNode
+     * objects.
+     *
+     * @param schemaUrl URL of the binary schema to read
+     * @param h The hashtable to populate.
+     * @throws JNCException If the file cannot be read or is not a binary
+     *             schema file.
+     */
+    public void readBinaryFile(URL schemaUrl, HashMap<Tagpath, SchemaNode> h)
+            throws JNCException {
+        try {
+            readBinary(schemaUrl.openStream(), schemaUrl.toString(), h);
+        } catch (IOException e) {
+            throw new JNCException(JNCException.PARSER_ERROR, "Unable to open" +
+                    " file: " + schemaUrl + ": " + e);
+        }
+    }
+
+    /**
+     * Scans the classpath for the binary schema file and populates the
+     * hashtable with SchemaNode objects, like {@link #findAndReadFile}.
+     *
+     * @param filename
+     * @param h
+     * @param clazz
+     * @throws JNCException if the file is not found or cannot be read.
+     */
+    public void findAndReadBinaryFile(final String filename, final HashMap<Tagpath, SchemaNode> h, final Class clazz)
+            throws JNCException {
+        final URL url = clazz.getResource(filename);
+        if (url == null){
+            throw new JNCException(JNCException.PARSER_ERROR, "Cannot find file: " + filename + " on the classpath.");
+        }
+        readBinaryFile(url, h);
+    }
+
+    private void readBinary(InputStream stream, String name,
+            HashMap<Tagpath, SchemaNode> h) throws JNCException {
+        final DataInputStream in = new DataInputStream(
+                new BufferedInputStream(stream));
+        try {
+            if (in.readInt() != BINARY_SCHEMA_MAGIC) {
+                throw new JNCException(JNCException.PARSER_ERROR, "parse file: "
+                        + name + " error: not a binary schema file");
+            }
+            final int version = in.readInt();
+            if (version != BINARY_SCHEMA_VERSION) {
+                throw new JNCException(JNCException.PARSER_ERROR, "parse file: "
+                        + name + " error: unsupported version " + version);
+            }
+            final ArrayList<String> strings = new ArrayList<String>();
+            while (in.readByte() != 0) {
+                final SchemaNode node = new SchemaNode();
+                final String[] tagpath = readStrings(in, strings);
+                node.tagpath = new Tagpath(tagpath == null ? new String[0] : tagpath);
+                node.namespace = readString(in, strings);
+                node.primitive_type = in.readInt();
+                node.yang_node_type = readString(in, strings);
+                node.type = readString(in, strings);
+                node.yang_java_type = readString(in, strings);
+                node.mapping_path = readString(in, strings);
+                node.yang_graph_type = in.readInt();
+                node.min_occurs = in.readInt();
+                node.max_occurs = in.readInt();
+                node.children = readStrings(in, strings);
+                node.yang_children = readStrings(in, strings);
+                node.flags = in.readInt();
+                node.desc = readString(in, strings);
+                h.put(node.tagpath, node);
+            }
+        } catch (final IOException e) {
+            throw new JNCException(JNCException.PARSER_ERROR, "parse file: "
+                    + name + " error: " + e);
+        } finally {
+            try {
+                in.close();
+            } catch (final IOException e) {
+                // Nothing more to read
+            }
+        }
+    }
+
+    private static String readString(DataInputStream in,
+            ArrayList<String> strings) throws IOException {
+        final int ref = in.readInt();
+        if (ref == -1) {
+            return null;
+        } else if (ref == strings.size()) {
+            final byte[] data = new byte[in.readInt()];
+            in.readFully(data);
+            final String s = new String(data, "UTF-8");
+            strings.add(s);
+            return s;
+        } else if (ref < 0 || ref > strings.size()) {
+            throw new IOException("invalid string reference " + ref);
+        }
+        return strings.get(ref);
+    }
+
+    private static String[] readStrings(DataInputStream in,
+            ArrayList<String> strings) throws IOException {
+        final int length = in.readInt();
+        if (length == -1) {
+            return null;
+        }
+        final String[] res = new String[length];
+        for (int i = 0; i < length; i++) {
+            res[i] = readString(in, strings);
+        }
+        return res;
+    }
 }
@@ -1,13 +1,37 @@
 package com.tailf.jnc;
 
+import java.util.ArrayList;
 import java.util.HashMap;
 import java.util.Set;
+import java.util.concurrent.ConcurrentHashMap;
 
 /**
  * The SchemaTree class is used to represent the schemas of all namespaces
  */
 public class SchemaTree {
 
+    /**
+     * Registers a shard of the schema of a namespace in its hashmap. Used by
+     * the root classes generated with the --jnc-lazy-schema option of the JNC
+     * pyang plugin, see {@link SchemaTree#addShards}.
+     */
+    public interface ShardLoader {
+        /**
+         * @param shard The number of the shard to register.
+         * @param h The HashMap of the namespace.
+         * @throws JNCException If the shard cannot be read.
+         */
+        void load(int shard, HashMap<Tagpath, SchemaNode> h)
+                throws JNCException;
+    }
+
+    private static class Shards {
+        ShardLoader loader;
+        HashMap<String, ArrayList<Integer>> pending = new HashMap<String, ArrayList<Integer>>();
+    }
+
+    private static ConcurrentHashMap<String, Shards> shards = new ConcurrentHashMap<String, Shards>();
+
     private static HashMap<String, HashMap<Tagpath, SchemaNode>> namespaces = new HashMap<String, HashMap<Tagpath, SchemaNode>>();
 
     /**
@@ -26,6 +50,45 @@ public class SchemaTree {
         return h;
     }
 
+    /**
+     * Adds a SchemaNode to a hashmap of a namespace. Used by the classes
+     * generated with the --jnc-schema-format java option of the JNC pyang
+     * plugin, in place of a schema file. The arguments are the contents of the
+     * elements of a node in a schema file.
+     * 
+     * @param h The HashMap to add the node to.
+     * @param tagpath The tagpath of the node, in /foo/bar style.
+     * @param children The space-separated names of the children of the node.
+     * @param yangChildren The space-separated YANG identifiers of the
+     *            children of the node.
+     */
+    public static void add(HashMap<Tagpath, SchemaNode> h, String tagpath,
+            String namespace, int primitiveType, String yangNodeType,
+            String type, String yangJavaType, String mappingPath,
+            int yangGraphType, int minOccurs, int maxOccurs, String children,
+            String yangChildren, int flags, String desc) {
+        final SchemaNode node = new SchemaNode();
+        final String[] tags = tagpath.split("/");
+        node.tagpath = new Tagpath(Math.max(tags.length - 1, 0));
+        if (tags.length > 0) {
+            System.arraycopy(tags, 1, node.tagpath.p, 0, tags.length - 1);
+        }
+        node.namespace = namespace;
+        node.primitive_type = primitiveType;
+        node.yang_node_type = yangNodeType;
+        node.type = type;
+        node.yang_java_type = yangJavaType;
+        node.mapping_path = mappingPath;
+        node.yang_graph_type = yangGraphType;
+        node.min_occurs = minOccurs;
+        node.max_occurs = maxOccurs;
+        node.children = children.split(" ");
+        node.yang_children = yangChildren.split(" ");
+        node.flags = flags;
+        node.desc = desc;
+        h.put(node.tagpath, node);
+    }
+
     /**
      * @param namespace A YANG module namespace as a String
      * @return The HashMap associated with namespace, or null.
@@ -43,16 +106,97 @@ public class SchemaTree {
     }
 
     /**
-     * Searches for a SchemaNode given a namespace and a Tagpath.
+     * Searches for a SchemaNode given a namespace and a Tagpath. If the schema
+     * of the namespace is registered in shards, the shards that contain tp
+     * are registered first, see {@link SchemaTree#addShards}.
      * 
      * @param namespace The namespace of the module.
      * @param tp The TagPath of the node to search for.
      * @return The SchemaNode with Tagpath tp in module with specified
      *         namespace, or null if not found.
+     * @throws IllegalStateException If a shard cannot be registered, with
+     *             the JNCException of its loader as cause.
      */
     public static SchemaNode lookup(String namespace, Tagpath tp) {
         final HashMap<Tagpath, SchemaNode> t = getHashMap(namespace);
-        return t == null ? null : t.get(tp);
+        if (t == null) {
+            return null;
+        }
+        if (!shards.containsKey(namespace)) {
+            // Only filled when the root class is loaded, never modified
+            return t.get(tp);
+        }
+        return lookupSharded(namespace, t, tp);
+    }
+
+    /**
+     * Searches for a SchemaNode in the hashmap t of namespace, which shards
+     * are registered in. The shards are put in t by loadShards, so t is only
+     * read with the lock held.
+     */
+    private static synchronized SchemaNode lookupSharded(String namespace,
+            HashMap<Tagpath, SchemaNode> t, Tagpath tp) {
+        final SchemaNode node = t.get(tp);
+        if (node == null && loadShards(namespace, tp)) {
+            return t.get(tp);
+        }
+        return node;
+    }
+
+    /**
+     * Adds shards of the schema of a namespace that are registered on demand:
+     * the first time a tagpath starting with tops[i] is looked up, shard
+     * number i + 1 is registered by loader.
+     * 
+     * @param namespace The namespace of the module as a String.
+     * @param loader The loader of the shards.
+     * @param tops The name of the top level node of each shard.
+     */
+    public static synchronized void addShards(String namespace,
+            ShardLoader loader, String[] tops) {
+        final Shards s = new Shards();
+        s.loader = loader;
+        for (int i = 0; i < tops.length; i++) {
+            ArrayList<Integer> pending = s.pending.get(tops[i]);
+            if (pending == null) {
+                pending = new ArrayList<Integer>();
+                s.pending.put(tops[i], pending);
+            }
+            pending.add(i + 1);
+        }
+        shards.put(namespace, s);
+    }
+
+    /**
+     * Registers the shards of namespace that contain tagpath tp, unless they
+     * have already been registered. A shard that cannot be registered stays
+     * pending, so that it is tried again by the next lookup.
+     * 
+     * @return true if any shard was registered.
+     * @throws IllegalStateException If a shard cannot be registered.
+     */
+    private static synchronized boolean loadShards(String namespace,
+            Tagpath tp) {
+        final Shards s = shards.get(namespace);
+        if (s == null || tp.p.length == 0) {
+            return false;
+        }
+        final ArrayList<Integer> pending = s.pending.get(tp.p[0]);
+        if (pending == null) {
+            return false;
+        }
+        final HashMap<Tagpath, SchemaNode> h = getHashMap(namespace);
+        while (!pending.isEmpty()) {
+            try {
+                s.loader.load(pending.get(0), h);
+            } catch (final JNCException e) {
+                throw new IllegalStateException("Unable to load shard "
+                        + pending.get(0) + " of the schema of " + namespace, e);
+            }
+            pending.remove(0);
+        }
+        s.pending.remove(tp.p[0]);
+        return true;
     }
 
 }
\ No newline at end of file
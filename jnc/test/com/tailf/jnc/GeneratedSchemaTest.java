@@ -0,0 +1,103 @@
+package com.tailf.jnc;
+
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.HashMap;
+import junit.framework.Assert;
+import org.junit.Before;
+import org.junit.Test;
+
+import com.tailf.jnc.schemaFixture.FixtureSchema;
+
+
+/**
+ * Reads the schema of test/resources/schemaFixture/schema-fixture.yang in
+ * each of the formats generated by the JNC pyang plugin, with --jnc-output
+ * src/com/tailf/jnc: Fixture.schema and Fixture.schema.bin with
+ * --jnc-schema-format xml and binary, and the FixtureSchema classes with
+ * --jnc-lazy-schema --jnc-schema-format java.
+ */
+public class GeneratedSchemaTest {
+
+    private static final String NAMESPACE = "urn:tail-f:jnc:schema-fixture";
+
+    private HashMap<Tagpath, SchemaNode> expected;
+
+    @Before
+    public void setUp() throws JNCException {
+        expected = new HashMap<Tagpath, SchemaNode>();
+        new SchemaParser().findAndReadFile("/schemaFixture/Fixture.schema", expected, SchemaParser.class);
+        Assert.assertEquals(9, expected.size());
+    }
+
+    @Test
+    public void testBinarySchemaMatchesXmlSchema() throws JNCException {
+        final HashMap<Tagpath, SchemaNode> h = new HashMap<Tagpath, SchemaNode>();
+        new SchemaParser().findAndReadBinaryFile("/schemaFixture/Fixture.schema.bin", h, SchemaParser.class);
+        assertSchemaEquals(expected, h);
+    }
+
+    @Test
+    public void testSchemaClassesMatchXmlSchema() {
+        final HashMap<Tagpath, SchemaNode> h = new HashMap<Tagpath, SchemaNode>();
+        for (int shard = 0; shard <= 2; shard++) {
+            FixtureSchema.register(shard, h);
+        }
+        assertSchemaEquals(expected, h);
+    }
+
+    @Test
+    public void testSchemaClassShardsAreRegisteredOnLookup() {
+        // As in the registerSchema method of the generated root class
+        final HashMap<Tagpath, SchemaNode> h = SchemaTree.create(NAMESPACE);
+        FixtureSchema.register(0, h);
+        final ArrayList<Integer> loaded = new ArrayList<Integer>();
+        SchemaTree.addShards(NAMESPACE, new SchemaTree.ShardLoader() {
+            public void load(int shard, HashMap<Tagpath, SchemaNode> h) {
+                loaded.add(shard);
+                FixtureSchema.register(shard, h);
+            }
+        }, new String[] {"resolver", "server"});
+
+        final Tagpath root = new Tagpath("/");
+        assertNodeEquals(expected.get(root), SchemaTree.lookup(NAMESPACE, root));
+        Assert.assertTrue(loaded.isEmpty());
+        final Tagpath enabled = new Tagpath("/server/options/enabled");
+        assertNodeEquals(expected.get(enabled), SchemaTree.lookup(NAMESPACE, enabled));
+        Assert.assertNull(SchemaTree.lookup(NAMESPACE, new Tagpath("/server/missing")));
+        Assert.assertEquals(1, loaded.size());
+        Assert.assertEquals(2, loaded.get(0).intValue());
+        final Tagpath hostName = new Tagpath("/resolver/host-name");
+        assertNodeEquals(expected.get(hostName), SchemaTree.lookup(NAMESPACE, hostName));
+        Assert.assertEquals(2, loaded.size());
+        assertSchemaEquals(expected, h);
+    }
+
+    private static void assertSchemaEquals(HashMap<Tagpath, SchemaNode> expected,
+            HashMap<Tagpath, SchemaNode> actual) {
+        Assert.assertEquals(expected.keySet(), actual.keySet());
+        for (final Tagpath tp : expected.keySet()) {
+            assertNodeEquals(expected.get(tp), actual.get(tp));
+        }
+    }
+
+    private static void assertNodeEquals(SchemaNode expected, SchemaNode actual) {
+        final String tp = "/" + expected.tagpath;
+        Assert.assertNotNull(tp, actual);
+        Assert.assertEquals(tp, expected.tagpath, actual.tagpath);
+        Assert.assertEquals(tp, expected.namespace, actual.namespace);
+        Assert.assertEquals(tp, expected.primitive_type, actual.primitive_type);
+        Assert.assertEquals(tp, expected.yang_node_type, actual.yang_node_type);
+        Assert.assertEquals(tp, expected.type, actual.type);
+        Assert.assertEquals(tp, expected.yang_java_type, actual.yang_java_type);
+        Assert.assertEquals(tp, expected.mapping_path, actual.mapping_path);
+        Assert.assertEquals(tp, expected.yang_graph_type, actual.yang_graph_type);
+        Assert.assertEquals(tp, expected.min_occurs, actual.min_occurs);
+        Assert.assertEquals(tp, expected.max_occurs, actual.max_occurs);
+        Assert.assertTrue(tp, Arrays.equals(expected.children, actual.children));
+        Assert.assertTrue(tp, Arrays.equals(expected.yang_children, actual.yang_children));
+        Assert.assertEquals(tp, expected.flags, actual.flags);
+        Assert.assertEquals(tp, expected.desc, actual.desc);
+    }
+
+}
@@ -1,5 +1,9 @@
 package com.tailf.jnc;
 
+import java.io.DataOutputStream;
+import java.io.File;
+import java.io.FileOutputStream;
+import java.io.IOException;
 import java.util.HashMap;
 import junit.framework.Assert;
 import org.junit.After;
@@ -37,4 +41,57 @@ public class SchemaParserTest {
         Assert.assertEquals("urn:ietf:params:xml:ns:yang:ietf-yang-types", h.values().iterator().next().namespace);
     }
 
+    @Test
+    public void testReadBinaryFile() throws JNCException, IOException {
+        final File file = File.createTempFile("Test", ".schema.bin");
+        file.deleteOnExit();
+        final DataOutputStream out = new DataOutputStream(new FileOutputStream(file));
+        out.writeInt(SchemaParser.BINARY_SCHEMA_MAGIC);
+        out.writeInt(SchemaParser.BINARY_SCHEMA_VERSION);
+        out.writeByte(1);
+        out.writeInt(1);              // tagpath /a
+        writeNewString(out, 0, "a");
+        writeNewString(out, 1, "urn:test");
+        out.writeInt(0);              // primitive_type
+        writeNewString(out, 2, "container");
+        out.writeInt(-1);             // type
+        writeNewString(out, 3, "gen.test.A");
+        out.writeInt(-1);             // mapping_path
+        out.writeInt(0);              // yang_graph_type
+        out.writeInt(1);              // min_occurs
+        out.writeInt(1);              // max_occurs
+        out.writeInt(1);              // children
+        out.writeInt(0);              // "a", from the string table
+        out.writeInt(-1);             // yang_children
+        out.writeInt(0);              // flags
+        writeNewString(out, 4, "");
+        out.writeByte(0);
+        out.close();
+
+        parser.readBinaryFile(file.getPath(), h);
+        Assert.assertEquals(1, h.size());
+        final SchemaNode node = h.get(new Tagpath("/a"));
+        Assert.assertEquals("urn:test", node.namespace);
+        Assert.assertEquals("container", node.yang_node_type);
+        Assert.assertNull(node.type);
+        Assert.assertEquals("gen.test.A", node.yang_java_type);
+        Assert.assertEquals(1, node.max_occurs);
+        Assert.assertEquals("a", node.children[0]);
+        Assert.assertNull(node.yang_children);
+        Assert.assertEquals("", node.desc);
+    }
+
+    @Test (expected=JNCException.class)
+    public void testBinaryFileNotFound() throws JNCException {
+        parser.findAndReadBinaryFile("File Not Found.schema.bin", h, SchemaParser.class);
+    }
+
+    private static void writeNewString(DataOutputStream out, int ref, String s)
+            throws IOException {
+        final byte[] data = s.getBytes("UTF-8");
+        out.writeInt(ref);
+        out.writeInt(data.length);
+        out.write(data);
+    }
+
 }
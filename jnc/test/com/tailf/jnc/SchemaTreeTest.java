@@ -0,0 +1,63 @@
+package com.tailf.jnc;
+
+import java.util.ArrayList;
+import java.util.HashMap;
+import junit.framework.Assert;
+import org.junit.Test;
+
+
+
+public class SchemaTreeTest {
+
+    private static final String NAMESPACE = "urn:test:schema-tree";
+
+    @Test
+    public void testShardsAreLoadedOnLookup() {
+        final HashMap<Tagpath, SchemaNode> h = SchemaTree.create(NAMESPACE);
+        SchemaTree.add(h, "/", NAMESPACE, 0, "module", null, null, null, 0, 1, 1, "a b", "a b", 0, "");
+        final ArrayList<Integer> loaded = new ArrayList<Integer>();
+        SchemaTree.addShards(NAMESPACE, new SchemaTree.ShardLoader() {
+            public void load(int shard, HashMap<Tagpath, SchemaNode> h) {
+                loaded.add(shard);
+                final String top = shard == 1 ? "a" : "b";
+                SchemaTree.add(h, "/" + top + "/", NAMESPACE, 0, "container", null, null, null, 0, 0, 1, "", "", 0, "");
+            }
+        }, new String[] {"a", "b"});
+
+        Assert.assertNotNull(SchemaTree.lookup(NAMESPACE, new Tagpath("/")));
+        Assert.assertTrue(loaded.isEmpty());
+        Assert.assertNotNull(SchemaTree.lookup(NAMESPACE, new Tagpath("/b")));
+        Assert.assertNull(SchemaTree.lookup(NAMESPACE, new Tagpath("/b/c")));
+        Assert.assertEquals(1, loaded.size());
+        Assert.assertEquals(2, loaded.get(0).intValue());
+        Assert.assertNotNull(SchemaTree.lookup(NAMESPACE, new Tagpath("/a")));
+        Assert.assertEquals(2, loaded.size());
+    }
+
+    @Test
+    public void testShardIsLoadedAgainAfterFailure() {
+        final String namespace = NAMESPACE + ":failure";
+        final HashMap<Tagpath, SchemaNode> h = SchemaTree.create(namespace);
+        SchemaTree.add(h, "/", namespace, 0, "module", null, null, null, 0, 1, 1, "a", "a", 0, "");
+        final int[] attempts = {0};
+        SchemaTree.addShards(namespace, new SchemaTree.ShardLoader() {
+            public void load(int shard, HashMap<Tagpath, SchemaNode> h)
+                    throws JNCException {
+                if (attempts[0]++ == 0) {
+                    throw new JNCException(JNCException.PARSER_ERROR, "shard");
+                }
+                SchemaTree.add(h, "/a/", namespace, 0, "container", null, null, null, 0, 0, 1, "", "", 0, "");
+            }
+        }, new String[] {"a"});
+
+        try {
+            SchemaTree.lookup(namespace, new Tagpath("/a"));
+            Assert.fail("Expected IllegalStateException");
+        } catch (final IllegalStateException e) {
+            Assert.assertTrue(e.getCause() instanceof JNCException);
+        }
+        Assert.assertNotNull(SchemaTree.lookup(namespace, new Tagpath("/a")));
+        Assert.assertEquals(2, attempts[0]);
+    }
+
+}
@@ -0,0 +1,43 @@
+/* 
+ * @(#)FixtureSchema.java        1.0 16/10/26
+ *
+ * This file has been auto-generated by JNC, the
+ * Java output format plug-in of pyang.
+ * Origin: module "schema-fixture", revision: "unknown".
+ */
+
+package com.tailf.jnc.schemaFixture;
+
+import com.tailf.jnc.SchemaNode;
+import com.tailf.jnc.SchemaTree;
+import com.tailf.jnc.Tagpath;
+
+import java.util.HashMap;
+
+/**
+ * The schema of module schema-fixture (namespace urn:tail-f:jnc:schema-fixture), registered 
+ * in the schema table by Fixture.registerSchema().
+ *
+ * @version 1.0 2026-10-16
+ * @author Auto Generated
+ */
+public class FixtureSchema {
+
+    /**
+     * Adds the schema nodes of shard number shard of FixtureSchema to the schema table h
+     */
+    public static void register(int shard, HashMap<Tagpath, SchemaNode> h) {
+        switch (shard) {
+        case 0:
+            FixtureSchema1.register(h);
+            break;
+        case 1:
+            FixtureSchema2.register(h);
+            break;
+        case 2:
+            FixtureSchema3.register(h);
+            break;
+        }
+    }
+
+}
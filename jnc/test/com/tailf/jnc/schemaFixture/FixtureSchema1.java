@@ -0,0 +1,32 @@
+/* 
+ * @(#)FixtureSchema1.java        1.0 16/10/26
+ *
+ * This file has been auto-generated by JNC, the
+ * Java output format plug-in of pyang.
+ * Origin: module "schema-fixture", revision: "unknown".
+ */
+
+package com.tailf.jnc.schemaFixture;
+
+import com.tailf.jnc.SchemaNode;
+import com.tailf.jnc.SchemaTree;
+import com.tailf.jnc.Tagpath;
+
+import java.util.HashMap;
+
+/**
+ * Part 1 of the schema of module schema-fixture, registered by FixtureSchema.
+ *
+ * @version 1.0 2026-10-16
+ * @author Auto Generated
+ */
+public class FixtureSchema1 {
+
+    /**
+     * Adds the schema nodes of FixtureSchema1 to the schema table h
+     */
+    public static void register(HashMap<Tagpath, SchemaNode> h) {
+        SchemaTree.add(h, "/", "urn:tail-f:jnc:schema-fixture", 0, "module", null, null, null, 0, 1, 1, "resolver server", "resolver server", 0, "");
+    }
+
+}
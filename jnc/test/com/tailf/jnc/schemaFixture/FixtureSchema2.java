@@ -0,0 +1,34 @@
+/* 
+ * @(#)FixtureSchema2.java        1.0 16/10/26
+ *
+ * This file has been auto-generated by JNC, the
+ * Java output format plug-in of pyang.
+ * Origin: module "schema-fixture", revision: "unknown".
+ */
+
+package com.tailf.jnc.schemaFixture;
+
+import com.tailf.jnc.SchemaNode;
+import com.tailf.jnc.SchemaTree;
+import com.tailf.jnc.Tagpath;
+
+import java.util.HashMap;
+
+/**
+ * Part 2 of the schema of module schema-fixture, registered by FixtureSchema.
+ *
+ * @version 1.0 2026-10-16
+ * @author Auto Generated
+ */
+public class FixtureSchema2 {
+
+    /**
+     * Adds the schema nodes of FixtureSchema2 to the schema table h
+     */
+    public static void register(HashMap<Tagpath, SchemaNode> h) {
+        SchemaTree.add(h, "/resolver/", "urn:tail-f:jnc:schema-fixture", 0, "container", null, "com.tailf.jnc.schemaFixture.Resolver", "resolver", 0, 0, 1, "hostName nameServer", "host-name name-server", 0, "");
+        SchemaTree.add(h, "/resolver/host-name/", "urn:tail-f:jnc:schema-fixture", 0, "leaf", "string", "com.tailf.jnc.YangString", "resolver_host_name", 0, 0, 1, "", "", 0, "");
+        SchemaTree.add(h, "/resolver/name-server/", "urn:tail-f:jnc:schema-fixture", 0, "leaf-list", "string", "com.tailf.jnc.YangString", "resolver_name_server", 0, 0, 1, "", "", 0, "");
+    }
+
+}
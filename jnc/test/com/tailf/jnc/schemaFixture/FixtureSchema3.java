@@ -0,0 +1,36 @@
+/* 
+ * @(#)FixtureSchema3.java        1.0 16/10/26
+ *
+ * This file has been auto-generated by JNC, the
+ * Java output format plug-in of pyang.
+ * Origin: module "schema-fixture", revision: "unknown".
+ */
+
+package com.tailf.jnc.schemaFixture;
+
+import com.tailf.jnc.SchemaNode;
+import com.tailf.jnc.SchemaTree;
+import com.tailf.jnc.Tagpath;
+
+import java.util.HashMap;
+
+/**
+ * Part 3 of the schema of module schema-fixture, registered by FixtureSchema.
+ *
+ * @version 1.0 2026-10-16
+ * @author Auto Generated
+ */
+public class FixtureSchema3 {
+
+    /**
+     * Adds the schema nodes of FixtureSchema3 to the schema table h
+     */
+    public static void register(HashMap<Tagpath, SchemaNode> h) {
+        SchemaTree.add(h, "/server/", "urn:tail-f:jnc:schema-fixture", 0, "list", null, "com.tailf.jnc.schemaFixture.Server", "server", 0, 0, -1, "name port options", "name port options", 0, "");
+        SchemaTree.add(h, "/server/name/", "urn:tail-f:jnc:schema-fixture", 0, "leaf", "string", "com.tailf.jnc.YangString", "name", 0, 1, 1, "", "", 0, "");
+        SchemaTree.add(h, "/server/port/", "urn:tail-f:jnc:schema-fixture", 0, "leaf", "uint16", "com.tailf.jnc.YangUInt16", "server_port", 0, 0, 1, "", "", 0, "");
+        SchemaTree.add(h, "/server/options/", "urn:tail-f:jnc:schema-fixture", 0, "container", null, "com.tailf.jnc.schemaFixture.server.Options", "server_options", 0, 1, 1, "enabled", "enabled", 0, "");
+        SchemaTree.add(h, "/server/options/enabled/", "urn:tail-f:jnc:schema-fixture", 0, "leaf", "boolean", "com.tailf.jnc.YangBoolean", "options_enabled", 0, 0, 1, "", "", 0, "");
+    }
+
+}
@@ -41,6 +41,7 @@ import json
 
 from datetime import date
 from pyang import plugin, util, error
+from jnc import Camelizer, capitalize_first, decapitalize_first
 
 OSSep = "/"
 
@@ -74,6 +75,37 @@ def _decode_dict(data):
         rv[key] = value
     return rv
 
+def read_module_mapping(path):
+    """Returns the entries of the module mapping file at path, as a dict
+    keyed by module name.
+
+    Raises an EmitError if an entry lacks a name or package, or if there is
+    more than one entry for a module.
+
+    """
+    with open(path) as data_file:
+        data = json.load(data_file, object_hook=_decode_dict)
+    mapping = {}
+    for entry in data.get('modules', []):
+        if 'name' not in entry or 'package' not in entry:
+            raise error.EmitError(path + ': module mapping entry without ' +
+                                  'name or package: ' + repr(entry))
+        if entry['name'] in mapping:
+            raise error.EmitError(path + ': duplicate module mapping ' +
+                                  'entries for "' + entry['name'] + '"')
+        mapping[entry['name']] = entry
+    return mapping
+
+def mapped_package(module_name, ctx):
+    """Returns the package that module_name is mapped to in the module mapping
+    file, or None if it is not mapped.
+
+    """
+    entry = getattr(ctx, 'module_mapping', {}).get(module_name)
+    if entry is None:
+        return None
+    return entry['package']
+
 class JRCPlugin(plugin.PyangPlugin):
     """The plug-in class of JRC.
 
@@ -253,8 +285,7 @@ class JRCPlugin(plugin.PyangPlugin):
         data_file_name = "module-mapping.json"
         path = os.path.realpath(self.cur_file_path() + "/../modules/" + data_file_name)
         try:
-            with open(path) as data_file:
-                self.ctx.data = json.load(data_file, object_hook=_decode_dict)
+            self.ctx.module_mapping = read_module_mapping(path)
         except EnvironmentError:
             print_warning("Uanble to open file "+data_file_name+" in "+path+"\n")
 
@@ -485,12 +516,9 @@ augmented_modules = {}
 """A dict of external modules that are augmented by the YANG module"""
 
 
-camelized_stmt_args = {}
-"""Cache containing camelized versions of statement identifiers"""
-
-
-normalized_stmt_args = {}
-"""Cache containing normalized versions of statement identifiers"""
+camelizer = Camelizer('-._')
+"""Converts identifiers to Java names, with hyphens, dots and underlines as
+separators"""
 
 
 class_hierarchy = {}
@@ -590,11 +618,8 @@ def get_package(stmt, ctx):
     sub_packages = collections.deque()
     parent = get_parent(stmt)
     package = ""
-    if hasattr(ctx, "data"):
-        modules = ctx.data["modules"]
-        for sub in modules:
-            if parent.arg == sub['name']:
-                package = sub['package']
+    if hasattr(ctx, "module_mapping"):
+        package = mapped_package(parent.arg, ctx) or ""
 
     while parent is not None:
         if stmt.i_orig_module.keyword == "submodule" and stmt.keyword != "typedef" and get_parent(parent) is None:
@@ -650,83 +675,10 @@ def pairwise(iterable):
     yield (item, None)
 
 
-def capitalize_first(string):
-    """Returns string with its first character capitalized (if any)"""
-    return string[:1].capitalize() + string[1:]
-
-
-def decapitalize_first(string):
-    """Returns string with its first character decapitalized (if any)"""
-    return string[:1].lower() + string[1:]
-
-
-def camelize(string):
-    """Converts string to lower camel case
-
-    Removes hyphens and dots and replaces following character (if any) with
-    its upper-case counterpart. Does not remove consecutive or trailing hyphens
-    or dots.
+camelize = camelizer.camelize
 
-    If the resulting string is reserved in Java, an underline is appended
 
-    Returns an empty string if string argument is None. Otherwise, returns
-    string decapitalized and with no consecutive upper case letters.
-
-    """
-    try:  # Fetch from cache
-        return camelized_stmt_args[string]
-    except KeyError:
-        pass
-    camelized_str = collections.deque()
-    if string is not None:
-        iterator = pairwise(decapitalize_first(string))
-        for character, next_character in iterator:
-            if next_character is None:
-                if (len(string) > 1):
-                    camelized_str.append(character)
-                else:
-                    if(string.isupper()):
-                        camelized_str.append(character.upper())
-                    else:
-                        camelized_str.append(character.lower())
-            elif character in '-._':
-                camelized_str.append(capitalize_first(next_character))
-                next(iterator)
-            elif (character.isupper()
-                  and (next_character.isupper()
-                       or not next_character.isalpha())):
-                camelized_str.append(character.lower())
-            else:
-                camelized_str.append(character)
-    res = ''.join(camelized_str)
-    if res in java_reserved_words | java_literals:
-        camelized_str.append('_')
-    if re.match(r'\d', res):
-        camelized_str.appendleft('_')
-    res = ''.join(camelized_str)
-    camelized_stmt_args[string] = res  # Add to cache
-    return res
-
-
-def normalize(string):
-    """returns capitalize_first(camelize(string)), except if camelize(string)
-    begins with and/or ends with a single underline: then they are/it is
-    removed and a 'J' is prepended. Mimics normalize in YangElement of JNC.
-
-    """
-    try:  # Fetch from cache
-        return normalized_stmt_args[string]
-    except KeyError:
-        pass
-    res = camelize(string)
-    start = 1 if res.startswith('_') else 0
-    end = -1 if res.endswith('_') else 0
-    if start or end:
-        res = 'J' + capitalize_first(res[start:end])
-    else:
-        res = capitalize_first(res)
-    normalized_stmt_args[string] = res  # Add to cache
-    return res
+normalize = camelizer.normalize
 
 
 def flatten(l):
@@ -0,0 +1,456 @@
+"""
+Benchmarks of the jnc, jrc and jcc pyang plugins.
+
+The plugins are run in-process on YANG modules synthesized along several axes
+(wide containers, deep nesting, many typedefs, groupings and uses, augments,
+large enumerations and unions) and on the models in examples/yang. Each run
+takes place in a separate process, so that the module level state of the
+plugins and the peak RSS are not shared between runs.
+
+To record a baseline, stand in project dir and enter:
+$ python tests/jnc_benchmark.py --save benchmark-baseline.json
+
+To compare with the baseline, failing on regressions larger than 20%:
+$ python tests/jnc_benchmark.py --compare benchmark-baseline.json
+
+To check that the low memory mode of jnc stays below a peak RSS of 100 MB:
+$ python tests/jnc_benchmark.py --case jnc-low-memory/ --max-rss 102400
+
+Options after '--' are passed on to the plugins, e.g. '-- --jnc-jobs 2'.
+"""
+import imp
+import json
+import multiprocessing
+import optparse
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+
+from pyang import error
+
+try:
+    from pyang import context, repository
+    Context, FileRepository = context.Context, repository.FileRepository
+except ImportError:  # pyang < 2.0
+    from pyang import Context, FileRepository
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+"""The directory containing the plugins"""
+
+examples_dir = os.path.join(project_dir, 'examples')
+"""The directory containing the example models"""
+
+plugin_names = ('jnc', 'jrc', 'jcc')
+"""The plugins to benchmark, each defined in <name>.py in project_dir"""
+
+variants = (('jnc', 'jnc', []),
+            ('jnc-low-memory', 'jnc', ['--jnc-low-memory']),
+            ('jrc', 'jrc', []),
+            ('jcc', 'jcc', []))
+"""The (name, plugin, options) of each plugin configuration to benchmark"""
+
+
+def wide_corpus(scale):
+    """Containers with many leaves each"""
+    lines = ['module bench-wide {',
+             '  namespace "urn:bench:wide";',
+             '  prefix w;']
+    types = ('string', 'uint32', 'boolean', 'int64', 'empty')
+    for i in range(10):
+        lines.append('  container c%d {' % i)
+        for j in range(100 * scale):
+            lines.append('    leaf l%d { type %s; }' % (j, types[j % 5]))
+        lines.append('    list entry {')
+        lines.append('      key name;')
+        lines.append('      leaf name { type string; }')
+        for j in range(10 * scale):
+            lines.append('      leaf v%d { type %s; }' % (j, types[j % 4]))
+        lines.append('    }')
+        lines.append('  }')
+    lines.append('}')
+    return 'bench-wide', {'bench-wide.yang': lines}
+
+
+def deep_corpus(scale):
+    """Containers and lists nested many levels deep"""
+    lines = ['module bench-deep {',
+             '  namespace "urn:bench:deep";',
+             '  prefix d;']
+    depth = 25 * scale
+    for i in range(depth):
+        indent = '  ' * (i + 1)
+        if i % 5 == 4:
+            lines.append(indent + 'list n%d {' % i)
+            lines.append(indent + '  key k%d;' % i)
+            lines.append(indent + '  leaf k%d { type string; }' % i)
+        else:
+            lines.append(indent + 'container n%d {' % i)
+        lines.append(indent + '  leaf a%d { type string; }' % i)
+        lines.append(indent + '  leaf-list b%d { type uint16; }' % i)
+    for i in reversed(range(depth)):
+        lines.append('  ' * (i + 1) + '}')
+    lines.append('}')
+    return 'bench-deep', {'bench-deep.yang': lines}
+
+
+def typedef_corpus(scale):
+    """Many typedefs, some derived from each other, and leaves using them"""
+    lines = ['module bench-typedefs {',
+             '  namespace "urn:bench:typedefs";',
+             '  prefix t;']
+    count = 500 * scale
+    for i in range(count):
+        lines.append('  typedef t%d {' % i)
+        if i % 10 == 0:
+            lines.append('    type string { length "1..%d"; }' % (i + 1))
+        elif i % 10 == 9:
+            lines.append('    type decimal64 { fraction-digits 2; }')
+        else:
+            lines.append('    type t%d;' % (i - 1))
+        lines.append('  }')
+    lines.append('  container typed {')
+    for i in range(count):
+        lines.append('    leaf l%d { type t%d; }' % (i, i))
+    lines.append('  }')
+    lines.append('}')
+    return 'bench-typedefs', {'bench-typedefs.yang': lines}
+
+
+def grouping_corpus(scale):
+    """Groupings using each other, used in many containers"""
+    lines = ['module bench-groupings {',
+             '  namespace "urn:bench:groupings";',
+             '  prefix g;']
+    count = 50 * scale
+    for i in range(count):
+        lines.append('  grouping g%d {' % i)
+        for j in range(5):
+            lines.append('    leaf g%dl%d { type string; }' % (i, j))
+        lines.append('    container g%dc {' % i)
+        if i % 5:
+            lines.append('      uses g%d;' % (i - 1))
+        else:
+            lines.append('      leaf x { type int8; }')
+        lines.append('    }')
+        lines.append('  }')
+    for i in range(count // 5):
+        lines.append('  container u%d {' % i)
+        for j in range(5):
+            lines.append('    uses g%d;' % (i * 5 + j))
+        lines.append('  }')
+    lines.append('}')
+    return 'bench-groupings', {'bench-groupings.yang': lines}
+
+
+def augment_corpus(scale):
+    """A module augmenting the containers of another module"""
+    count = 50 * scale
+    base = ['module bench-base {',
+            '  namespace "urn:bench:base";',
+            '  prefix b;']
+    aug = ['module bench-augment {',
+           '  namespace "urn:bench:augment";',
+           '  prefix a;',
+           '  import bench-base { prefix b; }']
+    for i in range(count):
+        base.append('  container c%d {' % i)
+        base.append('    leaf name { type string; }')
+        base.append('  }')
+        aug.append('  augment "/b:c%d" {' % i)
+        aug.append('    leaf extra { type uint32; }')
+        aug.append('    container more {')
+        aug.append('      leaf value { type string; }')
+        aug.append('    }')
+        aug.append('  }')
+    base.append('}')
+    aug.append('}')
+    return 'bench-augment', {'bench-base.yang': base,
+                             'bench-augment.yang': aug}
+
+
+def enum_corpus(scale):
+    """Large enumerations, and unions of them"""
+    lines = ['module bench-enums {',
+             '  namespace "urn:bench:enums";',
+             '  prefix e;']
+    count = 50 * scale
+    for i in range(count):
+        lines.append('  typedef e%d {' % i)
+        lines.append('    type enumeration {')
+        for j in range(100):
+            lines.append('      enum v%d-%d;' % (i, j))
+        lines.append('    }')
+        lines.append('  }')
+        lines.append('  typedef u%d {' % i)
+        lines.append('    type union {')
+        lines.append('      type e%d;' % i)
+        lines.append('      type uint8;')
+        lines.append('      type string { pattern "[a-z]+"; }')
+        lines.append('      type boolean;')
+        lines.append('    }')
+        lines.append('  }')
+    lines.append('  container values {')
+    for i in range(count):
+        lines.append('    leaf e%d { type e%d; }' % (i, i))
+        lines.append('    leaf-list u%d { type u%d; }' % (i, i))
+    lines.append('  }')
+    lines.append('}')
+    return 'bench-enums', {'bench-enums.yang': lines}
+
+
+synthetic_corpora = {'wide': wide_corpus,
+                     'deep': deep_corpus,
+                     'typedefs': typedef_corpus,
+                     'groupings': grouping_corpus,
+                     'augments': augment_corpus,
+                     'enums': enum_corpus}
+"""Functions returning the name of the main module and the lines of each file
+of a synthetic corpus, given a size multiplier
+
+"""
+
+example_models = ('simple', 'hosts', 'dhcpd', 'recursive', 'math-rpc',
+                  'identity-ref', 'my-crypto')
+"""The models in examples/yang to benchmark"""
+
+
+def corpora(scale):
+    """Returns a dict mapping corpus names to (path, main file) tuples,
+    writing the synthetic corpora to a temporary directory.
+
+    """
+    res = {}
+    d = tempfile.mkdtemp(prefix='jnc-corpus-')
+    for name, corpus in synthetic_corpora.items():
+        module, files = corpus(scale)
+        corpus_dir = os.path.join(d, name)
+        os.makedirs(corpus_dir)
+        for file_name, lines in files.items():
+            with open(os.path.join(corpus_dir, file_name), 'w') as f:
+                f.writelines(line + '\n' for line in lines)
+        res[name] = (corpus_dir, os.path.join(corpus_dir, module + '.yang'))
+    path = os.pathsep.join([os.path.join(examples_dir, 'yang'),
+                            os.path.join(examples_dir, '2-junos')])
+    for model in example_models:
+        res['example-' + model] = (path, os.path.join(examples_dir, 'yang',
+                                                      model + '.yang'))
+    return d, res
+
+
+def load_plugins():
+    """Loads the plugins and returns a dict mapping their names to instances,
+    along with the options they take as parsed by an optparse.OptionParser.
+
+    """
+    plugins = {}
+    optparser = optparse.OptionParser()
+    for name in plugin_names:
+        module = imp.load_source(name, os.path.join(project_dir, name + '.py'))
+        plugins[name] = getattr(module, name.upper() + 'Plugin')()
+        plugins[name].add_opts(optparser)
+    return plugins, optparser
+
+
+def peak_rss():
+    """Returns the peak RSS in kB of this process and its waited for
+    children, such as the worker processes of the jnc plugin.
+
+    """
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+
+def count_files(d):
+    """Returns the number of files in d and their total size in bytes"""
+    files = size = 0
+    for root, _, file_names in os.walk(d):
+        for file_name in file_names:
+            files += 1
+            size += os.path.getsize(os.path.join(root, file_name))
+    return files, size
+
+
+def run_case(name, path, filename, args, out_dir, verbose):
+    """Runs the plugin named name on the module in filename and returns a dict with
+    the elapsed time, peak RSS and the files written to out_dir.
+
+    """
+    if not verbose:
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 1)
+        os.dup2(devnull, 2)
+    plugins, optparser = load_plugins()
+    opts, _ = optparser.parse_args(['--%s-ignore-errors' % name,
+                                    '--%s-output' % name, out_dir] + args)
+    opts.format = name
+    plugin = plugins[name]
+    start = time.time()
+    ctx = Context(FileRepository(path + os.pathsep + '.'))
+    ctx.opts = opts
+    plugin.setup_ctx(ctx)
+    plugin.setup_fmt(ctx)
+    with open(filename) as f:
+        module = ctx.add_module(filename, f.read())
+    ctx.validate()
+    plugin.emit(ctx, [module], sys.stdout)
+    elapsed = time.time() - start
+    files, size = count_files(out_dir)
+    return {'time': elapsed, 'rss': peak_rss(), 'files': files, 'bytes': size}
+
+
+def run_case_process(queue, *args):
+    """Runs run_case, putting its result or the error on queue"""
+    try:
+        queue.put(run_case(*args))
+    except (Exception, SystemExit) as e:
+        if isinstance(e, error.EmitError):
+            queue.put({'error': e.msg})
+        else:
+            traceback.print_exc()
+            queue.put({'error': traceback.format_exc()})
+
+
+def benchmark(cases, args, repeat, scale, verbose):
+    """Returns a dict mapping '<variant>/<corpus>' to the result of the
+    fastest of repeat runs of the plugin variant on the corpus.
+
+    """
+    results = {}
+    corpus_dir, corpus_files = corpora(scale)
+    try:
+        for variant, name, options in variants:
+            for corpus in sorted(corpus_files):
+                key = variant + '/' + corpus
+                if cases and not any(case in key for case in cases):
+                    continue
+                for _ in range(repeat):
+                    out_dir = tempfile.mkdtemp(prefix='jnc-bench-')
+                    queue = multiprocessing.Queue()
+                    process = multiprocessing.Process(
+                        target=run_case_process,
+                        args=(queue, name) + corpus_files[corpus] +
+                             (options + args,
+                              os.path.join(out_dir, 'src', 'gen'), verbose))
+                    process.start()
+                    result = queue.get()
+                    process.join()
+                    shutil.rmtree(out_dir)
+                    if ('error' in result or key not in results
+                            or result['time'] < results[key]['time']):
+                        results[key] = result
+                    if 'error' in result:
+                        break
+                print_result(key, results[key])
+    finally:
+        shutil.rmtree(corpus_dir)
+    return results
+
+
+def print_result(key, result):
+    """Prints a line with the result of a benchmark case"""
+    if 'error' in result:
+        message = result['error'].strip().splitlines()
+        print('%-36s error: %s' % (key, message[-1] if message else ''))
+    else:
+        print('%-36s %8.2fs %8d kB %6d files %10d bytes' % (key,
+              result['time'], result['rss'], result['files'],
+              result['bytes']))
+
+
+def compare(baseline, results, threshold):
+    """Prints the differences between the results and the baseline, returning
+    False if the time or peak RSS of a case has increased by more than
+    threshold percent.
+
+    """
+    ok = True
+    for key in sorted(baseline):
+        old, new = baseline[key], results.get(key)
+        if new is None:
+            continue
+        if 'error' in new and 'error' not in old:
+            print('%s: failed, %s' % (key, new['error'].strip()))
+            ok = False
+            continue
+        if 'error' in old or 'error' in new:
+            continue
+        for field, unit in (('time', 's'), ('rss', ' kB')):
+            if not old[field]:
+                continue
+            change = 100.0 * (new[field] - old[field]) / old[field]
+            if change > threshold:
+                print('%s: %s regressed by %.1f%%, %.2f%s -> %.2f%s' %
+                      (key, field, change, old[field], unit, new[field], unit))
+                ok = False
+        if new['files'] != old['files']:
+            print('%s: %d files written, %d in the baseline' %
+                  (key, new['files'], old['files']))
+    return ok
+
+
+def check_rss(results, max_rss):
+    """Prints the cases whose peak RSS exceeds max_rss kB, returning False if
+    there are any.
+
+    """
+    ok = True
+    for key in sorted(results):
+        rss = results[key].get('rss', 0)
+        if rss > max_rss:
+            print('%s: peak RSS %d kB exceeds the target of %d kB' %
+                  (key, rss, max_rss))
+            ok = False
+    return ok
+
+
+def main():
+    optparser = optparse.OptionParser(
+        usage='%prog [options] [-- plugin options]')
+    optparser.add_option('--case', dest='cases', action='append', default=[],
+                         help='Only run the cases containing CASE, such as ' +
+                              'jnc/ or wide. May be given more than once.')
+    optparser.add_option('--scale', dest='scale', type='int', default=1,
+                         help='Size multiplier of the synthetic corpora.')
+    optparser.add_option('--repeat', dest='repeat', type='int', default=1,
+                         help='Number of runs of each case, the fastest ' +
+                              'of which is recorded.')
+    optparser.add_option('--save', dest='save', metavar='FILE',
+                         help='Save the results as a baseline to FILE.')
+    optparser.add_option('--compare', dest='compare', metavar='FILE',
+                         help='Compare the results with the baseline in ' +
+                              'FILE, failing on regressions.')
+    optparser.add_option('--threshold', dest='threshold', type='float',
+                         default=20.0,
+                         help='Regressions in percent tolerated by ' +
+                              '--compare, default is 20.')
+    optparser.add_option('--max-rss', dest='max_rss', type='int',
+                         metavar='KB',
+                         help='Peak RSS target in kB, failing the cases ' +
+                              'that exceed it, e.g. with --case low-memory.')
+    optparser.add_option('--verbose', dest='verbose', action='store_true',
+                         help='Show the output of the plugins.')
+    opts, args = optparser.parse_args()
+    baseline = None
+    if opts.compare:
+        with open(opts.compare) as f:
+            baseline = json.load(f)['results']
+    results = benchmark(opts.cases, args, opts.repeat, opts.scale,
+                        opts.verbose)
+    if opts.save:
+        with open(opts.save, 'w') as f:
+            json.dump({'scale': opts.scale, 'args': args, 'results': results},
+                      f, indent=2, sort_keys=True)
+    ok = True
+    if opts.max_rss is not None:
+        ok = check_rss(results, opts.max_rss)
+    if baseline is not None:
+        ok = compare(baseline, results, opts.threshold) and ok
+    if not ok:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
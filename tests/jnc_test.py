@@ -8,9 +8,55 @@ PyUnit is needed to run these tests.
 To run, stand in project dir and enter:
 $ python -m unittest discover -v
 """
+import collections
+import json
+import optparse
+import os
+import random
+import re
+import shutil
+import tempfile
 import unittest
+import zipfile
 
 import jnc
+import pyang
+
+from pyang import error
+from pyang import statements
+
+def reference_camelize(string):
+    """The character by character implementation that camelize replaced,
+    without its cache.
+
+    """
+    camelized_str = collections.deque()
+    if string is not None:
+        iterator = jnc.pairwise(jnc.decapitalize_first(string))
+        for character, next_character in iterator:
+            if next_character is None:
+                if (len(string) > 1):
+                    camelized_str.append(character)
+                else:
+                    if(string.isupper()):
+                        camelized_str.append(character.upper())
+                    else:
+                        camelized_str.append(character.lower())
+            elif character in '-.':
+                camelized_str.append(jnc.capitalize_first(next_character))
+                next(iterator)
+            elif (character.isupper()
+                  and (next_character.isupper()
+                       or not next_character.isalpha())):
+                camelized_str.append(character.lower())
+            else:
+                camelized_str.append(character)
+    res = ''.join(camelized_str)
+    if res in jnc.java_reserved_words | jnc.java_literals:
+        camelized_str.append('_')
+    if re.match(r'\d', res):
+        camelized_str.appendleft('_')
+    return ''.join(camelized_str)
 
 class Test(unittest.TestCase):
 
@@ -78,6 +124,392 @@ class Test(unittest.TestCase):
         message = 'will remove all except consecutive and trailing'
         assert result == expected, message + ' but was ' + result
 
+    def write_mapping(self, modules):
+        fd, path = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'modules': modules}, f)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test__read_module_mapping__when_names_are_unique(self):
+        path = self.write_mapping([{'name': 'a', 'package': 'x.y'},
+                                   {'name': 'b', 'package': 'z'}])
+        result = jnc.read_module_mapping(path)
+        message = 'should key entries by module name'
+        assert sorted(result) == ['a', 'b'], message
+        assert result['a']['package'] == 'x.y', message
+
+    def test__read_module_mapping__when_name_is_duplicated(self):
+        path = self.write_mapping([{'name': 'a', 'package': 'x.y'},
+                                   {'name': 'a', 'package': 'z'}])
+        self.assertRaises(error.EmitError, jnc.read_module_mapping, path)
+
+    def test__read_manifest__when_options_are_set(self):
+        path = self.write_mapping([{'name': 'a', 'output': 'src/gen/a'},
+                                   {'name': 'b', 'output': 'src/gen/b',
+                                    'options': {'schema-format': 'binary',
+                                                'include-modules': 'x,y',
+                                                'no-pkginfo': True}}])
+        optparser = optparse.OptionParser()
+        jnc_plugin = jnc.JNCPlugin()
+        jnc_plugin.add_opts(optparser)
+        result = jnc.read_manifest(path, jnc_plugin.options)
+        expected = [('a', 'src/gen/a', {}),
+                    ('b', 'src/gen/b', {'schema_format': 'binary',
+                                        'include_modules': ['x', 'y'],
+                                        'no_pkginfo': True})]
+        message = 'should map option names to destinations'
+        assert result == expected, message + ' but was ' + repr(result)
+        path = self.write_mapping([{'name': 'a', 'output': 'src/gen/a',
+                                    'options': {'jobs': 2}}])
+        self.assertRaises(error.EmitError, jnc.read_manifest, path,
+                          jnc_plugin.options)
+        path = self.write_mapping([{'name': 'a', 'output': 'gen/a'}])
+        self.assertRaises(error.EmitError, jnc.read_manifest, path,
+                          jnc_plugin.options)
+
+    def test__manifest_modules__when_search_path_has_other_revision(self):
+        d = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, d)
+        text = ('module m {\n'
+                '  namespace "urn:m";\n'
+                '  prefix m;\n'
+                '  revision %s;\n'
+                '}\n')
+        with open(os.path.join(d, 'm@2020-01-01.yang'), 'w') as f:
+            f.write(text % '2020-01-01')
+        ctx = pyang.Context(pyang.FileRepository(d))
+        ctx.opts = self.options('--jnc-manifest', 'm.json')
+        module = ctx.add_module('m.yang', text % '2010-01-01')
+        jnc_plugin = jnc.JNCPlugin()
+        entries = [('m', 'src/gen/m', {})]
+        message = 'should use the revision given to pyang'
+        result = jnc_plugin.manifest_modules(ctx, entries, [module])
+        assert result == [module], message
+        message = 'should use the revision already parsed'
+        result = jnc_plugin.manifest_modules(ctx, entries, [])
+        assert result == [module], message
+
+    def test__camelize__when_compared_to_reference_implementation(self):
+        rnd = random.Random(0)
+        alphabet = u'abzABZ09-._ \xe9\xc9'
+        strings = [u''.join(rnd.choice(alphabet)
+                            for _ in range(rnd.randint(0, 8)))
+                   for _ in range(5000)]
+        strings.extend(jnc.java_reserved_words | jnc.java_literals)
+        for string in strings:
+            result = jnc.camelize(string)
+            expected = reference_camelize(string)
+            message = 'should camelize ' + repr(string) + ' as ' + expected
+            assert result == expected, message + ' but was ' + result
+
+    def test__lru_cache__when_full(self):
+        cache = jnc.LRUCache(4)
+        for i in range(4):
+            cache[i] = str(i)
+        cache.get(0)
+        for i in range(4, 6):
+            cache[i] = str(i)
+        message = 'should keep recently used items only'
+        assert len(cache) <= 4, message
+        assert cache.get(0) == '0', message
+        assert cache.get(1) is None, message
+
+    def test__camelizer__when_underlines_are_separators(self):
+        camelizer = jnc.Camelizer('-._')
+        message = 'should remove underlines as separators'
+        assert camelizer.camelize('foo_bar-baz.qux') == 'fooBarBazQux', message
+        assert camelizer.camelize('Foo_Bar') == 'fooBar', message
+        assert camelizer.normalize('foo_bar') == 'FooBar', message
+        message = 'should keep underlines in jnc names'
+        assert jnc.camelize('foo_bar-baz') == 'foo_barBaz', message
+
+    def test__java_class__lines_when_compared_to_as_list(self):
+        def java_class():
+            res = jnc.JavaClass(filename='Test.java', package='a.b',
+                                description='Test class', superclass='YangElement')
+            method = jnc.JavaMethod(name='test')
+            method.add_dependency('com.tailf.jnc.Leaf')
+            method.add_line('return;')
+            res.append_access_method('test', method)
+            res.add_field(jnc.JavaValue(name='x', value='null'))
+            return res
+        result = list(java_class().lines())
+        expected = java_class().as_list()
+        message = 'should yield the lines of as_list'
+        assert result == expected, message
+        assert 'import com.tailf.jnc.Leaf;' in result, message
+
+    def test__method_template__when_compared_to_java_method(self):
+        values = {'n': 'Mtu', 'n2': 'mtu', 'arg': 'mtu', 'keyword': 'leaf',
+                  'Keyword': 'Leaf', 'root': 'If', 'type': 'a.b.MtuType',
+                  'param_type': 'String', 'using': 'using a String value.',
+                  'args': ''}
+        result = jnc.value_leaf_setter_template.render(values)
+        expected = jnc.JavaMethod(name='setMtuValue')
+        expected.add_exception('JNCException')
+        expected.add_javadoc('Sets the value for child leaf "mtu",')
+        expected.add_javadoc('using a String value.')
+        expected.add_line('setMtuValue(new ' +
+                          expected.add_dependency('a.b.MtuType') +
+                          '(mtuValue));')
+        expected.add_parameter('String', 'mtuValue')
+        expected.add_javadoc('@param mtuValue used during instantiation.')
+        message = 'should render the same method as the JavaMethod methods'
+        assert result == expected, message
+        assert result.as_list() == expected.as_list(), message
+
+    def test__register_package__when_directories_are_nested(self):
+        self.addCleanup(jnc.package_directories.clear)
+        jnc.register_package(os.path.join('src', 'a', 'b'))
+        jnc.register_package(os.path.join('src', 'a', 'c') + os.sep)
+        result = jnc.package_directories
+        message = 'should map directories to their subdirectories'
+        assert result['src'] == set(['a']), message
+        assert result[os.path.join('src', 'a')] == set(['b', 'c']), message
+        assert result[os.path.join('src', 'a', 'b')] == set(), message
+
+    def test__output_archive__when_file_is_written_twice(self):
+        fd, path = tempfile.mkstemp(suffix='.zip')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        archive = jnc.OutputArchive(path)
+        archive.add('b/B.java', 'class B {}')
+        archive.add('a/A.java', 'class A {}')
+        archive.add('b/B.java', 'class B { int x; }')
+        archive.close()
+        result = zipfile.ZipFile(path)
+        message = 'should keep the last content, sorted by name'
+        assert result.namelist() == ['a/A.java', 'b/B.java'], message
+        assert result.read('b/B.java') == b'class B { int x; }', message
+        dates = set(info.date_time for info in result.infolist())
+        assert dates == set([jnc.archive_date_time]), message
+        result.close()
+
+    def test__change_manifest__when_files_are_generated_twice(self):
+        d = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, d)
+        path = os.path.join(d, 'changes.json')
+        a = os.path.join(d, 'src', 'a', 'A.java')
+        b = os.path.join(d, 'src', 'b', 'B.java')
+        c = os.path.join(d, 'src', 'C.java')
+        for file_path in (a, b, c):
+            if not os.path.isdir(os.path.dirname(file_path)):
+                os.makedirs(os.path.dirname(file_path))
+            with open(file_path, 'w') as f:
+                f.write('class')
+        manifest = jnc.ChangeManifest(path)
+        for file_path in (a, b, c):
+            manifest.add(file_path, 'class')
+        manifest.write()
+        manifest = jnc.ChangeManifest(path)
+        manifest.add(a, 'class')
+        manifest.add(c, 'class {}')
+        manifest.add(os.path.join(d, 'src', 'D.java'), 'class')
+        manifest.write(delete_stale=True)
+        with open(path) as f:
+            result = [(e['path'], e['status']) for e in json.load(f)['files']]
+        expected = [('src/C.java', 'changed'), ('src/D.java', 'added'),
+                    ('src/a/A.java', 'unchanged'), ('src/b/B.java', 'removed')]
+        message = 'should compare the files to those of the previous run'
+        assert result == expected, message + ' but was ' + repr(result)
+        message = 'should delete the removed files and their directories'
+        assert not os.path.exists(os.path.dirname(b)), message
+        assert os.path.isfile(a), message
+
+    def options(self, *args):
+        optparser = optparse.OptionParser()
+        jnc_plugin = jnc.JNCPlugin()
+        jnc_plugin.add_opts(optparser)
+        return optparser.parse_args(list(args))[0]
+
+    def test__generation_cache__prune_when_objects_are_unreferenced(self):
+        d = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, d)
+        ctx = collections.namedtuple('Context',
+                                     'opts modules include_modules')(
+            self.options('--jnc-output', os.path.join(d, 'src', 'gen')),
+            {}, [])
+        cache = jnc.GenerationCache(ctx)
+        objects = os.path.join(cache.d, 'objects')
+        os.makedirs(objects)
+        for digest in ('a', 'b', 'c'):
+            cache.write(cache.blob_path(digest), b'text')
+        for name, digest in (('x@1.json', 'a'), ('y@1.json', 'b')):
+            entry = {'key': '', 'files': [['src', 'X.java', digest]],
+                     'augmented': []}
+            cache.write(os.path.join(cache.d, name),
+                        json.dumps(entry).encode('utf-8'))
+        cache.prune()
+        message = 'should delete the objects that no entry refers to'
+        assert sorted(os.listdir(objects)) == ['a', 'b'], message
+
+    def test__output_sibling__when_manifest_has_the_output(self):
+        ctx = collections.namedtuple('Context', 'opts')(
+            self.options('--jnc-manifest', os.path.join('gen', 'm.json')))
+        result = jnc.output_sibling(ctx, 'jnc-profile.json')
+        expected = os.path.join('gen', 'jnc-profile.json')
+        message = 'should return a path next to the manifest'
+        assert result == expected, message + ' but was ' + result
+        ctx.opts.directory = os.path.join('src', 'gen')
+        result = jnc.output_sibling(ctx, 'jnc-profile.json')
+        expected = os.path.join('src', 'jnc-profile.json')
+        message = 'should return a path next to the output directory'
+        assert result == expected, message + ' but was ' + result
+
+    def test__change_manifest__when_stale_directory_is_written_again(self):
+        d = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, d)
+        self.addCleanup(jnc.package_directories.clear)
+        self.addCleanup(jnc.created_directories.clear)
+        ctx = collections.namedtuple('Context', 'opts')(self.options())
+        path = os.path.join(d, 'changes.json')
+        a = os.path.join(d, 'src', 'a')
+        manifest = jnc.ChangeManifest(path)
+        manifest.add(os.path.join(a, 'A.java'), 'class')
+        manifest.add(os.path.join(d, 'src', 'B.java'), 'class')
+        jnc.write_file(a, 'A.java', 'class', ctx)
+        manifest.write()
+        manifest.add(os.path.join(d, 'src', 'B.java'), 'class')
+        manifest.write(delete_stale=True)
+        message = 'should delete the directory of the removed file'
+        assert not os.path.exists(a), message
+        jnc.write_file(a, 'A.java', 'class', ctx)
+        message = 'should create the deleted directory again'
+        assert os.path.isfile(os.path.join(a, 'A.java')), message
+
+    def java_file(self, package, name, imports=(), body='    int x;'):
+        lines = ['/*', ' */', '', 'package ' + package + ';', '']
+        lines.extend('import ' + import_ + ';' for import_ in imports)
+        lines.extend(['', '/**', ' * ' + name, ' */',
+                      'public class ' + name + ' {', body, '}', ''])
+        return (os.path.join('src', *package.split('.')), name + '.java',
+                lines)
+
+    def test__share_classes__when_grouping_is_used_twice(self):
+        writes = [self.java_file('g.a', 'A', imports=['g.a.b.B']),
+                  self.java_file('g.c', 'C', imports=['g.c.b.B']),
+                  self.java_file('g.a.b', 'B'),
+                  self.java_file('g.c.b', 'B'),
+                  self.java_file('g.d.b', 'B', body='    long x;')]
+        result, shared, saved = jnc.share_classes(writes)
+        message = 'should leave out the identical classes'
+        assert shared == {'g.c.b.B': 'g.a.b.B'}, message
+        assert [w[1] for w in result] == ['A.java', 'C.java', 'B.java',
+                                          'B.java'], message
+        assert saved == len(jnc.file_text(writes[3][2])), message
+        message = 'should refer to the classes used instead'
+        assert 'import g.a.b.B;' in result[1][2].split('\n'), message
+        assert 'g.c.b' not in result[1][2], message
+        result, shared, _ = jnc.share_classes(writes[:2] + writes[3:])
+        message = 'should compare the classes referred to'
+        assert shared == {}, message + ' but was ' + repr(shared)
+
+    def test__share_classes__when_grouping_of_submodule_is_used(self):
+        d = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, d)
+        for cleared in (jnc.package_directories, jnc.created_directories,
+                        jnc.class_hierarchy):
+            self.addCleanup(cleared.clear)
+        with open(os.path.join(d, 'g-sub.yang'), 'w') as f:
+            f.write('submodule g-sub {\n'
+                    '  belongs-to g { prefix g; }\n'
+                    '  grouping counters {\n'
+                    '    container stats {\n'
+                    '      leaf in { type uint32; }\n'
+                    '      leaf out { type uint32; }\n'
+                    '    }\n'
+                    '  }\n'
+                    '  container a { uses counters; }\n'
+                    '}\n')
+        output = os.path.join(d, 'src', 'gen', 'g')
+        ctx = pyang.Context(pyang.FileRepository(d))
+        ctx.opts = self.options('--jnc-output', output, '--jnc-serial',
+                                '--jnc-share-classes')
+        ctx.opts.format = 'jnc'
+        jnc_plugin = jnc.JNCPlugin()
+        jnc_plugin.setup_ctx(ctx)
+        jnc_plugin.setup_fmt(ctx)
+        module = ctx.add_module('g.yang', 'module g {\n'
+                                          '  namespace "urn:g";\n'
+                                          '  prefix g;\n'
+                                          '  include g-sub;\n'
+                                          '  container sys { uses counters; }\n'
+                                          '}\n')
+        ctx.validate()
+        jnc_plugin.emit(ctx, [module], None)
+        package = os.path.join(output, 'g')
+        message = 'should generate the class of the grouping once'
+        assert jnc.shared_stats['classes'] == 1, message
+        stats = os.path.join(package, 'counters', 'Stats.java')
+        assert os.path.isfile(stats), message
+        assert not os.path.exists(os.path.join(package, 'sys')), message
+        with open(os.path.join(package, 'Sys.java')) as f:
+            lines = f.read().split('\n')
+        message = 'should refer to the class of the grouping'
+        assert 'import gen.g.g.counters.Stats;' in lines, message
+
+    def test__schema_class_name__when_container_has_the_name(self):
+        for containers, expected in (([], 'SSchema'),
+                                     (['s-schema'], 'SSchema_'),
+                                     (['s-schema1'], 'SSchema_')):
+            module = self.module('s')
+            for keyword, arg in [('prefix', 's')] + [('container', arg)
+                                                     for arg in containers]:
+                module.substmts.append(
+                    statements.Statement(module, module, None, keyword, arg))
+            ctx = collections.namedtuple('Context', 'opts modules')(
+                self.options(), {('s', 'unknown'): module})
+            generator = jnc.ClassGenerator(module, package='gen.s', ctx=ctx)
+            result = generator.schema_class_name()
+            message = 'should not have the name of ' + repr(containers)
+            assert result == expected, message + ' but was ' + result
+
+    def test__java_string_literal__when_string_has_special_characters(self):
+        result = jnc.java_string_literal(u'a"b\\c\xe9\U0001f600')
+        expected = '"a\\"b\\\\c\\u00e9\\ud83d\\ude00"'
+        message = 'should escape quotes, backslashes and non-ASCII characters'
+        assert result == expected, message + ' but was ' + result
+        assert jnc.java_string_literal(None) == 'null', 'should return null'
+        result = jnc.java_string_literal(u'a\nb\r\tc\x00d\x1f')
+        expected = '"a\\nb\\r\\tc\\000d\\037"'
+        message = 'should escape control characters without unicode escapes'
+        assert result == expected, message + ' but was ' + result
+
+    def module(self, name, imports=()):
+        module = statements.Statement(None, None, None, 'module', name)
+        for dep in imports:
+            module.substmts.append(
+                statements.Statement(module, module, None, 'import', dep))
+        return module
+
+    def test__module_graph__when_imports_are_cyclic(self):
+        a = self.module('a', imports=['b', 'c'])
+        b = self.module('b', imports=['c'])
+        c = self.module('c', imports=['a'])
+        ctx = collections.namedtuple('Context', 'modules')(
+            {('a', 'unknown'): a, ('b', 'unknown'): b, ('c', 'unknown'): c})
+        graph = jnc.ModuleGraph(ctx)
+        message = 'should find each module once, dependencies first'
+        assert graph.closure([a]) == [a, b, c], message
+        assert graph.topological_order([a]) == [c, b, a], message
+        graph = jnc.ModuleGraph(ctx, names=['b'])
+        message = 'should only follow edges to the named modules'
+        assert graph.closure([a]) == [a, b], message
+
+    def test__module_graph__dependents_when_imports_are_shared(self):
+        a = self.module('a', imports=['b'])
+        b = self.module('b', imports=['d'])
+        c = self.module('c', imports=['d'])
+        d = self.module('d')
+        ctx = collections.namedtuple('Context', 'modules')(
+            {('a', 'unknown'): a, ('b', 'unknown'): b, ('c', 'unknown'): c,
+             ('d', 'unknown'): d})
+        graph = jnc.ModuleGraph(ctx)
+        message = 'should find the modules importing the modules'
+        assert graph.dependents([b]) == [b, a], message
+        assert graph.dependents([d]) == [d, b, c, a], message
+
 if __name__ == "__main__":
     """Launch all unit tests"""
     #import sys;sys.argv = ['', 'Test.testCapitalize_first']  # Only one